@@ -0,0 +1,74 @@
+# pyright: reportUnknownMemberType=false
+
+# Compare the Excel export against the previous DataFrame.to_excel based export.
+# Usage: python -m benchmarks.bench_save_excel --rows 500000 --columns 10
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from src.save import save_excel
+
+
+# The export used before the xlsxwriter based export (kept for comparison)
+def save_excel_legacy(df: pd.DataFrame, path: Path) -> Path:
+    with pd.ExcelWriter(path) as writer:
+        EXTRA_SPACE = 4
+        SHEET_NAME = "Sheet1"
+
+        df.to_excel(writer, sheet_name=SHEET_NAME, index=False)  # type: ignore
+
+        for column in df:
+            column_length: int = max(df[column].astype(str).map(len).max(), len(column))  # type: ignore
+            col_idx = df.columns.get_loc(column)  # type: ignore
+            writer.sheets[SHEET_NAME].set_column(
+                col_idx, col_idx, column_length + EXTRA_SPACE
+            )
+
+    return path
+
+
+# Table of strings similar to a scraped table
+def create_table(rows: int, columns: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    data = {
+        f"Column {i}": rng.integers(0, 1_000_000, rows).astype(str)
+        for i in range(columns)
+    }
+    return pd.DataFrame(data)
+
+
+def measure(name: str, save: Callable[[pd.DataFrame, Path], Path], df: pd.DataFrame):
+    with tempfile.TemporaryDirectory() as dir:
+        path = Path(dir) / "table.xlsx"
+        start = time.perf_counter()
+        save(df, path)
+        duration = time.perf_counter() - start
+        size_mb = path.stat().st_size / 1024 / 1024
+    print(f"{name:<30} {duration:>8.2f}s {size_mb:>8.1f} MB")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--columns", type=int, default=10)
+    args = ap.parse_args()
+
+    df = create_table(args.rows, args.columns)
+    print(f"Saving {args.rows} rows x {args.columns} columns")
+    print(f"{'Export':<30} {'Time':>9} {'Size':>11}")
+
+    # Legacy export can not handle more rows than fit in one sheet
+    if args.rows < 1_048_576:
+        measure("to_excel (legacy)", save_excel_legacy, df)
+    measure("xlsxwriter", lambda df, path: save_excel(df, path, False), df)
+    measure("xlsxwriter (constant_memory)", save_excel, df)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# pyright: reportUnknownMemberType=false
+
+# Measure scraper throughput against the local synthetic report (see synthetic_report.py), headless and without a Power BI tenant.
+# Reports rows/sec, number of WebDriver calls, time per phase and peak memory, and checks that the scraped rows are complete.
+# Usage: python -m benchmarks.bench_scrape --rows 5000 --scenario table filter --output bench_results.jsonl
+# Results are appended to the output file (JSON lines) together with the current commit, so changes can be tracked per commit.
+
+import argparse
+import json
+import subprocess
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, Callable, Optional, cast
+
+import pandas as pd
+
+from benchmarks.synthetic_report import (
+    ReportSpec,
+    SyntheticReportServer,
+    column_names,
+    expected_rows,
+)
+from src import metrics
+from src.config import ExtractionMode
+from src.scraper.driver import CustomDriver
+from src.scraper.driver_pool import JS_HEAP_SIZE_SCRIPT
+from src.scraper.powerbi_scraper import PowerBiScraper, ScraperOptions
+
+# Scenarios: What is scraped from the report
+# table: The full table
+# filter: The table filtered on one slicer value
+# sweep: The table once per slicer value (see PowerBiScraper.scrape_sweep)
+SCENARIOS = ["table", "filter", "sweep"]
+FILTER_VALUE = "Region 1"
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    scenario: str
+    rows: int
+    duration: float
+    rows_per_second: float
+    webdriver_calls: int
+    # Python heap (traced allocations) and browser JS heap
+    peak_python_mb: float
+    js_heap_mb: Optional[float]
+    is_complete: bool
+    top_commands: dict[str, int]
+    # Time spent per phase (see src.metrics)
+    phases: dict[str, float]
+
+
+def run_scenario(
+    scenario: str, spec: ReportSpec, options: ScraperOptions
+) -> BenchmarkResult:
+    with SyntheticReportServer(spec) as server:
+        options = replace(
+            options,
+            url=server.url,
+            filter_values=(FILTER_VALUE,) if scenario == "filter" else None,
+        )
+        driver = CustomDriver(options)
+        try:
+            scraper = PowerBiScraper(options, driver)
+            scrape = _get_scrape(scenario, scraper)
+
+            run_metrics = metrics.Metrics()
+            tracemalloc.start()
+            start = time.perf_counter()
+            with metrics.collect(run_metrics):
+                table = scrape()
+            duration = time.perf_counter() - start
+            _, peak_python = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            js_heap = cast(Optional[int], driver.execute_script(JS_HEAP_SIZE_SCRIPT))
+        finally:
+            driver.quit()
+
+    expected = expected_rows(spec, [FILTER_VALUE] if scenario == "filter" else None)
+    if scenario == "sweep":
+        # Rows are grouped by slicer value
+        expected = sorted(expected, key=lambda row: int(row[0].split()[-1]))
+    is_complete = table.equals(pd.DataFrame(expected, columns=column_names(spec)))
+
+    report = run_metrics.to_dict()
+    commands = {
+        timer["labels"]["command"]: timer["calls"]
+        for timer in report["timers"]
+        if timer["name"] == "webdriver_command"
+    }
+    top_commands = dict(sorted(commands.items(), key=lambda c: -c[1])[:5])
+    phases = {
+        _describe_timer(timer): timer["seconds"]
+        for timer in report["timers"]
+        if timer["name"] != "webdriver_command"
+    }
+
+    return BenchmarkResult(
+        scenario,
+        len(table),
+        duration,
+        len(table) / duration if duration else 0,
+        sum(commands.values()),
+        peak_python / 1024 / 1024,
+        js_heap / 1024 / 1024 if js_heap else None,
+        is_complete,
+        top_commands,
+        phases,
+    )
+
+
+# E.g. "wait_for_render[target=table rows]"
+def _describe_timer(timer: dict[str, Any]) -> str:
+    labels = ",".join(f"{k}={v}" for k, v in timer["labels"].items())
+    return f"{timer['name']}[{labels}]" if labels else timer["name"]
+
+
+def _get_scrape(scenario: str, scraper: PowerBiScraper) -> Callable[[], pd.DataFrame]:
+    match scenario:
+        case "sweep":
+            return lambda: pd.concat(
+                [df for _, df in scraper.scrape_sweep()], ignore_index=True
+            )
+        case _:
+            return scraper.scrape
+
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2000)
+    ap.add_argument("--columns", type=int, default=5)
+    ap.add_argument("--visible-rows", type=int, default=20)
+    ap.add_argument("--rows-per-key", type=int, default=1)
+    ap.add_argument("--latency", type=int, default=20, help="Render latency in ms")
+    ap.add_argument("--slicer-values", type=int, default=10)
+    ap.add_argument("--not-embedded", action="store_true")
+    ap.add_argument("--scenario", nargs="+", choices=SCENARIOS, default=["table"])
+    ap.add_argument(
+        "--extraction-mode",
+        choices=[mode.value for mode in ExtractionMode],
+        default=ExtractionMode.BATCH.value,
+    )
+    ap.add_argument("--max-scroll-stride", type=int, default=8)
+    ap.add_argument("--show-browser", action="store_true")
+    ap.add_argument(
+        "--output", type=Path, help="Append results to this JSON lines file"
+    )
+    args = ap.parse_args()
+
+    spec = ReportSpec(
+        rows=args.rows,
+        columns=args.columns,
+        visible_rows=args.visible_rows,
+        rows_per_key=args.rows_per_key,
+        render_latency=args.latency,
+        slicer_values=args.slicer_values,
+        is_embedded=not args.not_embedded,
+    )
+    options = ScraperOptions(
+        url="",
+        is_headless=not args.show_browser,
+        extraction_mode=ExtractionMode(args.extraction_mode),
+        max_scroll_stride=args.max_scroll_stride,
+    )
+    commit = get_commit()
+
+    print(f"Synthetic report: {spec}")
+    print(
+        f"{'Scenario':<10} {'Rows':>8} {'Time':>9} {'Rows/s':>9} {'Calls':>7} {'Python':>9} {'JS heap':>9}  Complete"
+    )
+    for scenario in args.scenario:
+        result = run_scenario(scenario, spec, options)
+        js_heap = f"{result.js_heap_mb:.1f} MB" if result.js_heap_mb else "n/a"
+        print(
+            f"{result.scenario:<10} {result.rows:>8} {result.duration:>8.2f}s {result.rows_per_second:>9.0f} {result.webdriver_calls:>7} {result.peak_python_mb:>6.1f} MB {js_heap:>9}  {'yes' if result.is_complete else 'NO'}"
+        )
+        print(f"{'':<10} Top WebDriver commands: {result.top_commands}")
+        print(
+            f"{'':<10} Phases: { {name: round(seconds, 2) for name, seconds in result.phases.items()} }"
+        )
+
+        if args.output:
+            record = {
+                "commit": commit,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "spec": asdict(spec),
+                "options": {
+                    "extraction_mode": options.extraction_mode.value,
+                    "max_scroll_stride": options.max_scroll_stride,
+                },
+                **asdict(result),
+            }
+            with open(args.output, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
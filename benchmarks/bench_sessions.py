@@ -0,0 +1,149 @@
+# Measure how scrape throughput scales with the number of browser sessions, for the thread-per-job model (usecase.scrape_and_save_batch)
+# and the asyncio model (AsyncScrapeRunner), using the local synthetic report (see synthetic_report.py), headless and without a Power BI tenant.
+# Sessions are started before the timed run, so only scraping and saving are measured, not browser startup.
+# Python CPU time close to the wall time means the process (not the browsers) limits the throughput, so more sessions will not help.
+# Usage: python -m benchmarks.bench_sessions --jobs 16 --sessions 1 2 4 8 --output bench_sessions.jsonl
+
+import argparse
+import asyncio
+import json
+import logging
+import tempfile
+import time
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.bench_scrape import get_commit
+from benchmarks.synthetic_report import ReportSpec, SyntheticReportServer
+from src import usecase
+from src.async_scrape import AsyncScrapeRunner
+from src.config import OutputFormat
+from src.scraper.driver_pool import DriverPool
+from src.scraper.powerbi_scraper import ScraperOptions
+from src.usecase import JobResult, ScrapeJob
+
+# Models: How the jobs are run
+# threads: A thread per running job (scrape_and_save_batch)
+# asyncio: Tasks on an event loop, with the blocking scrapes on executor threads (AsyncScrapeRunner)
+MODELS = ["threads", "asyncio"]
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    model: str
+    sessions: int
+    jobs: int
+    failed_jobs: int
+    rows: int
+    duration: float
+    jobs_per_minute: float
+    rows_per_second: float
+    cpu_seconds: float  # Python process only, not the browsers
+    # Throughput relative to one session of the same model
+    speedup: float = 1.0
+
+
+def run_model(
+    model: str, sessions: int, jobs: list[ScrapeJob], options: ScraperOptions
+) -> BenchmarkResult:
+    driver_pool = DriverPool(sessions)
+    try:
+        driver_pool.warm_up(options)
+        run = _get_run(model, sessions, driver_pool)
+
+        start = time.perf_counter()
+        start_cpu = time.process_time()
+        results = run(jobs)
+        duration = time.perf_counter() - start
+        cpu_seconds = time.process_time() - start_cpu
+    finally:
+        driver_pool.close()
+
+    rows = sum(result.rows for result in results)
+    return BenchmarkResult(
+        model,
+        sessions,
+        len(jobs),
+        sum(1 for result in results if not result.is_success),
+        rows,
+        duration,
+        len(jobs) / duration * 60 if duration else 0,
+        rows / duration if duration else 0,
+        cpu_seconds,
+    )
+
+
+def _get_run(
+    model: str, sessions: int, driver_pool: DriverPool
+) -> Callable[[list[ScrapeJob]], list[JobResult]]:
+    match model:
+        case "asyncio":
+
+            async def run_async(jobs: list[ScrapeJob]) -> list[JobResult]:
+                async with AsyncScrapeRunner(sessions, driver_pool) as runner:
+                    return await runner.scrape_many(jobs)
+
+            return lambda jobs: asyncio.run(run_async(jobs))
+        case _:
+            return lambda jobs: usecase.scrape_and_save_batch(
+                jobs, pool_size=sessions, driver_pool=driver_pool
+            )
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--jobs", type=int, default=16, help="Reports scraped per run")
+    ap.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--model", nargs="+", choices=MODELS, default=MODELS)
+    ap.add_argument("--rows", type=int, default=1000)
+    ap.add_argument("--columns", type=int, default=5)
+    ap.add_argument("--latency", type=int, default=20, help="Render latency in ms")
+    ap.add_argument("--show-browser", action="store_true")
+    ap.add_argument(
+        "--output", type=Path, help="Append results to this JSON lines file"
+    )
+    args = ap.parse_args()
+
+    # Only show warnings, as every job logs its progress
+    logging.basicConfig(level=logging.WARNING)
+    spec = ReportSpec(rows=args.rows, columns=args.columns, render_latency=args.latency)
+    commit = get_commit()
+
+    print(f"Synthetic report: {spec}, {args.jobs} jobs per run")
+    print(
+        f"{'Model':<8} {'Sessions':>8} {'Time':>9} {'Jobs/min':>9} {'Rows/s':>9} {'CPU':>8} {'Speedup':>8}  Failed"
+    )
+    with SyntheticReportServer(spec) as server, tempfile.TemporaryDirectory() as tmp:
+        options = ScraperOptions(url=server.url, is_headless=not args.show_browser)
+        jobs = [
+            ScrapeJob(options, Path(tmp) / f"job_{i}.csv", OutputFormat.CSV)
+            for i in range(args.jobs)
+        ]
+
+        for model in args.model:
+            baseline = None
+            for sessions in sorted(args.sessions):
+                result = run_model(model, sessions, jobs, options)
+                baseline = baseline or result.jobs_per_minute
+                result = replace(
+                    result,
+                    speedup=result.jobs_per_minute / baseline if baseline else 0,
+                )
+                print(
+                    f"{result.model:<8} {result.sessions:>8} {result.duration:>8.2f}s {result.jobs_per_minute:>9.1f} {result.rows_per_second:>9.0f} {result.cpu_seconds:>7.2f}s {result.speedup:>7.2f}x  {result.failed_jobs}"
+                )
+
+                if args.output:
+                    record = {
+                        "commit": commit,
+                        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "spec": asdict(spec),
+                        **asdict(result),
+                    }
+                    with open(args.output, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# Measure the startup time of each mode using `python -X importtime`, and check that no mode loads heavy modules it does not need.
+# Each scenario imports main.py and the modules the mode imports when it starts (see handler.py) in a fresh interpreter.
+# Usage: python -m benchmarks.bench_startup --repeat 5 --max-ms 300 --output bench_results.jsonl
+# Exits with status 1 if a scenario loads a forbidden module or main.py takes longer than --max-ms to import, so it can guard against regressions.
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from benchmarks.bench_scrape import get_commit
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Modules that are slow to import and only needed by some modes
+HEAVY_MODULES = ["pandas", "numpy", "selenium", "tkinter", "xlsxwriter", "click"]
+
+# Scenario: (modules imported, heavy modules that must not be loaded)
+# main: Before the mode is known, e.g. when loading the config
+# gui: Until the window is shown. The scraping modules are loaded in the background afterwards
+SCENARIOS: dict[str, tuple[list[str], list[str]]] = {
+    "main": (["main"], HEAVY_MODULES),
+    "gui": (
+        ["main", "src.gui.gui"],
+        ["pandas", "numpy", "selenium", "xlsxwriter", "click"],
+    ),
+    "console": (["main", "src.usecase"], ["tkinter", "click"]),
+    "service": (["main", "src.service_api", "src.usecase"], ["tkinter", "click"]),
+    "scheduler": (["main", "src.scheduler", "src.usecase"], ["tkinter", "click"]),
+}
+
+
+@dataclass(frozen=True)
+class StartupResult:
+    scenario: str
+    # Medians over the repetitions. Wall time includes interpreter startup
+    import_ms: float
+    wall_ms: float
+    modules: int
+    forbidden_modules: list[str]
+    # Slowest modules to import, not counting the modules they import (ms)
+    top_imports: dict[str, float]
+
+
+# Import the modules in a fresh interpreter.
+# Returns the import time in microseconds of each imported module (not counting the modules it imports), the total import time in microseconds and the wall time in ms
+def run_importtime(modules: list[str]) -> tuple[dict[str, int], int, float]:
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    imported: dict[str, int] = {}
+    total = 0
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:") :].split("|")
+        imported[name.strip()] = int(self_us)
+        # Nested imports are indented below the module importing them
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+    return imported, total, wall_ms
+
+
+def run_scenario(scenario: str, repeat: int, top: int) -> StartupResult:
+    modules, forbidden = SCENARIOS[scenario]
+    import_times: list[float] = []
+    wall_times: list[float] = []
+    imported: dict[str, int] = {}
+    for _ in range(repeat):
+        imported, total, wall_ms = run_importtime(modules)
+        import_times.append(total / 1000)
+        wall_times.append(wall_ms)
+
+    slowest = sorted(imported.items(), key=lambda item: -item[1])[:top]
+    return StartupResult(
+        scenario,
+        statistics.median(import_times),
+        statistics.median(wall_times),
+        len(imported),
+        [
+            module
+            for module in forbidden
+            if any(name == module or name.startswith(f"{module}.") for name in imported)
+        ],
+        {name: round(us / 1000, 1) for name, us in slowest},
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--scenario", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS)
+    )
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--top", type=int, default=5, help="Number of slowest imports")
+    ap.add_argument(
+        "--max-ms", type=float, help="Max import time of main.py (main scenario)"
+    )
+    ap.add_argument(
+        "--output", type=Path, help="Append results to this JSON lines file"
+    )
+    args = ap.parse_args()
+    commit = get_commit()
+
+    print(f"{'Scenario':<10} {'Imports':>9} {'Wall':>9} {'Modules':>8}  Forbidden")
+    is_ok = True
+    for scenario in args.scenario:
+        result = run_scenario(scenario, args.repeat, args.top)
+        print(
+            f"{result.scenario:<10} {result.import_ms:>6.0f} ms {result.wall_ms:>6.0f} ms {result.modules:>8}  {', '.join(result.forbidden_modules) or '-'}"
+        )
+        print(f"{'':<10} Slowest imports (ms): {result.top_imports}")
+
+        if result.forbidden_modules:
+            is_ok = False
+        if scenario == "main" and args.max_ms and result.import_ms > args.max_ms:
+            print(
+                f"main.py took {result.import_ms:.0f} ms to import (max {args.max_ms:.0f} ms)"
+            )
+            is_ok = False
+
+        if args.output:
+            record = {
+                "commit": commit,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "benchmark": "startup",
+                **asdict(result),
+            }
+            with open(args.output, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+    if not is_ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+# A local page imitating a Power BI report with a table visual and a slicer, used to benchmark the scraper without a Power BI tenant.
+# The table renders only the rows in view (like .tableEx) and scrolls when arrow keys are pressed while hovering it.
+# The slicer is a virtualized listbox with a "Select all" item. Selecting values filters the table on its first column.
+# Usage: python -m benchmarks.synthetic_report --rows 10000 (serves the report until stopped)
+
+import argparse
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+
+
+# rows, columns: Size of the table. The first column holds the slicer value of the row
+# visible_rows: Number of rows rendered at a time
+# rows_per_key: Number of rows the table scrolls per arrow key press
+# render_latency: Milliseconds from scrolling/filtering until the new rows are rendered
+# slicer_values: Number of slicer values. Rows are assigned to the values in turn
+# has_select_all: Whether the slicer has a "Select all" item
+# is_embedded: Serve the report in an iframe (like an embedded report) instead of directly (like the Power BI service)
+@dataclass(frozen=True)
+class ReportSpec:
+    rows: int = 1000
+    columns: int = 5
+    visible_rows: int = 20
+    rows_per_key: int = 1
+    render_latency: int = 20
+    slicer_values: int = 10
+    has_select_all: bool = True
+    is_embedded: bool = True
+
+
+def slicer_value(spec: ReportSpec, row: int) -> str:
+    return f"Region {row % spec.slicer_values + 1}"
+
+
+# Cell value of the table (same as the page's cellValue)
+def cell_value(spec: ReportSpec, row: int, column: int) -> str:
+    if column == 0:
+        return slicer_value(spec, row)
+    return f"{(row * 7 + column * 13) % 1000}.{row % 100:02d}"
+
+
+def column_names(spec: ReportSpec) -> list[str]:
+    return ["Region", *(f"Value {i}" for i in range(1, spec.columns))]
+
+
+# Rows the scraper should find when the given slicer values are selected (all rows if none)
+def expected_rows(
+    spec: ReportSpec, values: Optional[list[str]] = None
+) -> list[list[str]]:
+    return [
+        [cell_value(spec, row, column) for column in range(spec.columns)]
+        for row in range(spec.rows)
+        if not values or slicer_value(spec, row) in values
+    ]
+
+
+REPORT_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Synthetic report</title>
+<style>
+body { font-family: sans-serif; font-size: 12px; margin: 0; }
+.page { display: flex; gap: 16px; padding: 16px; }
+.slicer [role="listbox"] { position: relative; width: 180px; height: 200px; overflow-y: auto; border: 1px solid #ccc; }
+.slicer [aria-checked] { position: absolute; left: 0; right: 0; height: 20px; line-height: 20px; padding-left: 4px; cursor: pointer; }
+.slicer [aria-checked="true"] { background: #dde; }
+.tableEx { width: 800px; border: 1px solid #ccc; }
+.row, .columnHeaders { display: flex; height: 20px; line-height: 20px; }
+.main-cell { flex: 1; overflow: hidden; white-space: nowrap; padding: 0 4px; }
+.columnHeaders .main-cell { font-weight: bold; }
+.mid-viewport { overflow: hidden; }
+</style>
+</head>
+<body>
+__LOADED_ELEMENT__
+<div class="page">
+  <div class="visualContainer" aria-label="Slicer">
+    <div class="slicer"><div role="listbox"><div class="spacer"></div></div></div>
+  </div>
+  <div class="visualContainer">
+    <div class="visualTitle">Synthetic table</div>
+    <div class="tableEx" role="grid">
+      <div class="columnHeaders"></div>
+      <div class="mid-viewport"><div></div></div>
+    </div>
+  </div>
+</div>
+<script>
+const SPEC = __SPEC__;
+const ITEM_HEIGHT = 20;
+const ROW_HEIGHT = 20;
+const SELECT_ALL = "Select all";
+
+const values = Array.from({ length: SPEC.slicer_values }, (_, i) => `Region ${i + 1}`);
+const selected = new Set();
+const table = { rows: [], top: 0 };
+let hovered = null;
+
+function cellValue(row, column) {
+    if (column === 0) {
+        return values[row % SPEC.slicer_values];
+    }
+    return `${(row * 7 + column * 13) % 1000}.${String(row % 100).padStart(2, "0")}`;
+}
+
+// Runs the update once after the render latency, however many times it is scheduled meanwhile
+function scheduler(update) {
+    let pending = false;
+    return () => {
+        if (pending) {
+            return;
+        }
+        pending = true;
+        setTimeout(() => {
+            pending = false;
+            update();
+        }, SPEC.render_latency);
+    };
+}
+
+// Table
+const tableEl = document.querySelector(".tableEx");
+const rowContainer = tableEl.querySelector(".mid-viewport > div");
+tableEl.querySelector(".mid-viewport").style.height = `${SPEC.visible_rows * ROW_HEIGHT}px`;
+const headerRow = tableEl.querySelector(".columnHeaders");
+for (let column = 0; column < SPEC.columns; column++) {
+    const header = document.createElement("div");
+    header.className = "main-cell";
+    header.setAttribute("role", "columnheader");
+    header.textContent = column === 0 ? "Region" : `Value ${column}`;
+    headerRow.appendChild(header);
+}
+
+function filterTable() {
+    const isFiltered = selected.size > 0 && selected.size < values.length;
+    table.rows = [];
+    for (let row = 0; row < SPEC.rows; row++) {
+        if (!isFiltered || selected.has(cellValue(row, 0))) {
+            table.rows.push(row);
+        }
+    }
+    table.top = 0;
+    // Row count including the header row, as exposed by Power BI tables
+    tableEl.setAttribute("aria-rowcount", String(table.rows.length + 1));
+    renderTable();
+}
+
+function renderTable() {
+    const fragment = document.createDocumentFragment();
+    const end = Math.min(table.rows.length, table.top + SPEC.visible_rows);
+    for (let i = table.top; i < end; i++) {
+        const rowEl = document.createElement("div");
+        rowEl.className = "row";
+        rowEl.setAttribute("role", "row");
+        rowEl.setAttribute("row-index", String(i));
+        for (let column = 0; column < SPEC.columns; column++) {
+            const cell = document.createElement("div");
+            cell.className = "main-cell";
+            cell.textContent = cellValue(table.rows[i], column);
+            rowEl.appendChild(cell);
+        }
+        fragment.appendChild(rowEl);
+    }
+    rowContainer.replaceChildren(fragment);
+}
+
+const scheduleTableRender = scheduler(renderTable);
+const scheduleFilter = scheduler(filterTable);
+
+function scrollTable(rows) {
+    const maxTop = Math.max(0, table.rows.length - SPEC.visible_rows);
+    table.top = Math.min(maxTop, Math.max(0, table.top + rows));
+    scheduleTableRender();
+}
+
+// Slicer
+const listbox = document.querySelector("[role='listbox']");
+const items = SPEC.has_select_all ? [SELECT_ALL, ...values] : values;
+listbox.querySelector(".spacer").style.height = `${items.length * ITEM_HEIGHT}px`;
+
+function selectAllState() {
+    if (selected.size === values.length) {
+        return "true";
+    }
+    return selected.size ? "mixed" : "false";
+}
+
+function renderSlicer() {
+    const first = Math.floor(listbox.scrollTop / ITEM_HEIGHT);
+    // Only items fully in view are rendered
+    const last = Math.min(items.length, Math.floor((listbox.scrollTop + listbox.clientHeight) / ITEM_HEIGHT));
+    const fragment = document.createDocumentFragment();
+    for (let i = first; i < last; i++) {
+        const item = document.createElement("div");
+        const isSelectAll = items[i] === SELECT_ALL;
+        item.className = isSelectAll ? "slicerItemContainer selectAllItem" : "slicerItemContainer";
+        item.style.top = `${i * ITEM_HEIGHT}px`;
+        item.setAttribute("aria-label", items[i]);
+        item.setAttribute("aria-checked", isSelectAll ? selectAllState() : String(selected.has(items[i])));
+        item.textContent = items[i];
+        fragment.appendChild(item);
+    }
+    listbox.querySelectorAll("[aria-checked]").forEach((item) => item.remove());
+    listbox.appendChild(fragment);
+}
+
+function updateCheckedState() {
+    for (const item of listbox.querySelectorAll("[aria-checked]")) {
+        const value = item.getAttribute("aria-label");
+        item.setAttribute("aria-checked", value === SELECT_ALL ? selectAllState() : String(selected.has(value)));
+    }
+}
+
+const scheduleSlicerRender = scheduler(renderSlicer);
+listbox.addEventListener("scroll", scheduleSlicerRender);
+
+listbox.addEventListener("click", (event) => {
+    const item = event.target.closest("[aria-checked]");
+    if (!item) {
+        return;
+    }
+    const value = item.getAttribute("aria-label");
+    if (value === SELECT_ALL) {
+        const isAllSelected = selected.size === values.length;
+        selected.clear();
+        if (!isAllSelected) {
+            values.forEach((v) => selected.add(v));
+        }
+    } else if (event.ctrlKey) {
+        selected.has(value) ? selected.delete(value) : selected.add(value);
+    } else {
+        const isOnlySelected = selected.size === 1 && selected.has(value);
+        selected.clear();
+        if (!isOnlySelected) {
+            selected.add(value);
+        }
+    }
+    updateCheckedState();
+    scheduleFilter();
+});
+
+// Arrow keys scroll the visual under the mouse
+document.addEventListener("mouseover", (event) => {
+    hovered = event.target;
+});
+document.addEventListener("keydown", (event) => {
+    const direction = { ArrowDown: 1, ArrowUp: -1 }[event.key];
+    if (!direction || !hovered) {
+        return;
+    }
+    if (hovered.closest(".tableEx")) {
+        scrollTable(direction * SPEC.rows_per_key);
+    } else if (hovered.closest("[role='listbox']")) {
+        listbox.scrollTop += direction * ITEM_HEIGHT;
+    }
+    event.preventDefault();
+});
+
+filterTable();
+renderSlicer();
+</script>
+</body>
+</html>
+"""
+
+EMBED_HTML = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Embedded synthetic report</title></head>
+<body style="margin: 0">
+<iframe src="/report.html" style="width: 1100px; height: 700px; border: 0"></iframe>
+</body>
+</html>
+"""
+
+
+def render_pages(spec: ReportSpec) -> dict[str, str]:
+    # The Power BI service marks a loaded report with this element. Embedded reports are detected by the iframe instead
+    loaded_element = (
+        "" if spec.is_embedded else '<transform class="bringToFront"></transform>'
+    )
+    report = REPORT_HTML.replace("__SPEC__", json.dumps(asdict(spec))).replace(
+        "__LOADED_ELEMENT__", loaded_element
+    )
+    pages = {"/report.html": report}
+    if spec.is_embedded:
+        pages["/index.html"] = EMBED_HTML
+    else:
+        pages["/index.html"] = report
+    return pages
+
+
+# Serves the synthetic report on a free local port while in use as a context manager
+class SyntheticReportServer:
+    def __init__(self, spec: ReportSpec) -> None:
+        self.spec = spec
+        pages = {
+            path: html.encode("utf-8") for path, html in render_pages(spec).items()
+        }
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = pages.get(self.path.split("?")[0])
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/index.html"
+
+    def __enter__(self) -> "SyntheticReportServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_: Any):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1000)
+    ap.add_argument("--columns", type=int, default=5)
+    ap.add_argument("--rows-per-key", type=int, default=1)
+    ap.add_argument("--latency", type=int, default=20, help="Render latency in ms")
+    ap.add_argument("--not-embedded", action="store_true")
+    args = ap.parse_args()
+
+    spec = ReportSpec(
+        rows=args.rows,
+        columns=args.columns,
+        rows_per_key=args.rows_per_key,
+        render_latency=args.latency,
+        is_embedded=not args.not_embedded,
+    )
+    with SyntheticReportServer(spec) as server:
+        print(f"Serving synthetic report at {server.url} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,24 @@ import logging
 
 import src.handler as handler
 from src import config, utils
+from src.cancellation import ScrapeCancelledError
 from src.config import AppConfig, Mode
 
 logger = logging.getLogger(__name__)
 
 
-def main(app_config: AppConfig):
+def main(app_config: AppConfig, resume: bool = False):
     logger.info(f"Running in {app_config.mode} mode")
 
     match app_config.mode:
         case Mode.GUI:
             handler.use_gui(app_config)
         case Mode.CONSOLE:
-            handler.use_console(app_config)
+            handler.use_console(app_config, resume)
+        case Mode.SERVICE:
+            handler.use_service(app_config)
+        case Mode.SCHEDULER:
+            handler.use_scheduler(app_config)
 
     # input("Press enter to exit")
 
@@ -25,9 +30,12 @@ if __name__ == "__main__":
     try:
         config_path = utils.get_config_path_from_args()
         app_config = config.load_config(config_path)
-        main(app_config)
+        main(app_config, resume=utils.get_resume_from_args())
     except KeyboardInterrupt:
         pass
+    # Cancelled (Ctrl+C) before any rows were scraped
+    except ScrapeCancelledError as e:
+        logger.warning(f"{e}")
     except Exception as e:
         logger.exception(f"Unhandled exception occurred: {e}", exc_info=True)
         raise e
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from src import metrics, usecase
+from src.cancellation import CancellationToken, ScrapeCancelledError
+from src.config import OutputFormat
+from src.progress import ProgressListener
+from src.save import SaveOptions
+from src.scraper.driver_pool import DriverPool
+from src.scraper.powerbi_scraper import ScraperOptions
+from src.usecase import JobResult, ScrapeJob, ScrapeResult
+
+logger = logging.getLogger(__name__)
+
+
+# Asyncio API for scraping reports, so an asyncio application can drive many browser sessions from one event loop.
+# Selenium calls block until the browser answers, so each scrape runs on a thread of its own executor, and a semaphore lets at most 'sessions' scrapes run at a time.
+# While a scrape waits for its browser (page loads, render waits, saving), the other scrapes and the event loop keep running.
+# Scrapes waiting for a session do not take a thread, and can be cancelled before they start.
+# driver_pool: Pool of browser sessions shared by the scrapes. If None, a pool of 'sessions' sessions is created and closed by aclose
+#
+# async with AsyncScrapeRunner(sessions=4) as runner:
+#     result = await runner.scrape(options, Path("sales.csv"), OutputFormat.CSV)
+class AsyncScrapeRunner:
+    def __init__(
+        self,
+        sessions: int = 2,
+        driver_pool: Optional[DriverPool] = None,
+    ) -> None:
+        self._sessions = sessions
+        self._is_pool_owned = driver_pool is None
+        self._driver_pool = driver_pool or DriverPool(sessions)
+        self._executor = ThreadPoolExecutor(sessions, thread_name_prefix="async-scrape")
+        self._semaphore = asyncio.Semaphore(sessions)
+
+    @property
+    def driver_pool(self) -> DriverPool:
+        return self._driver_pool
+
+    async def __aenter__(self) -> "AsyncScrapeRunner":
+        return self
+
+    async def __aexit__(self, *_: Any):
+        await self.aclose()
+
+    # Wait for the running scrapes and close the browser sessions (if the pool was created by the runner)
+    async def aclose(self):
+        await asyncio.to_thread(self._executor.shutdown, wait=True)
+        if self._is_pool_owned:
+            await asyncio.to_thread(self._driver_pool.close)
+
+    # Scrape the table and save it (see usecase.scrape_and_save for the options).
+    # If the task is cancelled, the scrape is cancelled and saves the rows scraped so far before CancelledError is raised.
+    # on_progress: Called on the thread of the scrape, not on the event loop (use loop.call_soon_threadsafe to update e.g. a UI)
+    async def scrape(
+        self,
+        options: ScraperOptions,
+        save_path: Path,
+        save_format: OutputFormat,
+        max_rows: Optional[int] = None,
+        timeout: Optional[float] = None,
+        keep_table: bool = False,
+        checkpoint_interval: Optional[float] = None,
+        save_options: Optional[SaveOptions] = None,
+        cache_dir: Optional[Path] = None,
+        sweep: Optional[usecase.SweepOptions] = None,
+        incremental: Optional[usecase.IncrementalOptions] = None,
+        on_progress: Optional[ProgressListener] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> ScrapeResult:
+        token = cancel_token or CancellationToken()
+        async with self._semaphore:
+            token.raise_if_cancelled()
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._executor,
+                # Record to the metrics collecting in the calling task
+                metrics.bind(
+                    lambda: usecase.scrape_and_save(
+                        options,
+                        save_path,
+                        save_format,
+                        max_rows=max_rows,
+                        timeout=timeout,
+                        driver_pool=self._driver_pool,
+                        keep_table=keep_table,
+                        checkpoint_interval=checkpoint_interval,
+                        save_options=save_options,
+                        cache_dir=cache_dir,
+                        sweep=sweep,
+                        incremental=incremental,
+                        on_progress=on_progress,
+                        cancel_token=token,
+                    )
+                ),
+            )
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                token.cancel()
+                # The thread can not be interrupted, so wait for the scrape to stop and save its rows
+                await asyncio.wait([future])
+                raise
+
+    # Scrape the jobs concurrently, at most 'sessions' at a time. A failed job does not stop the others
+    async def scrape_many(
+        self,
+        jobs: Iterable[ScrapeJob],
+        max_rows: Optional[int] = None,
+        timeout: Optional[float] = None,
+        checkpoint_interval: Optional[float] = None,
+        save_options: Optional[SaveOptions] = None,
+        cache_dir: Optional[Path] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> list[JobResult]:
+        async def run_job(job: ScrapeJob) -> JobResult:
+            start = time.perf_counter()
+            try:
+                result = await self.scrape(
+                    job.options,
+                    job.save_path,
+                    job.save_format,
+                    max_rows=max_rows,
+                    timeout=timeout,
+                    checkpoint_interval=checkpoint_interval,
+                    save_options=save_options,
+                    cache_dir=cache_dir,
+                    cancel_token=cancel_token,
+                )
+                return JobResult(
+                    job,
+                    is_success=not result.is_cancelled,
+                    attempts=1,
+                    duration=time.perf_counter() - start,
+                    rows=result.rows,
+                    error="Cancelled" if result.is_cancelled else None,
+                )
+            except ScrapeCancelledError:
+                error = "Cancelled"
+            except Exception as e:
+                logger.exception(f"Job failed for {job.options.url}: {e}")
+                error = str(e)
+            return JobResult(
+                job,
+                is_success=False,
+                attempts=1,
+                duration=time.perf_counter() - start,
+                error=error,
+            )
+
+        jobs = list(jobs)
+        logger.info(f"Scraping {len(jobs)} reports using {self._sessions} sessions")
+        return list(await asyncio.gather(*(run_job(job) for job in jobs)))
@@ -0,0 +1,139 @@
+# pyright: reportUnknownMemberType=false
+
+import hashlib
+import json
+import logging
+import shutil
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from src.fingerprint import TableFingerprint
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE_NAME = "index.json"
+TABLE_FILE_NAME = "table.csv"
+
+# A scraped table: (title, table)
+NamedTable = tuple[str, pd.DataFrame]
+
+
+# Keeps the tables scraped from each report page on disk together with a hash of the page content,
+# so a page can be skipped on the next run if its content has not changed.
+# Each page is stored in its own directory containing an index file and a CSV file per table.
+class PageCache:
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+
+    # Tables of the page, if the page has been cached with the same content hash
+    def get(self, url: str, page: str, content_hash: str) -> Optional[list[NamedTable]]:
+        page_dir = self._get_page_dir(url, page)
+        index_path = page_dir / INDEX_FILE_NAME
+        if not index_path.exists():
+            return None
+
+        try:
+            index = json.loads(index_path.read_text(encoding="utf-8"))
+            if index["content_hash"] != content_hash:
+                logger.debug(f"Page '{page}' has changed since it was cached")
+                return None
+            return [
+                (
+                    table["title"],
+                    # Read all values as text, the same as when scraped
+                    pd.read_csv(
+                        page_dir / table["file"], dtype=str, keep_default_na=False
+                    ),
+                )
+                for table in index["tables"]
+            ]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring invalid cache of page '{page}': {e}")
+            return None
+
+    def put(self, url: str, page: str, content_hash: str, tables: list[NamedTable]):
+        page_dir = self._get_page_dir(url, page)
+        # Remove tables of the previous version of the page
+        shutil.rmtree(page_dir, ignore_errors=True)
+        page_dir.mkdir(parents=True)
+
+        index_tables: list[dict[str, str]] = []
+        for i, (title, df) in enumerate(tables):
+            file_name = f"table_{i + 1}.csv"
+            df.to_csv(page_dir / file_name, index=False)
+            index_tables.append({"title": title, "file": file_name})
+
+        # Index is written last, so an interrupted write is not used as a valid cache
+        index = {
+            "url": url,
+            "page": page,
+            "content_hash": content_hash,
+            "tables": index_tables,
+        }
+        (page_dir / INDEX_FILE_NAME).write_text(json.dumps(index), encoding="utf-8")
+        logger.debug(f"Cached {len(tables)} tables of page '{page}' in {page_dir}")
+
+    def _get_page_dir(self, url: str, page: str) -> Path:
+        key = hashlib.sha256(f"{url}\n{page}".encode("utf-8")).hexdigest()[:16]
+        return self.directory / "pages" / key
+
+
+# Keeps the fingerprint and rows of the last scrape of each report and filter state on disk,
+# so an unchanged table can be skipped and a changed table can be compared with the previous version (see fingerprint.py).
+# Each table is stored in its own directory containing an index file with the fingerprint and a CSV file with the rows.
+class FingerprintCache:
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+
+    # Fingerprint of the last scrape of the report with the same filter state
+    def get(self, url: str, filter_state: str) -> Optional[TableFingerprint]:
+        index_path = self._get_table_dir(url, filter_state) / INDEX_FILE_NAME
+        if not index_path.exists():
+            return None
+
+        try:
+            index = json.loads(index_path.read_text(encoding="utf-8"))
+            return TableFingerprint(**index["fingerprint"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring invalid fingerprint of {url}: {e}")
+            return None
+
+    # Rows of the last scrape, read as text the same as when scraped
+    def load_table(self, url: str, filter_state: str) -> Optional[pd.DataFrame]:
+        table_path = self._get_table_dir(url, filter_state) / TABLE_FILE_NAME
+        try:
+            return pd.read_csv(table_path, dtype=str, keep_default_na=False)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read cached table of {url}: {e}")
+            return None
+
+    def put(
+        self,
+        url: str,
+        filter_state: str,
+        fingerprint: TableFingerprint,
+        df: pd.DataFrame,
+    ):
+        table_dir = self._get_table_dir(url, filter_state)
+        table_dir.mkdir(parents=True, exist_ok=True)
+        index_path = table_dir / INDEX_FILE_NAME
+        # Remove the index first, so an interrupted write is not used as a valid cache
+        index_path.unlink(missing_ok=True)
+
+        df.to_csv(table_dir / TABLE_FILE_NAME, index=False)
+        index = {
+            "url": url,
+            "filter_state": filter_state,
+            "fingerprint": asdict(fingerprint),
+        }
+        index_path.write_text(json.dumps(index), encoding="utf-8")
+        logger.debug(
+            f"Cached fingerprint of {fingerprint.row_count} rows in {table_dir}"
+        )
+
+    def _get_table_dir(self, url: str, filter_state: str) -> Path:
+        key = hashlib.sha256(f"{url}\n{filter_state}".encode("utf-8")).hexdigest()[:16]
+        return self.directory / "tables" / key
@@ -0,0 +1,82 @@
+import logging
+import signal
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Generator
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeCancelledError(Exception):
+    pass
+
+
+# Cooperative cancellation of a running scrape. cancel can be called from any thread (e.g. by a Stop button or a signal handler).
+# The scrape checks the token between steps, e.g. before each scroll step, and stops with the rows scraped so far.
+# Callbacks registered with on_cancel are called once when cancelled, e.g. to interrupt a driver call that does not return.
+class CancellationToken:
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        logger.info("Cancelling scrape...")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Cancel callback failed: {e}")
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise ScrapeCancelledError("Scrape was cancelled")
+
+    # Wait until cancelled or the timeout has passed. Returns whether cancelled
+    def wait(self, timeout: float) -> bool:
+        return self._event.wait(timeout)
+
+    # Call the callback when cancelled (immediately if already cancelled). Returns a function that unregisters the callback
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+
+        callback()
+        return lambda: None
+
+    def _remove(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+# Cancel the token on the first Ctrl+C instead of raising KeyboardInterrupt, so the scrape can save its rows and close the browser.
+# A second Ctrl+C raises KeyboardInterrupt as usual. Must be used from the main thread
+@contextmanager
+def cancel_on_interrupt(
+    token: CancellationToken,
+) -> Generator[CancellationToken, None, None]:
+    def on_interrupt(signum: int, frame: Any):
+        logger.warning(
+            "Interrupted, stopping the scrape and saving the rows scraped so far. Press Ctrl+C again to exit immediately"
+        )
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        token.cancel()
+
+    previous = signal.signal(signal.SIGINT, on_interrupt)
+    try:
+        yield token
+    finally:
+        signal.signal(signal.SIGINT, previous)
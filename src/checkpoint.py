@@ -0,0 +1,108 @@
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Optional
+
+from src.scraper.table_scraper import IndexedRow
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+
+# Rows restored from a checkpoint. Only rows up to the first missing row index are kept.
+@dataclass(frozen=True)
+class CheckpointData:
+    columns: list[str]
+    rows: list[IndexedRow]
+
+    # Highest row index for which all rows up to and including it have been scraped (-1 if no rows)
+    @property
+    def last_row_index(self) -> int:
+        return self.rows[-1][0] if self.rows else -1
+
+
+# Periodically saves scraped rows to a local file, so a failed scrape can be resumed instead of starting over.
+# File format: JSON lines. First line is the list of column headers, following lines are [row_index, [cell, ...]]
+class Checkpoint:
+    def __init__(self, path: Path, interval: float = 30) -> None:
+        self.path = path
+        self._interval = interval
+        self._pending: list[IndexedRow] = []
+        self._last_flush = time.monotonic()
+        self._file: Optional[IO[str]] = None
+
+    # Checkpoint file used when saving to the given output path
+    @staticmethod
+    def for_output(output_path: Path, interval: float = 30) -> "Checkpoint":
+        return Checkpoint(
+            output_path.with_name(output_path.name + CHECKPOINT_SUFFIX), interval
+        )
+
+    def load(self) -> Optional[CheckpointData]:
+        if not self.path.exists():
+            logger.info(f"No checkpoint found at {self.path}")
+            return None
+
+        rows: dict[int, list[str]] = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            columns: list[str] = json.loads(f.readline())
+            for line in f:
+                try:
+                    row_index, row = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line may be incomplete if the program was killed while writing
+                    logger.debug("Ignoring incomplete line in checkpoint")
+                    break
+                rows[row_index] = row
+
+        # Keep the contiguous rows from index 0
+        contiguous: list[IndexedRow] = []
+        while len(contiguous) in rows:
+            contiguous.append((len(contiguous), rows[len(contiguous)]))
+
+        logger.info(
+            f"Loaded checkpoint with {len(contiguous)} contiguous rows from {self.path}"
+        )
+        return CheckpointData(columns, contiguous)
+
+    # Start a new checkpoint file containing the given columns and (already scraped) rows
+    def start(self, columns: list[str], rows: Optional[list[IndexedRow]] = None):
+        self.close()
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write(json.dumps(columns) + "\n")
+        self._pending = list(rows or [])
+        self.flush()
+
+    # Add rows to the checkpoint. Rows are written to the file at most every 'interval' seconds
+    def record(self, rows: list[IndexedRow]):
+        self._pending.extend(rows)
+        if time.monotonic() - self._last_flush >= self._interval:
+            self.flush()
+
+    def flush(self):
+        if self._file is None:
+            return
+        if self._pending:
+            self._file.writelines(
+                json.dumps([row_index, row]) + "\n" for row_index, row in self._pending
+            )
+            logger.debug(f"Checkpoint saved ({len(self._pending)} new rows)")
+            self._pending = []
+        self._file.flush()
+        self._last_flush = time.monotonic()
+
+    # Write pending rows and close the file. The checkpoint is kept on disk
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+    # Remove the checkpoint e.g. when the scrape has completed
+    def delete(self):
+        self.close()
+        self.path.unlink(missing_ok=True)
@@ -1,20 +1,91 @@
+# pyright: reportUnknownVariableType=false
+
+import importlib.util
 from enum import Enum
 from pathlib import Path
-from typing import Optional
+from typing import Annotated, Optional
 
 import yaml
-from click import Option
-from pydantic import BaseModel, HttpUrl, ValidationError
+from pydantic import (
+    AfterValidator,
+    BaseModel,
+    Field,
+    HttpUrl,
+    ValidationError,
+    field_validator,
+    model_validator,
+)
+
+from src.cron import CronExpression
 
 
 class Mode(Enum):
     GUI = "gui"
     CONSOLE = "console"
+    SERVICE = "service"
+    SCHEDULER = "scheduler"
 
 
 class OutputFormat(Enum):
     CSV = "csv"
     EXCEL = "excel"
+    PARQUET = "parquet"
+    FEATHER = "feather"  # Arrow IPC
+
+
+# Output formats that require the optional pyarrow dependency (pip install pyarrow)
+PYARROW_FORMATS = (OutputFormat.PARQUET, OutputFormat.FEATHER)
+
+
+# Check that the dependencies of the output format are installed, so a scrape is not lost because it can not be saved
+def check_output_format(format: OutputFormat) -> OutputFormat:
+    if format in PYARROW_FORMATS and importlib.util.find_spec("pyarrow") is None:
+        raise ValueError(
+            f"Saving as {format.value} requires pyarrow. Install it with: pip install pyarrow"
+        )
+    return format
+
+
+# Output format that is checked when the config is loaded
+CheckedOutputFormat = Annotated[OutputFormat, AfterValidator(check_output_format)]
+
+
+class ParquetCompression(Enum):
+    SNAPPY = "snappy"
+    GZIP = "gzip"
+    BROTLI = "brotli"
+    ZSTD = "zstd"
+    NONE = "none"
+
+
+# Locale used to parse formatted numbers and dates (same codes as the GUI languages)
+class Locale(Enum):
+    EN = "en"
+    DA = "da"
+
+
+# How the table is scraped
+# dom: Scroll the table and read the rendered rows
+# network: Read the rows from the data responses Power BI loads the table from (faster, but values are unformatted, e.g. 1234.5 instead of "1,234.50")
+class ScrapeEngine(Enum):
+    DOM = "dom"
+    NETWORK = "network"
+
+
+# How table rows are read from the page
+# batch: Read all visible rows using a single script call per scroll step (fast)
+# per_element: Read each row and cell using separate WebDriver calls (slow, but may be used as a fallback)
+class ExtractionMode(Enum):
+    BATCH = "batch"
+    PER_ELEMENT = "per_element"
+
+
+# How the tables of a filter sweep are saved
+# combined: One table with a column holding the filter value of each row
+# partitioned: A table per filter value (sheets for excel, files for other formats)
+class SweepOutput(Enum):
+    COMBINED = "combined"
+    PARTITIONED = "partitioned"
 
 
 class GuiDefaultValues(BaseModel):
@@ -30,19 +101,217 @@ class GuiConfig(BaseModel):
     default_values: GuiDefaultValues = GuiDefaultValues()
 
 
-class ConsoleConfig(BaseModel):
+class ConsoleJobConfig(BaseModel):
     url: HttpUrl
+    output_format: CheckedOutputFormat = OutputFormat.EXCEL
+    output_path: Path
+
+
+class ConsoleConfig(BaseModel):
+    url: Optional[HttpUrl] = None
     is_headless: bool = True
-    output_format: OutputFormat = OutputFormat.EXCEL
+    output_format: CheckedOutputFormat = OutputFormat.EXCEL
     output_path: Path = Path("output.xlsx").absolute()
+    jobs: list[ConsoleJobConfig] = []
+
+    @model_validator(mode="after")
+    def _check_has_url_or_jobs(self) -> "ConsoleConfig":
+        if self.url is None and not self.jobs:
+            raise ValueError("Either url or jobs must be specified")
+        return self
+
+
+# Settings used when scraping multiple reports in one run
+# pool_size: Max number of reports scraped concurrently (i.e. number of browsers open at the same time)
+# job_timeout: Max number of seconds a single scrape attempt may take before it is aborted
+# max_retries: Number of times a failed scrape is retried
+class BatchConfig(BaseModel):
+    pool_size: int = Field(default=2, ge=1)
+    job_timeout: Optional[float] = None
+    max_retries: int = Field(default=1, ge=0)
+
+
+# Browser sessions are kept open and reused between scrapes to avoid browser startup time
+# max_uses: Number of scrapes after which a browser session is restarted
+# max_memory_mb: Restart a browser session if its memory usage exceeds this limit
+# is_prewarmed: Start a browser session when the program starts (GUI only)
+class SessionPoolConfig(BaseModel):
+    max_uses: int = Field(default=20, ge=1)
+    max_memory_mb: Optional[int] = 1024
+    is_prewarmed: bool = False
+
+
+# Scrape the table once per value of the slicer
+# values: Slicer values to scrape, or None for all values
+# column_name: Name of the column holding the filter value (combined output only)
+# sessions: Number of browser sessions the values are split across
+class SweepConfig(BaseModel):
+    values: Optional[list[str]] = None
+    column_name: str = "Filter value"
+    output: SweepOutput = SweepOutput.COMBINED
+    sessions: int = Field(default=1, ge=1)
+
+
+# Skip saving the table if it has not changed since the last run (tables are compared using fingerprints kept in cache_dir)
+# probe_rows: Stop scraping as soon as this many rows match the first rows of the last run and the table has as many rows as in the last run (0 to always scrape the full table).
+# Only used if the table visual exposes its row count, otherwise the full table is scraped
+# write_diff: Save only the rows added and removed since the last run
+# change_column: Name of the column marking rows of the diff as added or removed
+class IncrementalConfig(BaseModel):
+    probe_rows: int = Field(default=100, ge=0)
+    write_diff: bool = False
+    change_column: str = "Change"
+
+
+# Run as a long-running service accepting scrape jobs over a local HTTP API (see service_api.py)
+# host, port: Address the API listens on. Keep the host at 127.0.0.1 unless the API should be reachable from other machines
+# workers: Max number of jobs scraped concurrently. A warm browser session is kept open per worker
+# max_queue_size: Max number of jobs waiting to be scraped. New jobs are rejected while the queue is full
+# output_dir: Jobs save their output below this directory
+# max_finished_jobs: Number of finished jobs kept for status requests and stats
+# job_timeout: Max number of seconds a single job may take before it is aborted
+class ServiceConfig(BaseModel):
+    host: str = "127.0.0.1"
+    port: int = Field(default=8765, ge=0, le=65535)
+    workers: int = Field(default=2, ge=1)
+    is_headless: bool = True
+    max_queue_size: int = Field(default=100, ge=1)
+    output_dir: Path = Path("output")
+    max_finished_jobs: int = Field(default=1000, ge=1)
+    job_timeout: Optional[float] = Field(default=None, gt=0)
+
+
+# A job run by the scheduler. Filter settings and max_rows override the settings of the config for this job only.
+# name: Unique name of the job, used in logs and the run history
+# cron: When the job runs, e.g. "0 6 * * mon-fri" (see CronExpression)
+# output_path: Path of the output file. May contain strftime codes, which are replaced with the scheduled time of the run, e.g. "output/sales_%Y-%m-%d.csv"
+class ScheduledJobConfig(BaseModel):
+    name: str
+    cron: str
+    url: HttpUrl
+    output_path: Path
+    output_format: CheckedOutputFormat = OutputFormat.EXCEL
+    filter_values: Optional[list[str]] = None
+    should_uncheck_filter: Optional[bool] = None
+    max_rows: Optional[int] = Field(default=None, gt=0)
+
+    @field_validator("cron")
+    @classmethod
+    def _check_cron(cls, value: str) -> str:
+        CronExpression.parse(value)
+        return value
+
+
+# Run scheduled jobs in a single long-running process (see scheduler.py)
+# workers: Max number of jobs scraped concurrently. A warm browser session is kept open per worker
+# max_jitter: Each run starts a random number of seconds (up to max_jitter) after its scheduled time, so jobs scheduled at the same time do not all start at once
+# job_timeout: Max number of seconds a single run may take before it is aborted
+# history_path: File keeping the durations and row counts of the last runs of each job (history_size runs per job), or None to only keep them in memory
+class SchedulerConfig(BaseModel):
+    workers: int = Field(default=2, ge=1)
+    is_headless: bool = True
+    max_jitter: float = Field(default=30, ge=0)
+    job_timeout: Optional[float] = Field(default=None, gt=0)
+    history_path: Optional[Path] = Path("scheduler_history.json")
+    history_size: int = Field(default=100, ge=1)
+    jobs: list[ScheduledJobConfig] = Field(min_length=1)
+
+    @model_validator(mode="after")
+    def _check_job_names_are_unique(self) -> "SchedulerConfig":
+        names = [job.name for job in self.jobs]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Job names must be unique: {', '.join(duplicates)}")
+        return self
+
+
+# A metrics report (phase timers, WebDriver calls, rows per scroll etc.) is logged at the end of each run
+# json_path: Also write the report to this JSON file
+# prometheus_path: Also write the report in the Prometheus text format, e.g. for the textfile collector of the node exporter
+class MetricsConfig(BaseModel):
+    json_path: Optional[Path] = None
+    prometheus_path: Optional[Path] = None
 
 
 class AppConfig(BaseModel):
     mode: Mode
     max_rows: Optional[int] = None
     should_uncheck_filter: bool = False
+    filter_values: Optional[list[str]] = None
+    engine: ScrapeEngine = ScrapeEngine.DOM
+    scrape_all_tables: bool = False
+    scrape_all_pages: bool = False
+    sweep: Optional[SweepConfig] = None
+    incremental: Optional[IncrementalConfig] = None
+    cache_dir: Optional[Path] = Path(".cache")
+    extraction_mode: ExtractionMode = ExtractionMode.BATCH
+    max_scroll_stride: int = Field(default=8, ge=1)
+    idle_window: float = Field(default=0.05, ge=0)
+    render_timeout: float = Field(default=2.0, gt=0)
+    checkpoint_interval: Optional[float] = Field(default=30, gt=0)
+    infer_types: bool = False
+    locale: Locale = Locale.EN
+    parquet_compression: ParquetCompression = ParquetCompression.SNAPPY
     gui: GuiConfig = GuiConfig()
     console: Optional[ConsoleConfig] = None
+    batch: BatchConfig = BatchConfig()
+    session_pool: SessionPoolConfig = SessionPoolConfig()
+    service: ServiceConfig = ServiceConfig()
+    scheduler: Optional[SchedulerConfig] = None
+    metrics: MetricsConfig = MetricsConfig()
+
+    # Whether a single table is scraped, i.e. not scrape_all_tables, scrape_all_pages or sweep.
+    # Checkpoints (and resuming) and incremental are only supported for a single table
+    @property
+    def is_single_table(self) -> bool:
+        return not (self.scrape_all_tables or self.scrape_all_pages or self.sweep)
+
+    @model_validator(mode="after")
+    def _check_engine_supports_all_tables(self) -> "AppConfig":
+        if (
+            self.scrape_all_tables or self.scrape_all_pages
+        ) and self.engine == ScrapeEngine.NETWORK:
+            raise ValueError(
+                "scrape_all_tables and scrape_all_pages are not supported by the network engine"
+            )
+        return self
+
+    @model_validator(mode="after")
+    def _check_sweep_options(self) -> "AppConfig":
+        if self.sweep is None:
+            return self
+        if self.engine == ScrapeEngine.NETWORK:
+            raise ValueError("sweep is not supported by the network engine")
+        if self.scrape_all_tables or self.scrape_all_pages:
+            raise ValueError(
+                "sweep can not be combined with scrape_all_tables or scrape_all_pages"
+            )
+        return self
+
+    @model_validator(mode="after")
+    def _check_incremental_options(self) -> "AppConfig":
+        if self.incremental is None:
+            return self
+        if self.cache_dir is None:
+            raise ValueError("incremental requires cache_dir")
+        if not self.is_single_table:
+            raise ValueError(
+                "incremental can not be combined with scrape_all_tables, scrape_all_pages or sweep"
+            )
+        return self
+
+    # The default interval is only used for a single table, but an interval set in the config must not be ignored
+    @model_validator(mode="after")
+    def _check_checkpoint_options(self) -> "AppConfig":
+        if (
+            "checkpoint_interval" in self.model_fields_set
+            and self.checkpoint_interval is not None
+            and not self.is_single_table
+        ):
+            raise ValueError(
+                "checkpoint_interval is not supported with scrape_all_tables, scrape_all_pages or sweep. Set it to null"
+            )
+        return self
 
 
 def load_config(file_path: Path) -> AppConfig:
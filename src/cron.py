@@ -0,0 +1,136 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+
+# Shortcuts for common schedules
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+MONTH_NAMES = "jan feb mar apr may jun jul aug sep oct nov dec".split()
+WEEKDAY_NAMES = "sun mon tue wed thu fri sat".split()
+# Max years searched for the next run time, e.g. for "0 0 29 2 *" (29 February)
+MAX_SEARCH_YEARS = 8
+
+
+# A cron expression with 5 fields: minute (0-59), hour (0-23), day of month (1-31), month (1-12 or jan-dec) and day of week (0-7 or sun-sat, 0 and 7 are Sunday).
+# Each field is * or a list of values, ranges (a-b) and steps (*/n, a-b/n, a/n), e.g. "*/15 6-18 * * mon-fri". Macros like @daily and @hourly are also supported.
+# As in cron, if both day of month and day of week are restricted (not *), a day matches if either field matches.
+@dataclass(frozen=True)
+class CronExpression:
+    expression: str
+    minutes: frozenset[int]
+    hours: frozenset[int]
+    days: frozenset[int]
+    months: frozenset[int]
+    weekdays: frozenset[int]  # 0 is Sunday
+    is_day_restricted: bool
+    is_weekday_restricted: bool
+
+    # Raises ValueError if the expression is invalid
+    @staticmethod
+    def parse(expression: str) -> "CronExpression":
+        fields = MACROS.get(expression.strip().lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(
+                f"Cron expression must have 5 fields (minute hour day month weekday): '{expression}'"
+            )
+
+        minute, hour, day, month, weekday = fields
+        weekdays = _parse_field(weekday, 0, 7, WEEKDAY_NAMES)
+        cron = CronExpression(
+            expression,
+            _parse_field(minute, 0, 59),
+            _parse_field(hour, 0, 23),
+            _parse_field(day, 1, 31),
+            _parse_field(month, 1, 12, MONTH_NAMES, first=1),
+            frozenset(value % 7 for value in weekdays),
+            not day.startswith("*"),
+            not weekday.startswith("*"),
+        )
+        # E.g. 31 February
+        if cron.next_after(datetime(2000, 1, 1)) is None:
+            raise ValueError(f"Cron expression never matches: '{expression}'")
+        return cron
+
+    # The first time matching the expression after the given time (in whole minutes), or None if there is none within MAX_SEARCH_YEARS
+    def next_after(self, time: datetime) -> Optional[datetime]:
+        time = time.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        end = time.replace(year=time.year + MAX_SEARCH_YEARS, month=1, day=1)
+
+        # Skip ahead a month, day or hour at a time until all fields match
+        while time < end:
+            if time.month not in self.months:
+                time = _first_of_next_month(time)
+            elif not self._matches_day(time):
+                time = time.replace(hour=0, minute=0) + timedelta(days=1)
+            elif time.hour not in self.hours:
+                time = time.replace(minute=0) + timedelta(hours=1)
+            elif time.minute not in self.minutes:
+                time += timedelta(minutes=1)
+            else:
+                return time
+        return None
+
+    def _matches_day(self, time: datetime) -> bool:
+        is_day = time.day in self.days
+        # isoweekday: Monday is 1 and Sunday is 7
+        is_weekday = time.isoweekday() % 7 in self.weekdays
+        if self.is_day_restricted and self.is_weekday_restricted:
+            return is_day or is_weekday
+        return is_day and is_weekday
+
+    def __str__(self) -> str:
+        return self.expression
+
+
+# Values of a field, e.g. "1-5,10" -> {1, 2, 3, 4, 5, 10}
+# names: Names of the values, e.g. month names, starting at 'first'
+def _parse_field(
+    field: str, low: int, high: int, names: Sequence[str] = (), first: int = 0
+) -> frozenset[int]:
+    values: set[int] = set()
+    for part in field.lower().split(","):
+        range_part, _, step_part = part.partition("/")
+        step = _parse_number(step_part, field) if step_part else 1
+        if step < 1:
+            raise ValueError(f"Step must be at least 1: '{field}'")
+
+        if range_part == "*":
+            start, end = low, high
+        elif "-" in range_part:
+            start_part, _, end_part = range_part.partition("-")
+            start = _parse_value(start_part, field, names, first)
+            end = _parse_value(end_part, field, names, first)
+        else:
+            start = _parse_value(range_part, field, names, first)
+            # E.g. 5/15: From 5 to the max value in steps of 15
+            end = high if step_part else start
+
+        if not low <= start <= end <= high:
+            raise ValueError(f"Values must be in the range {low}-{high}: '{field}'")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+def _parse_value(value: str, field: str, names: Sequence[str], first: int) -> int:
+    if value in names:
+        return names.index(value) + first
+    return _parse_number(value, field)
+
+
+def _parse_number(value: str, field: str) -> int:
+    if not value.isdigit():
+        raise ValueError(f"Invalid value '{value}' in cron field '{field}'")
+    return int(value)
+
+
+def _first_of_next_month(time: datetime) -> datetime:
+    if time.month == 12:
+        return time.replace(year=time.year + 1, month=1, day=1, hour=0, minute=0)
+    return time.replace(month=time.month + 1, day=1, hour=0, minute=0)
@@ -0,0 +1,147 @@
+# pyright: reportUnknownMemberType=false
+
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Hashable, Iterable, Optional, cast
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+# Same as pd.util.hash_pandas_object, imported from its implementation as pandas.util is not typed
+from pandas.core.util.hashing import hash_pandas_object
+
+logger = logging.getLogger(__name__)
+
+# Number of rows per block hash
+BLOCK_SIZE = 1000
+# Values of the change column of a diff
+ADDED = "added"
+REMOVED = "removed"
+
+
+# Compact summary of a scraped table, used to tell whether a table has changed since the last scrape without keeping the rows in memory.
+# probe_hash: Hash of the columns and the first probe_rows rows, i.e. the rows shown when the table is first rendered
+# block_hashes: Hash of each block of BLOCK_SIZE rows
+@dataclass(frozen=True)
+class TableFingerprint:
+    columns: list[str]
+    row_count: int
+    probe_rows: int
+    probe_hash: str
+    block_hashes: list[str]
+
+    # Whether the first rows of a scrape can be compared with probe_hash to detect an unchanged table.
+    # Only if the table had more rows than the probe, as otherwise rows added at the end would go unnoticed.
+    @property
+    def can_probe(self) -> bool:
+        return 0 < self.probe_rows < self.row_count
+
+
+def fingerprint_table(df: pd.DataFrame, probe_rows: int) -> TableFingerprint:
+    columns = [str(column) for column in cast(Iterable[Hashable], df.columns)]
+    row_hashes = _hash_rows(df)
+    probe_rows = min(probe_rows, len(df))
+    return TableFingerprint(
+        columns,
+        len(df),
+        probe_rows,
+        _hash_probe(columns, row_hashes[:probe_rows]),
+        [
+            _hash_bytes(row_hashes[start : start + BLOCK_SIZE].tobytes())
+            for start in range(0, len(row_hashes), BLOCK_SIZE)
+        ],
+    )
+
+
+# Compares the first rows of a scrape with the fingerprint of the previous scrape, so the scrape can stop as soon as the probe rows have been scraped.
+# The table must also have the same number of rows as before, so rows added or removed further down are noticed.
+# If the number of rows of the table is not known, the table never matches (i.e. the full table is scraped).
+class FingerprintProbe:
+    def __init__(self, previous: Optional[TableFingerprint]) -> None:
+        self._previous = previous if previous and previous.can_probe else None
+        self._is_checked = False
+        self.is_match = False
+
+    # Returns true if the rows scraped so far match the probe of the previous scrape
+    # total_rows: Number of rows of the table being scraped, if known
+    def check(
+        self, columns: list[str], rows: list[list[str]], total_rows: Optional[int]
+    ) -> bool:
+        previous = self._previous
+        if previous is None or self._is_checked or len(rows) < previous.probe_rows:
+            return self.is_match
+
+        self._is_checked = True
+        if total_rows != previous.row_count:
+            row_count = total_rows if total_rows is not None else "an unknown number of"
+            logger.debug(
+                f"Table has {row_count} rows, {previous.row_count} in the previous scrape. Scraping the full table"
+            )
+            return False
+        probe = pd.DataFrame(rows[: previous.probe_rows], columns=columns)
+        self.is_match = (
+            _hash_probe([str(column) for column in columns], _hash_rows(probe))
+            == previous.probe_hash
+        )
+        logger.debug(
+            f"First {previous.probe_rows} rows {'match' if self.is_match else 'do not match'} the previous scrape"
+        )
+        return self.is_match
+
+
+# Whether two fingerprints describe the same table
+def is_same_table(a: TableFingerprint, b: TableFingerprint) -> bool:
+    return (
+        a.columns == b.columns
+        and a.row_count == b.row_count
+        and a.block_hashes == b.block_hashes
+    )
+
+
+# Rows added to and removed from the old table, marked in change_column (first column).
+# Rows are compared as a whole. Duplicate rows are matched one to one, so a row repeated more often than before is added.
+def diff_tables(
+    old: pd.DataFrame, new: pd.DataFrame, change_column: str
+) -> pd.DataFrame:
+    old_keys = _occurrence_keys(old)
+    new_keys = _occurrence_keys(new)
+    added = cast(pd.DataFrame, new[~new_keys.isin(old_keys)])
+    removed = cast(pd.DataFrame, old[~old_keys.isin(new_keys)])
+    logger.info(f"Diff: {len(added)} rows added, {len(removed)} rows removed")
+
+    diff = pd.concat(
+        [
+            added.assign(**{change_column: ADDED}),
+            removed.assign(**{change_column: REMOVED}),
+        ],
+        ignore_index=True,
+    )
+    return cast(pd.DataFrame, diff[[change_column, *new.columns]])
+
+
+# Number of blocks that differ between two fingerprints of tables with the same columns
+def count_changed_blocks(a: TableFingerprint, b: TableFingerprint) -> int:
+    changed = sum(1 for x, y in zip(a.block_hashes, b.block_hashes) if x != y)
+    return changed + abs(len(a.block_hashes) - len(b.block_hashes))
+
+
+# 64 bit hash of each row (vectorized)
+def _hash_rows(df: pd.DataFrame) -> npt.NDArray[np.uint64]:
+    return cast(npt.NDArray[np.uint64], hash_pandas_object(df, index=False).to_numpy())
+
+
+# Row hash combined with the number of earlier rows with the same hash, so duplicate rows can be matched one to one
+def _occurrence_keys(df: pd.DataFrame) -> pd.Series:
+    hashes = pd.Series(_hash_rows(df), index=df.index)
+    occurrence = cast(pd.Series, hashes.groupby(hashes).cumcount())
+    return cast(pd.Series, hashes.astype(str) + ":" + occurrence.astype(str))
+
+
+def _hash_probe(columns: list[str], row_hashes: npt.NDArray[np.uint64]) -> str:
+    return _hash_bytes("\x1f".join(columns).encode("utf-8") + row_hashes.tobytes())
+
+
+def _hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
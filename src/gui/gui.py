@@ -1,30 +1,29 @@
 import logging
 import tkinter as tk
 from tkinter import messagebox, ttk
-from typing import Callable
-
-import pandas as pd
 
 import src.gui.gui_utils as gui_utils
 import src.utils as utils
 from src.config import GuiConfig
 from src.gui.gui_state import UiState
-from src.gui.widgets.main_widget import MainWidget, UiSubmitArgs
+from src.gui.widgets.main_widget import MainWidget, RunScrapeCallback, UiSubmitArgs
 
 logger = logging.getLogger(__name__)
 
 
 WIDTH = 600
-HEIGHT = 500
+HEIGHT = 650
 THEME_NAME = "forest-light"
 THEME_PATH = f"./src/gui/theme/{THEME_NAME}.tcl"
+# Max seconds to wait for a running scrape to stop when the window is closed
+CLOSE_TIMEOUT = 30
 
 
 class ScraperGui(tk.Tk):
     def __init__(
         self,
         config: GuiConfig,
-        on_run_scrape: Callable[[UiSubmitArgs, Callable[[pd.DataFrame], None]], None],
+        on_run_scrape: RunScrapeCallback,
     ):
         super().__init__()
         self.lang = utils.load_language(config.language)
@@ -36,10 +35,10 @@ class ScraperGui(tk.Tk):
         self._load_theme()
         self.state = self._init_state(config)
 
-        main_frame = MainWidget(
+        self._main_frame = MainWidget(
             self, self.lang, self.state, config.program_name, on_run_scrape
         )
-        main_frame.pack(pady=10, padx=30, fill=tk.BOTH, expand=True)
+        self._main_frame.pack(pady=10, padx=30, fill=tk.BOTH, expand=True)
 
         self._center_window()
 
@@ -48,6 +47,8 @@ class ScraperGui(tk.Tk):
             self.mainloop()
         except Exception as e:
             gui_utils.show_error(e)
+        # The window is closed. Stop a running scrape, so its rows are saved and its browser is closed before the program exits
+        self._main_frame.close(timeout=CLOSE_TIMEOUT)
 
     # Init UI state variables
     # XXX: Move to state ctor?
@@ -1,32 +1,82 @@
 import logging
+import threading
 import tkinter as tk
 import traceback
+from collections import deque
 
 from typing_extensions import override
 
+# Milliseconds between updates of the text widget
+DRAIN_INTERVAL_MS = 100
+# Max number of lines kept in the text widget. Older lines are removed
+MAX_LINES = 2000
+# Max number of log records waiting to be written to the widget. If the log is written faster than the widget is updated, the oldest records are dropped
+MAX_PENDING_RECORDS = 2000
 
-# Writes the log to the given text widget
+
+# Writes the log to the given text widget.
+# Records can be logged from any thread. They are only queued when logged, and written to the widget in batches by a Tk 'after' loop on the GUI thread,
+# so logging does not wait for the widget to redraw (Tk widgets must also only be updated from the GUI thread).
 class LogToWidgetHandler(logging.Handler):
-    def __init__(self, widget: tk.Text):
+    def __init__(
+        self,
+        widget: tk.Text,
+        max_lines: int = MAX_LINES,
+        drain_interval_ms: int = DRAIN_INTERVAL_MS,
+    ):
         logging.Handler.__init__(self)
         self.text_widget = widget
+        self._max_lines = max_lines
+        self._drain_interval_ms = drain_interval_ms
+        self._pending: deque[str] = deque(maxlen=MAX_PENDING_RECORDS)
+        self._pending_lock = threading.Lock()
+        self._dropped = 0
+
+        # Must be created on the GUI thread
+        self.text_widget.after(self._drain_interval_ms, self._drain)
 
     @override
     def emit(self, record: logging.LogRecord):
-        # Enable editing of the text widget in order to insert the log
-        self.text_widget.configure(state=tk.NORMAL)
-
         if record.exc_info:
             # Format exception
             exc_type, exc_value, exc_traceback = record.exc_info
-            exc_str = "".join(
+            text = "".join(
                 traceback.format_exception(exc_type, exc_value, exc_traceback)
             )
-            # Insert exception
-            self.text_widget.insert(tk.END, exc_str + "\n")
-
         else:
-            self.text_widget.insert(tk.END, str(record.msg) + "\n")
+            text = str(record.msg)
+
+        with self._pending_lock:
+            if len(self._pending) == self._pending.maxlen:
+                self._dropped += 1
+            self._pending.append(text)
+
+    # Write the queued records to the widget, and schedule the next update
+    def _drain(self):
+        with self._pending_lock:
+            records = list(self._pending)
+            self._pending.clear()
+            dropped, self._dropped = self._dropped, 0
+
+        try:
+            if records:
+                if dropped:
+                    records.insert(0, f"... {dropped} log lines skipped ...")
+                self._write(records)
+            self.text_widget.after(self._drain_interval_ms, self._drain)
+        # The widget has been destroyed, i.e. the window is closing
+        except tk.TclError:
+            pass
+
+    def _write(self, records: list[str]):
+        # Enable editing of the text widget in order to insert the log
+        self.text_widget.configure(state=tk.NORMAL)
+        self.text_widget.insert(tk.END, "\n".join(records) + "\n")
+
+        # Remove the oldest lines beyond max_lines (the widget always ends with an empty line)
+        line_count = int(self.text_widget.index("end-1c").split(".")[0]) - 1
+        if line_count > self._max_lines:
+            self.text_widget.delete("1.0", f"{line_count - self._max_lines + 1}.0")
 
         self.text_widget.see(tk.END)  # Scroll to the bottom of the text widget
         self.text_widget.configure(state=tk.DISABLED)
@@ -10,8 +10,6 @@ from tkinter import filedialog, messagebox, ttk
 from tkinter.scrolledtext import ScrolledText
 from typing import Any, Callable
 
-import pandas as pd
-
 import src.utils as utils
 from src.config import GuiConfig, OutputFormat
 from src.gui.widget_loghandler import LogToWidgetHandler
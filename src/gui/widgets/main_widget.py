@@ -6,19 +6,24 @@ from dataclasses import dataclass
 from pathlib import Path
 from threading import ExceptHookArgs, Thread
 from tkinter import messagebox, ttk
-from typing import Any, Callable
-
-import pandas as pd
+from typing import TYPE_CHECKING, Any, Callable, Optional
 
 import src.gui.gui_utils as gui_utils
+from src.cancellation import CancellationToken, ScrapeCancelledError
 from src.config import OutputFormat
 from src.gui.gui_state import UiState
 from src.gui.widgets.format_widget import FormatSelectionWidget
 from src.gui.widgets.log_widget import LogWidget
 from src.gui.widgets.path_widget import PathWidget
+from src.gui.widgets.progress_widget import ProgressWidget
 from src.gui.widgets.run_button import RunButton
+from src.gui.widgets.stop_button import StopButton
 from src.gui.widgets.url_frame import UrlWidget
 
+if TYPE_CHECKING:
+    from src.progress import ProgressListener
+    from src.usecase import ScrapeResult
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,6 +35,18 @@ class UiSubmitArgs:
     output_format: OutputFormat
 
 
+# Runs the scrape (on a background thread): (input, on complete, on progress, cancel token)
+RunScrapeCallback = Callable[
+    [
+        UiSubmitArgs,
+        Callable[["ScrapeResult"], None],
+        "ProgressListener",
+        CancellationToken,
+    ],
+    None,
+]
+
+
 class MainWidget(ttk.Frame):
     def __init__(
         self,
@@ -37,12 +54,16 @@ class MainWidget(ttk.Frame):
         lang: dict[str, str],
         state: UiState,
         program_name: str,
-        on_run_scrape: Callable[[UiSubmitArgs, Callable[[pd.DataFrame], None]], None],
+        on_run_scrape: RunScrapeCallback,
     ):
         super().__init__(root)
         self.lang = lang
         self.ui_state = state
         self._on_run_scrape = on_run_scrape
+        self._scrape_thread: Optional[Thread] = None
+        self._cancel_token = CancellationToken()
+        # The window is closing, so the UI must not be updated when the scrape stops
+        self._is_closing = False
 
         title_label = ttk.Label(
             self,
@@ -75,15 +96,24 @@ class MainWidget(ttk.Frame):
             variable=self.ui_state.is_headless_input,
         )
 
+        self.progress_widget = ProgressWidget(self, self.lang)
+
         log_widget = LogWidget(self, self.lang["label_program_log"] + ":")
 
+        button_frame = ttk.Frame(self)
         run_button = RunButton(
-            self,
+            button_frame,
             self.lang,
             is_enabled=self.ui_state.is_input_valid,
             is_processing=self.ui_state.is_processing,
             on_click=self.on_run_button_click,
         )
+        stop_button = StopButton(
+            button_frame,
+            self.lang,
+            is_processing=self.ui_state.is_processing,
+            on_click=self.stop_scrape,
+        )
 
         # Create layout
         title_label.grid(row=0, column=0, pady=10)
@@ -91,10 +121,13 @@ class MainWidget(ttk.Frame):
         format_selection_widget.grid(row=2, column=0, pady=10, sticky="we")
         path_widget.grid(row=3, column=0, pady=10, sticky="we")
         headless_checkbox.grid(row=4, column=0, pady=5, sticky="w")
-        log_widget.grid(row=5, column=0, pady=10, sticky="nsew")
-        run_button.grid(row=6, column=0, pady=10)
+        self.progress_widget.grid(row=5, column=0, pady=10, sticky="we")
+        log_widget.grid(row=6, column=0, pady=10, sticky="nsew")
+        button_frame.grid(row=7, column=0, pady=10)
+        run_button.grid(row=0, column=0, padx=(0, 5))
+        stop_button.grid(row=0, column=1, padx=(5, 0))
 
-        self.rowconfigure(5, weight=1)
+        self.rowconfigure(6, weight=1)
         self.columnconfigure(0, weight=1)
 
         # Bind variable changes to widget updates
@@ -103,6 +136,8 @@ class MainWidget(ttk.Frame):
     def on_run_button_click(self) -> None:
         logger.debug("Run button clicked. Starting scrape in a separate thread...")
         self.ui_state.is_processing.set(True)
+        self.progress_widget.reset()
+        self._cancel_token = CancellationToken()
 
         # Run the scrape process in a separate thread to keep the UI responsive
         thread = Thread(
@@ -115,32 +150,66 @@ class MainWidget(ttk.Frame):
                     output_format=OutputFormat(self.ui_state.output_format_input.get()),
                 ),
                 self.on_scrape_complete,
+                self.progress_widget.on_progress,
+                self._cancel_token,
             ),
             daemon=True,  # Kill the thread when the program exits
         )
         threading.excepthook = self.on_thread_exception
         thread.start()
+        self._scrape_thread = thread
+
+    # Stop the running scrape. The rows scraped so far are saved, and on_scrape_complete is called when done
+    def stop_scrape(self):
+        logger.info("Stop button clicked. Stopping the scrape...")
+        self._cancel_token.cancel()
+
+    # Stop the running scrape when the window is closed, and wait for it to save its rows and release its browser
+    def close(self, timeout: float):
+        self._is_closing = True
+        thread = self._scrape_thread
+        if thread is None or not thread.is_alive():
+            return
+        logger.info("Window closed. Waiting for the scrape to stop...")
+        self._cancel_token.cancel()
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning(f"Scrape did not stop within {timeout} seconds")
 
     # This will be executed in the background thread i.e. raising an exception in this method will not be caught by the main thread
     def on_thread_exception(self, args: ExceptHookArgs):
+        if self._is_closing:
+            logger.exception(args.exc_value)
+            return
         self.ui_state.is_processing.set(False)
+        # Stopped before any rows were scraped, so there is nothing to show
+        if isinstance(args.exc_value, ScrapeCancelledError):
+            logger.info(f"{args.exc_value}")
+            return
         logger.exception(args.exc_value)
         gui_utils.show_error(args.exc_value)  # type: ignore
 
-    def on_scrape_complete(self, table: pd.DataFrame):
+    def on_scrape_complete(self, result: "ScrapeResult"):
+        if self._is_closing:
+            return
         logger.debug("Showing scrape complete dialog")
         self.ui_state.is_processing.set(False)
-        self._show_scrape_complete_dialog(table)
+        self._show_scrape_complete_dialog(result)
 
     # Show a message box when scraping is complete
-    def _show_scrape_complete_dialog(self, table: pd.DataFrame):
+    def _show_scrape_complete_dialog(self, result: "ScrapeResult"):
         # Play a beep sound
         self.bell()
 
+        title, message = (
+            ("title_task_stopped", "message_task_stopped")
+            if result.is_cancelled
+            else ("title_task_complete", "message_task_complete")
+        )
         response = messagebox.askyesno(  # type: ignore
-            self.lang["title_task_complete"],
-            self.lang["message_task_complete"].format(
-                rows_scraped=len(table), columns_scraped=len(table.columns)
+            self.lang[title],
+            self.lang[message].format(
+                rows_scraped=result.rows, columns_scraped=result.columns
             ),
         )
         if response:
@@ -154,4 +223,6 @@ class MainWidget(ttk.Frame):
         logger.debug(f"Setting widgets to status: {status}")
         # Recursively apply status to all widgets
         # Exclude all widgets that should not change status/manages its own status
-        gui_utils.set_widget_state_recursive(self, status, exclude=[LogWidget])
+        gui_utils.set_widget_state_recursive(
+            self, status, exclude=[LogWidget, ProgressWidget, StopButton]
+        )
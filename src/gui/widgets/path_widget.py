@@ -61,6 +61,12 @@ class PathWidget(ttk.Frame):
             case OutputFormat.CSV.value:
                 default_extension = ".csv"
                 file_types = [("CSV files", "*.csv")]
+            case OutputFormat.PARQUET.value:
+                default_extension = ".parquet"
+                file_types = [("Parquet files", "*.parquet")]
+            case OutputFormat.FEATHER.value:
+                default_extension = ".feather"
+                file_types = [("Feather files", "*.feather")]
             case _:
                 raise ValueError(f"Invalid output format: {self.path.get()}")
 
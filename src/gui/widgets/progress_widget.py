@@ -0,0 +1,105 @@
+import threading
+import tkinter as tk
+from tkinter import ttk
+from typing import Optional
+
+from src.progress import ProgressEvent, format_progress
+
+# Milliseconds between updates of the widget
+UPDATE_INTERVAL_MS = 200
+# Height of the preview table in rows
+PREVIEW_HEIGHT = 5
+
+
+# Shows the progress of the running scrape: A progress bar, a status line (rows, rows/s, ETA) and a preview of the last scraped rows.
+# on_progress can be called from any thread. It only stores the latest event, which is shown by a Tk 'after' loop on the GUI thread (see LogToWidgetHandler)
+class ProgressWidget(ttk.Frame):
+    def __init__(
+        self,
+        parent: ttk.Frame,
+        lang: dict[str, str],
+    ):
+        super().__init__(parent)
+
+        self._latest: Optional[ProgressEvent] = None
+        self._shown: Optional[ProgressEvent] = None
+        self._preview_columns: list[str] = []
+        self._lock = threading.Lock()
+
+        progress_label = ttk.Label(self, text=lang["label_progress"] + ":")
+        self._progress_bar = ttk.Progressbar(self, mode="determinate", maximum=1.0)
+        self._status_label = ttk.Label(self, text="", anchor="w")
+        self._preview = ttk.Treeview(
+            self, show="headings", height=PREVIEW_HEIGHT, selectmode="none"
+        )
+        preview_scrollbar = ttk.Scrollbar(
+            self, orient=tk.HORIZONTAL, command=self._preview.xview  # type: ignore
+        )
+        self._preview.configure(xscrollcommand=preview_scrollbar.set)
+
+        # Layout
+        progress_label.grid(row=0, column=0, sticky="w", pady=(0, 5))
+        self._progress_bar.grid(row=1, column=0, sticky="we")
+        self._status_label.grid(row=2, column=0, sticky="we", pady=5)
+        self._preview.grid(row=3, column=0, sticky="we")
+        preview_scrollbar.grid(row=4, column=0, sticky="we")
+        self.columnconfigure(0, weight=1)
+
+        self.after(UPDATE_INTERVAL_MS, self._update)
+
+    def on_progress(self, event: ProgressEvent):
+        with self._lock:
+            self._latest = event
+
+    # Clear the progress of the previous scrape
+    def reset(self):
+        with self._lock:
+            self._latest = None
+        self._shown = None
+        self._progress_bar.stop()
+        self._progress_bar.configure(mode="determinate", value=0)
+        self._status_label.configure(text="")
+        self._preview.delete(*self._preview.get_children())
+        self._preview.configure(columns=())
+        self._preview_columns = []
+
+    # Show the latest event if it changed, and schedule the next update
+    def _update(self):
+        with self._lock:
+            event = self._latest
+
+        try:
+            if event is not None and event is not self._shown:
+                self._show(event)
+                self._shown = event
+            self.after(UPDATE_INTERVAL_MS, self._update)
+        # The widget has been destroyed, i.e. the window is closing
+        except tk.TclError:
+            pass
+
+    def _show(self, event: ProgressEvent):
+        fraction = event.fraction
+        # The number of rows is unknown, so only show that the scrape is running
+        if fraction is None:
+            if str(self._progress_bar.cget("mode")) != "indeterminate":
+                self._progress_bar.configure(mode="indeterminate", maximum=100)
+                self._progress_bar.start()
+        else:
+            if str(self._progress_bar.cget("mode")) != "determinate":
+                self._progress_bar.stop()
+                self._progress_bar.configure(mode="determinate", maximum=1.0)
+            self._progress_bar.configure(value=fraction)
+
+        self._status_label.configure(text=format_progress(event))
+
+        if event.columns != self._preview_columns:
+            # Column ids are indexes, as column names are not always unique
+            column_ids = [str(i) for i in range(len(event.columns))]
+            self._preview.configure(columns=column_ids)
+            for column_id, column in zip(column_ids, event.columns):
+                self._preview.heading(column_id, text=column)
+                self._preview.column(column_id, width=100, stretch=False)
+            self._preview_columns = event.columns
+        self._preview.delete(*self._preview.get_children())
+        for row in event.last_rows:
+            self._preview.insert("", tk.END, values=row)
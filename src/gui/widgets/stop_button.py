@@ -0,0 +1,39 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable
+
+import src.gui.gui_utils as gui_utils
+
+
+# Enabled while a scrape is running. Disabled once clicked, until the scrape has stopped
+class StopButton(ttk.Button):
+    def __init__(
+        self,
+        parent: ttk.Frame,
+        lang: dict[str, str],
+        is_processing: tk.BooleanVar,
+        on_click: Callable[[], None],
+    ):
+        self._lang = lang
+        self._on_click = on_click
+
+        super().__init__(
+            parent,
+            text=lang["button_stop"],
+            state=gui_utils.bool_to_state(is_processing),
+            command=self._click,
+            width=20,
+        )
+
+        # Bind events
+        is_processing.trace_add(
+            "write",
+            lambda *_: self.configure(  # type: ignore
+                text=lang["button_stop"],
+                state=gui_utils.bool_to_state(is_processing),
+            ),
+        )
+
+    def _click(self):
+        self.configure(text=self._lang["button_stopping"], state=tk.DISABLED)
+        self._on_click()
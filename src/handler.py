@@ -1,55 +1,427 @@
 import logging
-from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from threading import Thread
+from typing import TYPE_CHECKING, Callable, Generator, Optional
 
-import pandas as pd
+from pydantic import HttpUrl
 
-import src.usecase as usecase
-from src.config import AppConfig
-from src.gui.gui import ScraperGui, UiSubmitArgs
-from src.scraper.powerbi_scraper import ScraperOptions
+from src import metrics
+from src.cancellation import CancellationToken, cancel_on_interrupt
+from src.config import AppConfig, ScheduledJobConfig
+
+# Each mode imports the modules it needs when it starts, so e.g. the console mode does not load tkinter and the GUI is shown before pandas and selenium are loaded.
+# See benchmarks/bench_startup.py
+if TYPE_CHECKING:
+    import src.usecase as usecase
+    from src.gui.gui import UiSubmitArgs
+    from src.progress import ProgressListener
+    from src.save import SaveOptions
+    from src.scraper.driver_pool import DriverPool
+    from src.scraper.powerbi_scraper import ScraperOptions
+    from src.service import ServiceJob
+    from src.usecase import ScrapeResult
 
 logger = logging.getLogger(__name__)
 
 
 def use_gui(app_config: AppConfig):
+    from src.gui.gui import ScraperGui
+
     # if app_config.gui is None:
     #     raise ValueError("Mode is set to GUI but GUI config is missing")
     logger.debug(f"Using GUI config: {app_config.gui}")
 
+    # The scraping modules are loaded in the background while the window is shown. The first scrape waits for them if needed
+    loader = ThreadPoolExecutor(max_workers=1)
+    driver_pool_future = loader.submit(_load_gui_scraping, app_config)
+    loader.shutdown(wait=False)
+
     def on_run_scrape(
-        ui_args: UiSubmitArgs, on_scrape_complete: Callable[[pd.DataFrame], None]
+        ui_args: "UiSubmitArgs",
+        on_scrape_complete: Callable[["ScrapeResult"], None],
+        on_progress: "ProgressListener",
+        cancel_token: CancellationToken,
     ):
-        table = usecase.scrape_and_save(
-            ScraperOptions(
-                url=ui_args.url,
-                is_console_enabled=False,
-                should_uncheck_filter=app_config.should_uncheck_filter,
-                is_headless=ui_args.is_headless,
-            ),
-            ui_args.output_path,
-            ui_args.output_format,
-            max_rows=app_config.max_rows,
-        )
+        import src.usecase as usecase
+
+        driver_pool = driver_pool_future.result()
+        with _collect_metrics(app_config):
+            result = usecase.scrape_and_save(
+                _create_scraper_options(
+                    app_config,
+                    ui_args.url,
+                    ui_args.is_headless,
+                    is_console_enabled=False,
+                ),
+                ui_args.output_path,
+                ui_args.output_format,
+                max_rows=app_config.max_rows,
+                driver_pool=driver_pool,
+                checkpoint_interval=app_config.checkpoint_interval,
+                save_options=_create_save_options(app_config),
+                cache_dir=app_config.cache_dir,
+                sweep=_create_sweep_options(app_config),
+                incremental=_create_incremental_options(app_config),
+                on_progress=on_progress,
+                cancel_token=cancel_token,
+            )
         # Notify UI that scrape is complete
-        on_scrape_complete(table)
+        on_scrape_complete(result)
 
     ui = ScraperGui(app_config.gui, on_run_scrape)
-    ui.show()
+    try:
+        ui.show()
+    finally:
+        if driver_pool_future.exception() is None:
+            driver_pool_future.result().close()
+
+
+# Import the scraping modules and create the driver pool of the GUI
+def _load_gui_scraping(app_config: AppConfig) -> "DriverPool":
+    import src.usecase  # noqa: F401
+    from src.scraper.powerbi_scraper import ScraperOptions
 
+    # Only one scrape can run at a time in the GUI, so one browser session is enough
+    driver_pool = _create_driver_pool(app_config, size=1)
+    if app_config.session_pool.is_prewarmed:
+        Thread(
+            target=driver_pool.warm_up,
+            args=(
+                ScraperOptions(
+                    url="",
+                    is_console_enabled=False,
+                    is_headless=app_config.gui.default_values.is_headless,
+                    engine=app_config.engine,
+                ),
+            ),
+            daemon=True,
+        ).start()
+    return driver_pool
+
+
+def use_console(app_config: AppConfig, resume: bool = False):
+    import src.usecase as usecase
+    from src.progress import ConsoleProgress
 
-def use_console(app_config: AppConfig):
     if app_config.console is None:
         raise ValueError("Mode is set to CONSOLE but CONSOLE config is missing")
     logger.debug(f"Using CONSOLE config: {app_config.console}")
 
     config = app_config.console
-    table = usecase.scrape_and_save(
-        ScraperOptions(
-            url=config.url.unicode_string(),
-            is_headless=config.is_headless,
-            should_uncheck_filter=app_config.should_uncheck_filter,
+    if resume and not app_config.is_single_table:
+        raise ValueError(
+            "--resume is not supported with scrape_all_tables, scrape_all_pages or sweep"
+        )
+
+    def create_options(url: HttpUrl):
+        return _create_scraper_options(
+            app_config, url.unicode_string(), config.is_headless
+        )
+
+    # Ctrl+C stops the scrape and saves the rows scraped so far
+    cancel_token = CancellationToken()
+
+    # Single report
+    if not config.jobs:
+        assert config.url is not None
+        console_progress = ConsoleProgress()
+        try:
+            with cancel_on_interrupt(cancel_token), _collect_metrics(app_config):
+                usecase.scrape_and_save(
+                    create_options(config.url),
+                    config.output_path,
+                    config.output_format,
+                    max_rows=app_config.max_rows,
+                    checkpoint_interval=app_config.checkpoint_interval,
+                    resume=resume,
+                    save_options=_create_save_options(app_config),
+                    cache_dir=app_config.cache_dir,
+                    sweep=_create_sweep_options(app_config),
+                    incremental=_create_incremental_options(app_config),
+                    on_progress=console_progress,
+                    cancel_token=cancel_token,
+                )
+        finally:
+            console_progress.close()
+        return
+
+    # Multiple reports
+    jobs = [
+        usecase.ScrapeJob(create_options(job.url), job.output_path, job.output_format)
+        for job in config.jobs
+    ]
+    if config.url is not None:
+        jobs.insert(
+            0,
+            usecase.ScrapeJob(
+                create_options(config.url), config.output_path, config.output_format
+            ),
+        )
+
+    driver_pool = _create_driver_pool(app_config, size=app_config.batch.pool_size)
+    try:
+        with cancel_on_interrupt(cancel_token), _collect_metrics(app_config):
+            usecase.scrape_and_save_batch(
+                jobs,
+                pool_size=app_config.batch.pool_size,
+                job_timeout=app_config.batch.job_timeout,
+                max_retries=app_config.batch.max_retries,
+                max_rows=app_config.max_rows,
+                driver_pool=driver_pool,
+                checkpoint_interval=app_config.checkpoint_interval,
+                resume=resume,
+                save_options=_create_save_options(app_config),
+                cache_dir=app_config.cache_dir,
+                sweep=_create_sweep_options(app_config),
+                incremental=_create_incremental_options(app_config),
+                cancel_token=cancel_token,
+            )
+    finally:
+        driver_pool.close()
+
+
+def use_service(app_config: AppConfig):
+    import src.usecase as usecase
+    from src.service import ScrapeService
+    from src.service_api import ServiceHttpServer
+
+    config = app_config.service
+    logger.debug(f"Using SERVICE config: {config}")
+
+    # A browser session per worker is kept warm between jobs
+    driver_pool = _create_warm_driver_pool(
+        app_config, size=config.workers, is_headless=config.is_headless
+    )
+
+    def run_job(job: "ServiceJob") -> "ScrapeResult":
+        request = job.request
+        return usecase.scrape_and_save(
+            _create_scraper_options(
+                app_config,
+                request.url.unicode_string(),
+                config.is_headless,
+                should_uncheck_filter=request.should_uncheck_filter,
+                filter_values=request.filter_values,
+            ),
+            job.save_path,
+            request.output_format,
+            max_rows=request.max_rows or app_config.max_rows,
+            timeout=config.job_timeout,
+            driver_pool=driver_pool,
+            checkpoint_interval=app_config.checkpoint_interval,
+            save_options=_create_save_options(app_config),
+            cache_dir=app_config.cache_dir,
+            sweep=_create_sweep_options(app_config),
+            incremental=_create_incremental_options(app_config),
+            on_progress=lambda event: setattr(job, "progress", event),
+            cancel_token=job.cancel_token,
+        )
+
+    service = ScrapeService(
+        run_job,
+        config.output_dir,
+        workers=config.workers,
+        max_queue_size=config.max_queue_size,
+        max_finished_jobs=config.max_finished_jobs,
+        driver_pool=driver_pool,
+        report_metrics=lambda job_metrics: _report_metrics(app_config, job_metrics),
+    )
+    server = ServiceHttpServer((config.host, config.port), service)
+    service.start()
+    logger.info(f"Accepting scrape jobs at {server.url}/jobs")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.stop()
+        driver_pool.close()
+
+
+def use_scheduler(app_config: AppConfig):
+    import src.usecase as usecase
+    from src.cron import CronExpression
+    from src.scheduler import RunHistory, ScheduledJob, Scheduler
+
+    if app_config.scheduler is None:
+        raise ValueError("Mode is set to SCHEDULER but SCHEDULER config is missing")
+    logger.debug(f"Using SCHEDULER config: {app_config.scheduler}")
+
+    config = app_config.scheduler
+
+    # A browser session per worker is kept warm between runs
+    driver_pool = _create_warm_driver_pool(
+        app_config, size=config.workers, is_headless=config.is_headless
+    )
+
+    def create_run(job: ScheduledJobConfig):
+        def run(scheduled_at: datetime, cancel_token: CancellationToken):
+            return usecase.scrape_and_save(
+                _create_scraper_options(
+                    app_config,
+                    job.url.unicode_string(),
+                    config.is_headless,
+                    should_uncheck_filter=job.should_uncheck_filter,
+                    filter_values=job.filter_values,
+                ),
+                # E.g. output/sales_%Y-%m-%d.csv -> output/sales_2024-05-01.csv
+                Path(scheduled_at.strftime(str(job.output_path))),
+                job.output_format,
+                max_rows=job.max_rows or app_config.max_rows,
+                timeout=config.job_timeout,
+                driver_pool=driver_pool,
+                checkpoint_interval=app_config.checkpoint_interval,
+                save_options=_create_save_options(app_config),
+                cache_dir=app_config.cache_dir,
+                sweep=_create_sweep_options(app_config),
+                incremental=_create_incremental_options(app_config),
+                cancel_token=cancel_token,
+            )
+
+        return run
+
+    scheduler = Scheduler(
+        [
+            ScheduledJob(job.name, CronExpression.parse(job.cron), create_run(job))
+            for job in config.jobs
+        ],
+        workers=config.workers,
+        max_jitter=config.max_jitter,
+        history=RunHistory(config.history_path, config.history_size),
+        report_metrics=lambda run_metrics: _report_metrics(app_config, run_metrics),
+    )
+    # Ctrl+C stops the scheduler, running jobs save the rows scraped so far
+    cancel_token = CancellationToken()
+    try:
+        with cancel_on_interrupt(cancel_token):
+            scheduler.run(cancel_token)
+    finally:
+        driver_pool.close()
+
+
+# Collect metrics of the code run inside the context and report them when done (also if the run fails)
+@contextmanager
+def _collect_metrics(app_config: AppConfig) -> Generator[metrics.Metrics, None, None]:
+    run_metrics = metrics.Metrics()
+    try:
+        with metrics.collect(run_metrics):
+            yield run_metrics
+    finally:
+        _report_metrics(app_config, run_metrics)
+
+
+def _report_metrics(app_config: AppConfig, run_metrics: metrics.Metrics):
+    metrics.report(
+        run_metrics,
+        app_config.metrics.json_path,
+        app_config.metrics.prometheus_path,
+    )
+
+
+def _create_driver_pool(app_config: AppConfig, size: int) -> "DriverPool":
+    from src.scraper.driver_pool import DriverPool
+
+    return DriverPool(
+        size,
+        max_uses=app_config.session_pool.max_uses,
+        max_memory_mb=app_config.session_pool.max_memory_mb,
+    )
+
+
+# Driver pool whose browser sessions are started in the background, so the first jobs do not wait for browser startup
+def _create_warm_driver_pool(
+    app_config: AppConfig, size: int, is_headless: bool
+) -> "DriverPool":
+    from src.scraper.powerbi_scraper import ScraperOptions
+
+    driver_pool = _create_driver_pool(app_config, size)
+    Thread(
+        target=driver_pool.warm_up,
+        args=(
+            ScraperOptions(
+                url="",
+                is_headless=is_headless,
+                engine=app_config.engine,
+            ),
         ),
-        config.output_path,
-        config.output_format,
-        max_rows=app_config.max_rows,
+        daemon=True,
+    ).start()
+    return driver_pool
+
+
+# Scraper options of a scrape in any mode. The filter settings (e.g. of a service or scheduler job) override the settings of the config if set
+def _create_scraper_options(
+    app_config: AppConfig,
+    url: str,
+    is_headless: bool,
+    is_console_enabled: bool = True,
+    should_uncheck_filter: Optional[bool] = None,
+    filter_values: Optional[list[str]] = None,
+) -> "ScraperOptions":
+    from src.scraper.powerbi_scraper import ScraperOptions
+
+    return ScraperOptions(
+        url=url,
+        is_console_enabled=is_console_enabled,
+        is_headless=is_headless,
+        should_uncheck_filter=should_uncheck_filter
+        if should_uncheck_filter is not None
+        else app_config.should_uncheck_filter,
+        filter_values=tuple(filter_values)
+        if filter_values is not None
+        else _get_filter_values(app_config),
+        engine=app_config.engine,
+        should_scrape_all_tables=app_config.scrape_all_tables,
+        should_scrape_all_pages=app_config.scrape_all_pages,
+        extraction_mode=app_config.extraction_mode,
+        max_scroll_stride=app_config.max_scroll_stride,
+        idle_window=app_config.idle_window,
+        render_timeout=app_config.render_timeout,
+    )
+
+
+def _create_save_options(app_config: AppConfig) -> "SaveOptions":
+    from src.save import SaveOptions
+
+    return SaveOptions(
+        infer_types=app_config.infer_types,
+        locale=app_config.locale,
+        parquet_compression=app_config.parquet_compression,
+    )
+
+
+def _create_sweep_options(app_config: AppConfig) -> Optional["usecase.SweepOptions"]:
+    import src.usecase as usecase
+
+    if app_config.sweep is None:
+        return None
+    return usecase.SweepOptions(
+        values=tuple(app_config.sweep.values)
+        if app_config.sweep.values is not None
+        else None,
+        column_name=app_config.sweep.column_name,
+        output=app_config.sweep.output,
+        sessions=app_config.sweep.sessions,
     )
+
+
+def _create_incremental_options(
+    app_config: AppConfig,
+) -> Optional["usecase.IncrementalOptions"]:
+    import src.usecase as usecase
+
+    if app_config.incremental is None:
+        return None
+    return usecase.IncrementalOptions(
+        probe_rows=app_config.incremental.probe_rows,
+        write_diff=app_config.incremental.write_diff,
+        change_column=app_config.incremental.change_column,
+    )
+
+
+def _get_filter_values(app_config: AppConfig) -> Optional[tuple[str, ...]]:
+    if app_config.filter_values is None:
+        return None
+    return tuple(app_config.filter_values)
@@ -0,0 +1,312 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Generator, Iterator, Optional, ParamSpec, TypeVar
+
+logger = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+# Prefix of the metric names in the Prometheus export
+PROMETHEUS_PREFIX = "powerbi_scraper"
+
+# A metric is identified by its name and labels, e.g. ("webdriver_command", (("command", "findElement"),))
+_Key = tuple[str, tuple[tuple[str, str], ...]]
+
+
+@dataclass
+class _Timer:
+    calls: int = 0
+    seconds: float = 0
+
+
+@dataclass
+class _Distribution:
+    count: int = 0
+    sum: float = 0
+    min: float = float("inf")
+    max: float = float("-inf")
+
+    def add(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+
+# Metrics of a run: timers (number of calls and time spent, e.g. loading the page or a WebDriver command),
+# counters (e.g. rows scraped) and distributions (e.g. rows found per scroll).
+# Metrics are recorded using the module functions (timer, count, observe) while the Metrics object is collecting (see collect).
+# Recording is thread-safe, so concurrent jobs can record to the same Metrics object.
+class Metrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._timers: dict[_Key, _Timer] = {}
+        self._counters: dict[_Key, float] = {}
+        self._distributions: dict[_Key, _Distribution] = {}
+        self.started_at = time.time()
+
+    def add_time(self, key: _Key, seconds: float):
+        with self._lock:
+            timer = self._timers.setdefault(key, _Timer())
+            timer.calls += 1
+            timer.seconds += seconds
+
+    def add_count(self, key: _Key, value: float):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add_observation(self, key: _Key, value: float):
+        with self._lock:
+            self._distributions.setdefault(key, _Distribution()).add(value)
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "duration": time.time() - self.started_at,
+                "timers": [
+                    {**_describe(key), "calls": timer.calls, "seconds": timer.seconds}
+                    for key, timer in sorted(self._timers.items())
+                ],
+                "counters": [
+                    {**_describe(key), "value": value}
+                    for key, value in sorted(self._counters.items())
+                ],
+                "distributions": [
+                    {
+                        **_describe(key),
+                        "count": dist.count,
+                        "sum": dist.sum,
+                        "min": dist.min,
+                        "max": dist.max,
+                        "mean": dist.sum / dist.count,
+                    }
+                    for key, dist in sorted(self._distributions.items())
+                ],
+            }
+
+    # Total calls of the timer with the given name (across all labels)
+    def get_calls(self, name: str) -> int:
+        with self._lock:
+            return sum(t.calls for (n, _), t in self._timers.items() if n == name)
+
+    def write_json(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2), encoding="utf-8")
+
+    # Write the metrics in the Prometheus text format, e.g. for the textfile collector of the node exporter.
+    # The file is replaced atomically, so the collector never reads a partial file.
+    def write_prometheus(self, path: Path):
+        report = self.to_dict()
+        lines: list[str] = []
+
+        # samples: (name suffix, labels, value)
+        def add_metric(
+            name: str,
+            type: str,
+            help: str,
+            samples: list[tuple[str, dict[str, str], float]],
+        ):
+            name = f"{PROMETHEUS_PREFIX}_{name}"
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {type}")
+            lines.extend(
+                f"{name}{suffix}{_format_labels(labels)} {value}"
+                for suffix, labels, value in samples
+            )
+
+        add_metric(
+            "last_run_timestamp_seconds",
+            "gauge",
+            "Time the last run started",
+            [("", {}, report["started_at"])],
+        )
+        add_metric(
+            "last_run_duration_seconds",
+            "gauge",
+            "Duration of the last run",
+            [("", {}, report["duration"])],
+        )
+        for name, entries in _group_by_name(report["timers"]).items():
+            add_metric(
+                f"{name}_seconds",
+                "gauge",
+                f"Time spent in {name} in the last run",
+                [("", e["labels"], e["seconds"]) for e in entries],
+            )
+            add_metric(
+                f"{name}_calls",
+                "gauge",
+                f"Number of {name} calls in the last run",
+                [("", e["labels"], e["calls"]) for e in entries],
+            )
+        for name, entries in _group_by_name(report["counters"]).items():
+            add_metric(
+                name,
+                "gauge",
+                f"Total {name} in the last run",
+                [("", e["labels"], e["value"]) for e in entries],
+            )
+        for name, entries in _group_by_name(report["distributions"]).items():
+            add_metric(
+                name,
+                "summary",
+                f"Distribution of {name} in the last run",
+                [
+                    sample
+                    for e in entries
+                    for sample in [
+                        ("_sum", e["labels"], e["sum"]),
+                        ("_count", e["labels"], e["count"]),
+                    ]
+                ],
+            )
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.tmp")
+        temp_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(temp_path, path)
+
+
+_current: ContextVar[Optional[Metrics]] = ContextVar("metrics", default=None)
+
+
+# Record metrics of the code run inside the context to the given Metrics object
+@contextmanager
+def collect(metrics: Optional[Metrics]) -> Generator[Optional[Metrics], None, None]:
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+# Wrap fn to record to the metrics currently collecting, also when it is called from another thread (e.g. in a thread pool)
+def bind(fn: Callable[P, T]) -> Callable[P, T]:
+    metrics = _current.get()
+
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+        with collect(metrics):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+# Time the code inside the context. Does nothing if no metrics are collecting
+@contextmanager
+def timer(name: str, **labels: str) -> Generator[None, None, None]:
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_time(_key(name, labels), time.perf_counter() - start)
+
+
+# Decorator timing each call of the function (see timer). Not for generator functions, as only creating the generator would be timed
+def timed(name: str, **labels: str) -> Callable[[Callable[P, T]], Callable[P, T]]:
+    def decorator(fn: Callable[P, T]) -> Callable[P, T]:
+        @functools.wraps(fn)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            with timer(name, **labels):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# Time spent producing the items of the iterator, e.g. the row batches of a lazily scraped table (see TableStream).
+# Recorded as one call when the iteration ends. Time the consumer spends between items (e.g. writing rows) is not included
+def timed_iter(name: str, items: Iterator[T], **labels: str) -> Iterator[T]:
+    metrics = _current.get()
+    if metrics is None:
+        yield from items
+        return
+
+    seconds = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                seconds += time.perf_counter() - start
+            yield item
+    finally:
+        metrics.add_time(_key(name, labels), seconds)
+
+
+def count(name: str, value: float = 1, **labels: str):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_count(_key(name, labels), value)
+
+
+def observe(name: str, value: float, **labels: str):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_observation(_key(name, labels), value)
+
+
+# Log the metrics report of a run and write it to the given files
+def report(
+    metrics: Metrics,
+    json_path: Optional[Path] = None,
+    prometheus_path: Optional[Path] = None,
+):
+    logger.info(f"Metrics: {json.dumps(metrics.to_dict())}")
+    try:
+        if json_path:
+            metrics.write_json(json_path)
+            logger.debug(f"Metrics written to {json_path.absolute()}")
+        if prometheus_path:
+            metrics.write_prometheus(prometheus_path)
+            logger.debug(f"Prometheus metrics written to {prometheus_path.absolute()}")
+    # Metrics must not fail the run
+    except OSError as e:
+        logger.warning(f"Could not write metrics: {e}")
+
+
+def _key(name: str, labels: dict[str, str]) -> _Key:
+    return name, tuple(sorted(labels.items()))
+
+
+def _describe(key: _Key) -> dict[str, Any]:
+    name, labels = key
+    return {"name": name, "labels": dict(labels)}
+
+
+def _group_by_name(entries: list[dict[str, Any]]) -> dict[str, list[dict[str, Any]]]:
+    groups: dict[str, list[dict[str, Any]]] = {}
+    for entry in entries:
+        groups.setdefault(entry["name"], []).append(entry)
+    return groups
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        name
+        + '="'
+        + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        + '"'
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
@@ -0,0 +1,243 @@
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, TextIO
+
+from typing_extensions import override
+
+logger = logging.getLogger(__name__)
+
+# Min seconds between progress events
+MIN_EVENT_INTERVAL = 0.5
+# Number of last scraped rows included in progress events
+PREVIEW_ROWS = 10
+# Seconds between status lines when the console is not a terminal (e.g. when the output is redirected to a file)
+LOG_INTERVAL = 10
+
+
+# Progress of a table scrape
+# rows: Rows scraped so far, including rows resumed from a checkpoint
+# scroll_steps: Number of times the table was scrolled (pages of rows received for the network engine)
+# rows_per_second: Rows scraped per second since the scrape started (resumed rows not included)
+# total_rows: Number of rows of the table if known, e.g. from the row count of the table visual or from max_rows
+# last_rows: The last rows scraped, oldest first
+# table: Title of the table when scraping multiple tables, e.g. the filter value of a sweep or "<page> - <table>"
+@dataclass(frozen=True)
+class ProgressEvent:
+    columns: list[str]
+    rows: int
+    highest_row_index: int
+    scroll_steps: int
+    elapsed: float
+    rows_per_second: float
+    total_rows: Optional[int]
+    last_rows: list[list[str]]
+    is_done: bool = False
+    table: Optional[str] = None
+
+    # Fraction of the table scraped (0 to 1), if the number of rows is known
+    @property
+    def fraction(self) -> Optional[float]:
+        if not self.total_rows:
+            return None
+        return min(1.0, self.rows / self.total_rows)
+
+    # Estimated seconds until the table is scraped, if the number of rows is known
+    @property
+    def eta(self) -> Optional[float]:
+        if self.total_rows is None or not self.rows_per_second:
+            return None
+        return max(0, self.total_rows - self.rows) / self.rows_per_second
+
+
+ProgressListener = Callable[[ProgressEvent], None]
+
+
+# Turns the batches of rows of a table scrape into progress events for the listener.
+# Called from the scrape loop, so updates only count rows, and an event is only built at most every min_interval seconds.
+# initial_rows: Rows already scraped before this scrape, e.g. resumed from a checkpoint
+# table: Title of the table, when scraping multiple tables (see ProgressEvent)
+class ProgressTracker:
+    def __init__(
+        self,
+        listener: ProgressListener,
+        columns: list[str],
+        total_rows: Optional[int] = None,
+        initial_rows: int = 0,
+        min_interval: float = MIN_EVENT_INTERVAL,
+        table: Optional[str] = None,
+    ) -> None:
+        self._listener: Optional[ProgressListener] = listener
+        self._columns = columns
+        self._table = table
+        self._total_rows = total_rows
+        self._initial_rows = initial_rows
+        self._min_interval = min_interval
+        self._rows = initial_rows
+        self._highest_row_index = initial_rows - 1
+        self._scroll_steps = 0
+        self._last_rows: deque[list[str]] = deque(maxlen=PREVIEW_ROWS)
+        self._start = time.perf_counter()
+        self._last_event = float("-inf")
+
+    def on_scroll(self):
+        self._scroll_steps += 1
+
+    def on_batch(self, batch: list[tuple[int, list[str]]]):
+        self._rows += len(batch)
+        self._highest_row_index = max(
+            self._highest_row_index, max(index for index, _ in batch)
+        )
+        self._last_rows.extend(row for _, row in batch)
+
+        now = time.perf_counter()
+        if now - self._last_event >= self._min_interval:
+            self._last_event = now
+            self._publish(now, is_done=False)
+
+    def finish(self):
+        self._publish(time.perf_counter(), is_done=True)
+
+    def _publish(self, now: float, is_done: bool):
+        if self._listener is None:
+            return
+
+        elapsed = now - self._start
+        total_rows = self._total_rows
+        # The row count of the table was wrong, e.g. as rows were added while scraping
+        if total_rows is not None and self._rows > total_rows:
+            total_rows = None
+        event = ProgressEvent(
+            self._columns,
+            self._rows,
+            self._highest_row_index,
+            self._scroll_steps,
+            elapsed,
+            (self._rows - self._initial_rows) / elapsed if elapsed else 0,
+            self._rows if is_done else total_rows,
+            list(self._last_rows),
+            is_done,
+            self._table,
+        )
+        # Showing the progress must not fail the scrape
+        try:
+            self._listener(event)
+        except Exception as e:
+            logger.warning(
+                f"Progress listener failed, progress is no longer shown: {e}"
+            )
+            self._listener = None
+
+
+# Shows the progress of a scrape as a single status line that is updated in place.
+# If the output is not a terminal, a status line is logged every LOG_INTERVAL seconds instead.
+# Events may come from multiple threads, e.g. the sessions of a sweep.
+# Log records written to the terminal would be appended to the status line, so the line is cleared before each record and shown again with the next event.
+# close must be called when done, to stop clearing the line before log records
+class ConsoleProgress:
+    def __init__(self, stream: TextIO = sys.stdout) -> None:
+        self._stream = stream
+        self._is_terminal = _is_terminal(stream)
+        self._last_log = float("-inf")
+        self._line_length = 0
+        # Reentrant, as clearing the line for a log record may happen while an event is shown
+        self._lock = threading.RLock()
+        self._log_filter = _ClearLineFilter(self)
+        self._log_handlers: list[logging.Handler] = (
+            [
+                handler
+                for handler in logging.getLogger().handlers
+                if _is_terminal(getattr(handler, "stream", None))
+            ]
+            if self._is_terminal
+            else []
+        )
+        for handler in self._log_handlers:
+            handler.addFilter(self._log_filter)
+
+    def __call__(self, event: ProgressEvent):
+        with self._lock:
+            self._show(event)
+
+    def _show(self, event: ProgressEvent):
+        line = format_progress(event)
+        if not self._is_terminal:
+            now = time.perf_counter()
+            if event.is_done or now - self._last_log >= LOG_INTERVAL:
+                self._last_log = now
+                logger.info(line)
+            return
+
+        # Overwrite the previous line, also if it was longer
+        padding = " " * max(0, self._line_length - len(line))
+        self._stream.write(f"\r{line}{padding}" + ("\n" if event.is_done else ""))
+        self._stream.flush()
+        self._line_length = 0 if event.is_done else len(line)
+
+    # Remove the status line, e.g. before a log record is written to the terminal
+    def clear_line(self):
+        with self._lock:
+            if self._line_length:
+                self._stream.write(f"\r{' ' * self._line_length}\r")
+                self._stream.flush()
+                self._line_length = 0
+
+    # End the status line, e.g. if the scrape stopped before the table was done
+    def close(self):
+        for handler in self._log_handlers:
+            handler.removeFilter(self._log_filter)
+        with self._lock:
+            if self._line_length:
+                self._stream.write("\n")
+                self._stream.flush()
+                self._line_length = 0
+
+
+# Clears the status line of a ConsoleProgress before a log record is written by the handler it is added to
+class _ClearLineFilter(logging.Filter):
+    def __init__(self, progress: ConsoleProgress) -> None:
+        super().__init__()
+        self._progress = progress
+
+    @override
+    def filter(self, record: logging.LogRecord) -> bool:
+        self._progress.clear_line()
+        return True
+
+
+def _is_terminal(stream: Any) -> bool:
+    try:
+        return bool(stream.isatty())
+    # E.g. a closed stream or a stream without isatty
+    except (AttributeError, ValueError):
+        return False
+
+
+# E.g. "Rows: 12,300 of 50,000 (24.6%) | 812 rows/s | ETA 0:00:46 | scroll steps: 517", prefixed with the table title when scraping multiple tables
+def format_progress(event: ProgressEvent) -> str:
+    parts = [event.table] if event.table else []
+    parts += [
+        f"Rows: {event.rows:,}"
+        + (
+            f" of {event.total_rows:,} ({event.fraction:.1%})"
+            if event.total_rows and event.fraction is not None
+            else ""
+        ),
+        f"{event.rows_per_second:,.0f} rows/s",
+    ]
+    if event.is_done:
+        parts.append(f"done in {format_duration(event.elapsed)}")
+    elif event.eta is not None:
+        parts.append(f"ETA {format_duration(event.eta)}")
+    parts.append(f"scroll steps: {event.scroll_steps}")
+    return " | ".join(parts)
+
+
+# E.g. 0:01:05
+def format_duration(seconds: float) -> str:
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}"
@@ -1,14 +1,39 @@
+# pyright: reportUnknownMemberType=false
+
 # import log
 import logging
+import re
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Hashable, Iterable, Optional, cast
 
 import pandas as pd
 
-from src.config import OutputFormat
+from src import metrics
+from src.cache import NamedTable
+from src.config import Locale, OutputFormat, ParquetCompression
+from src.sink import ExcelSheetSink, ExcelSink, ExcelWorkbook
+from src.type_inference import infer_types
 
 logger = logging.getLogger(__name__)
 
 
+# infer_types: Convert formatted numbers, percentages and dates to typed columns before saving
+# locale: Locale used to parse numbers and dates when inferring types
+# parquet_compression: Compression used when saving as parquet
+@dataclass(frozen=True)
+class SaveOptions:
+    infer_types: bool = False
+    locale: Locale = Locale.EN
+    parquet_compression: ParquetCompression = ParquetCompression.SNAPPY
+
+
+# Number of rows measured to fit the Excel column widths
+COLUMN_WIDTH_SAMPLE_SIZE = 100_000
+# Number of rows converted and written at a time
+EXCEL_WRITE_CHUNK_SIZE = 10_000
+
+
 def save_csv(df: pd.DataFrame, path: Path) -> Path:
     # Warn if file name ends with .csv (we do not want to risk overwriting a file unintentionally by changing the path suffix from code)
     if path.suffix != ".csv":
@@ -19,34 +44,152 @@ def save_csv(df: pd.DataFrame, path: Path) -> Path:
     return path
 
 
-def save_excel(df: pd.DataFrame, path: Path) -> Path:
-    if path.suffix != ".xlsx":
-        logger.warning(f"Saving as excel, but file extension is {path.suffix}")
-        # raise ValueError(f"Path must end with .xlsx, got {path}")
+def save_excel(df: pd.DataFrame, path: Path, constant_memory: bool = True) -> Path:
+    # Rows are written directly using xlsxwriter, which is faster than DataFrame.to_excel and splits large tables into multiple sheets
+    _write_excel_rows(
+        ExcelSink(path, constant_memory, column_widths=_measure_column_widths(df)), df
+    )
+    return path
+
 
-    with pd.ExcelWriter(path) as writer:
-        EXTRA_SPACE = 4
-        SHEET_NAME = "Sheet1"
+def _write_excel_rows(sink: ExcelSheetSink, df: pd.DataFrame):
+    sink.open([str(column) for column in cast(Iterable[Hashable], df.columns)])
+    try:
+        for start in range(0, len(df), EXCEL_WRITE_CHUNK_SIZE):
+            chunk = cast(pd.DataFrame, df.iloc[start : start + EXCEL_WRITE_CHUNK_SIZE])
+            # Write missing values as empty cells
+            values = chunk.astype(object).where(chunk.notna(), None)
+            sink.write(cast(list[list[Any]], values.to_numpy().tolist()))
+    except BaseException:
+        sink.discard()
+        raise
+    sink.close()
 
-        df.to_excel(writer, sheet_name=SHEET_NAME, index=False)  # type: ignore
 
-        # Auto-adjust all columns to fit their longest value
-        for column in df:
-            column_length: int = max(df[column].astype(str).map(len).max(), len(column))  # type: ignore
-            col_idx = df.columns.get_loc(column)  # type: ignore
-            writer.sheets[SHEET_NAME].set_column(
-                col_idx, col_idx, column_length + EXTRA_SPACE
-            )
+# Length of the longest value in each column (or the column name if longer).
+# For large tables, only a sample of the rows is measured.
+def _measure_column_widths(df: pd.DataFrame) -> list[int]:
+    sample = (
+        df.sample(COLUMN_WIDTH_SAMPLE_SIZE, random_state=0)
+        if len(df) > COLUMN_WIDTH_SAMPLE_SIZE
+        else df
+    )
 
+    widths: list[int] = []
+    for i, column in enumerate(cast(Iterable[Hashable], df.columns)):
+        lengths = cast(
+            pd.Series, cast(pd.Series, sample.iloc[:, i]).astype(str).str.len()
+        )
+        longest = int(cast(int, lengths.max())) if len(lengths) else 0
+        widths.append(max(longest, len(str(column))))
+    return widths
+
+
+def save_parquet(df: pd.DataFrame, path: Path, compression: ParquetCompression) -> Path:
+    if path.suffix != ".parquet":
+        logger.warning(f"Saving as parquet, but file extension is {path.suffix}")
+
+    _require_pyarrow(OutputFormat.PARQUET)
+    df.to_parquet(
+        path,
+        index=False,
+        compression=None
+        if compression == ParquetCompression.NONE
+        else compression.value,
+    )
     return path
 
 
-def save_table(df: pd.DataFrame, path: Path, format: OutputFormat):
+def save_feather(df: pd.DataFrame, path: Path) -> Path:
+    if path.suffix not in (".feather", ".arrow"):
+        logger.warning(f"Saving as feather, but file extension is {path.suffix}")
+
+    _require_pyarrow(OutputFormat.FEATHER)
+    df.to_feather(path)
+    return path
+
+
+# pyarrow is an optional dependency only needed for the columnar formats
+def _require_pyarrow(format: OutputFormat):
+    try:
+        import pyarrow  # type: ignore
+    except ImportError as e:
+        raise ImportError(
+            f"Saving as {format.value} requires pyarrow. Install it with: pip install pyarrow"
+        ) from e
+
+
+def save_table(
+    df: pd.DataFrame,
+    path: Path,
+    format: OutputFormat,
+    options: Optional[SaveOptions] = None,
+):
+    options = options or SaveOptions()
     # Ensure dir exists
     path.parent.mkdir(parents=True, exist_ok=True)
 
-    match format:
-        case OutputFormat.CSV:
-            return save_csv(df, path)
-        case OutputFormat.EXCEL:
-            return save_excel(df, path)
+    with metrics.timer("save_table", format=format.value):
+        if options.infer_types:
+            df, _ = infer_types(df, options.locale)
+
+        match format:
+            case OutputFormat.CSV:
+                return save_csv(df, path)
+            case OutputFormat.EXCEL:
+                return save_excel(df, path)
+            case OutputFormat.PARQUET:
+                return save_parquet(df, path, options.parquet_compression)
+            case OutputFormat.FEATHER:
+                return save_feather(df, path)
+
+
+# Save multiple named tables. Excel files get a sheet per table (named after the table), other formats a file per table (see get_table_path).
+# Returns the paths of the saved files
+def save_tables(
+    tables: list[NamedTable],
+    path: Path,
+    format: OutputFormat,
+    options: Optional[SaveOptions] = None,
+) -> list[Path]:
+    options = options or SaveOptions()
+    if format != OutputFormat.EXCEL:
+        return [
+            save_table(df, get_table_path(path, i, name), format, options)
+            for i, (name, df) in enumerate(tables)
+        ]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with metrics.timer("save_table", format=format.value):
+        workbook = ExcelWorkbook(path)
+        try:
+            for name, df in tables:
+                if options.infer_types:
+                    df, _ = infer_types(df, options.locale)
+                _write_excel_rows(
+                    workbook.add_table(name, _measure_column_widths(df)), df
+                )
+        # Keep an existing output file
+        except BaseException:
+            workbook.discard()
+            raise
+        workbook.close()
+    return [path]
+
+
+# Path of a table when saving multiple tables to separate files, e.g. ./output.csv -> ./output_1_Sales by region.csv
+def get_table_path(path: Path, index: int, name: str) -> Path:
+    name = re.sub(r"[^\w\- ]", "", name).strip()
+    return path.with_name(
+        f"{path.stem}_{index + 1}_{name}{path.suffix}"
+        if name
+        else f"{path.stem}_{index + 1}{path.suffix}"
+    )
+
+
+# Formats that can be written while scraping. Other formats need the full table before saving.
+def is_streamable(format: OutputFormat, options: Optional[SaveOptions] = None) -> bool:
+    # Type inference needs full columns
+    return format in (OutputFormat.CSV, OutputFormat.EXCEL) and not (
+        options and options.infer_types
+    )
@@ -0,0 +1,304 @@
+import heapq
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from src import metrics
+from src.cancellation import CancellationToken, ScrapeCancelledError
+from src.cron import CronExpression
+from src.usecase import ScrapeResult
+
+logger = logging.getLogger(__name__)
+
+# Max seconds the scheduler sleeps before checking the clock again, so it keeps to the schedule if the system clock changes
+MAX_SLEEP = 60
+
+
+class RunStatus(Enum):
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    SKIPPED = "skipped"  # The previous run of the job was still running
+
+
+# A run of a scheduled job
+# scheduled_at: The time the run was scheduled at by the cron expression (without jitter)
+# duration: Seconds from the start to the end of the run
+@dataclass(frozen=True)
+class ScheduledRun:
+    job: str
+    scheduled_at: datetime
+    started_at: datetime
+    duration: float
+    rows: int
+    status: RunStatus
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "job": self.job,
+            "scheduled_at": self.scheduled_at.isoformat(),
+            "started_at": self.started_at.isoformat(),
+            "duration": self.duration,
+            "rows": self.rows,
+            "status": self.status.value,
+            "error": self.error,
+        }
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> "ScheduledRun":
+        return ScheduledRun(
+            data["job"],
+            datetime.fromisoformat(data["scheduled_at"]),
+            datetime.fromisoformat(data["started_at"]),
+            float(data["duration"]),
+            int(data["rows"]),
+            RunStatus(data["status"]),
+            data.get("error"),
+        )
+
+
+# The last runs of each job (up to size runs per job), e.g. to see how long a job takes and when the scraping host is busiest.
+# If a path is given, the history is loaded from the file and the file is replaced after each run, so it survives restarts.
+class RunHistory:
+    def __init__(self, path: Optional[Path] = None, size: int = 100) -> None:
+        self._path = path
+        self._size = size
+        self._runs: dict[str, deque[ScheduledRun]] = {}
+        self._lock = threading.Lock()
+
+        if path is not None and path.exists():
+            self._load(path)
+
+    def add(self, run: ScheduledRun):
+        with self._lock:
+            self._runs.setdefault(run.job, deque(maxlen=self._size)).append(run)
+            data = {
+                job: [run.to_dict() for run in runs] for job, runs in self._runs.items()
+            }
+        if self._path is not None:
+            self._save(self._path, data)
+
+    # Oldest first
+    def get_runs(self, job: str) -> list[ScheduledRun]:
+        with self._lock:
+            return list(self._runs.get(job, ()))
+
+    # E.g. "last 20 runs: 18 succeeded, 1 failed, 1 skipped | duration avg 42.1s, max 63.0s | rows avg 12,034"
+    def summarize(self, job: str) -> str:
+        runs = self.get_runs(job)
+        counts = {
+            status: sum(1 for run in runs if run.status == status)
+            for status in RunStatus
+        }
+        parts = [
+            f"last {len(runs)} runs: "
+            + ", ".join(
+                f"{count} {status.value}" for status, count in counts.items() if count
+            )
+        ]
+        succeeded = [run for run in runs if run.status == RunStatus.SUCCEEDED]
+        if succeeded:
+            durations = [run.duration for run in succeeded]
+            parts.append(
+                f"duration avg {sum(durations) / len(durations):.1f}s, max {max(durations):.1f}s"
+            )
+            parts.append(
+                f"rows avg {sum(run.rows for run in succeeded) / len(succeeded):,.0f}"
+            )
+        return " | ".join(parts)
+
+    def _load(self, path: Path):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            for job, runs in data.items():
+                self._runs[job] = deque(
+                    (ScheduledRun.from_dict(run) for run in runs), maxlen=self._size
+                )
+            logger.debug(f"Run history loaded from {path.absolute()}")
+        # The history is only informational, so a broken file must not stop the scheduler
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning(
+                f"Could not load run history from {path}, starting anew: {e}"
+            )
+            self._runs = {}
+
+    # The file is replaced atomically, so a crash never leaves a partial file (see Metrics.write_prometheus)
+    def _save(self, path: Path, data: dict[str, Any]):
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(f"{path.name}.tmp")
+            temp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not save run history: {e}")
+
+
+# run: Scrapes and saves the job. Called on a worker thread with the scheduled time of the run and a token that is cancelled when the scheduler stops
+@dataclass(frozen=True)
+class ScheduledJob:
+    name: str
+    cron: CronExpression
+    run: Callable[[datetime, CancellationToken], ScrapeResult]
+
+
+# Runs jobs when their cron expressions are due, on a fixed number of worker threads, so at most 'workers' reports are scraped at a time.
+# A run that is due while the previous run of the same job is still running (or waiting for a worker) is skipped, so slow jobs do not pile up.
+# Each run starts a random delay (up to max_jitter seconds) after its scheduled time, so jobs scheduled at the same time are spread out.
+# As in cron, runs missed while the scheduler was not running (or was busy) are not made up for.
+# report_metrics: Called with the metrics of each run when it is done
+class Scheduler:
+    def __init__(
+        self,
+        jobs: list[ScheduledJob],
+        workers: int = 2,
+        max_jitter: float = 30,
+        history: Optional[RunHistory] = None,
+        report_metrics: Optional[Callable[[metrics.Metrics], None]] = None,
+    ) -> None:
+        self._jobs = jobs
+        self._worker_count = workers
+        self._max_jitter = max_jitter
+        self._history = history or RunHistory()
+        self._report_metrics = report_metrics
+
+        self._lock = threading.Lock()
+        # Token of the current run of each job, from the time it is submitted to a worker until it is done
+        self._active: dict[str, CancellationToken] = {}
+        # Heap of (start time, sequence number, job, scheduled time)
+        self._queue: list[tuple[datetime, int, ScheduledJob, datetime]] = []
+        self._sequence = 0
+
+    @property
+    def history(self) -> RunHistory:
+        return self._history
+
+    # Run the jobs until the token is cancelled. Running jobs are then cancelled and save the rows scraped so far
+    def run(self, cancel_token: CancellationToken):
+        now = datetime.now()
+        for job in self._jobs:
+            self._schedule(job, now)
+        for start_at, _, job, _ in sorted(self._queue):
+            logger.info(
+                f"Job '{job.name}' ({job.cron}) next runs at {start_at:%Y-%m-%d %H:%M:%S}"
+            )
+
+        executor = ThreadPoolExecutor(
+            self._worker_count, thread_name_prefix="scheduler-worker"
+        )
+        logger.info(
+            f"Scheduler started with {len(self._jobs)} jobs and {self._worker_count} workers"
+        )
+        try:
+            while not cancel_token.is_cancelled and self._queue:
+                start_at, _, job, scheduled_at = self._queue[0]
+                delay = (start_at - datetime.now()).total_seconds()
+                if delay > 0:
+                    cancel_token.wait(min(delay, MAX_SLEEP))
+                    continue
+
+                heapq.heappop(self._queue)
+                self._start(executor, job, scheduled_at)
+                self._schedule(job, max(scheduled_at, datetime.now()))
+        finally:
+            with self._lock:
+                running = list(self._active.values())
+            if running:
+                logger.info(f"Cancelling {len(running)} running jobs...")
+            for token in running:
+                token.cancel()
+            executor.shutdown(wait=True, cancel_futures=True)
+            logger.info("Scheduler stopped")
+
+    # Queue the next run of the job after the given time
+    def _schedule(self, job: ScheduledJob, after: datetime):
+        scheduled_at = job.cron.next_after(after)
+        if scheduled_at is None:
+            logger.warning(f"Job '{job.name}' ({job.cron}) will not run again")
+            return
+        start_at = scheduled_at + timedelta(seconds=random.uniform(0, self._max_jitter))
+        self._sequence += 1
+        heapq.heappush(self._queue, (start_at, self._sequence, job, scheduled_at))
+
+    def _start(
+        self, executor: ThreadPoolExecutor, job: ScheduledJob, scheduled_at: datetime
+    ):
+        token = CancellationToken()
+        with self._lock:
+            is_active = job.name in self._active
+            if not is_active:
+                self._active[job.name] = token
+
+        if is_active:
+            logger.warning(
+                f"Skipping run of job '{job.name}' scheduled at {scheduled_at:%Y-%m-%d %H:%M}, the previous run has not finished"
+            )
+            self._history.add(
+                ScheduledRun(
+                    job.name,
+                    scheduled_at,
+                    datetime.now(),
+                    0,
+                    0,
+                    RunStatus.SKIPPED,
+                    "Previous run has not finished",
+                )
+            )
+            return
+        executor.submit(self._run_job, job, scheduled_at, token)
+
+    def _run_job(
+        self, job: ScheduledJob, scheduled_at: datetime, token: CancellationToken
+    ):
+        started_at = datetime.now()
+        start = time.perf_counter()
+        logger.info(
+            f"Job '{job.name}' started (scheduled at {scheduled_at:%Y-%m-%d %H:%M}, {(started_at - scheduled_at).total_seconds():.1f}s late)"
+        )
+        job_metrics = metrics.Metrics()
+        result = None
+        error = None
+        try:
+            with metrics.collect(job_metrics):
+                result = job.run(scheduled_at, token)
+        except ScrapeCancelledError as e:
+            error = str(e)
+        except Exception as e:
+            logger.exception(f"Job '{job.name}' failed: {e}")
+            error = str(e) or type(e).__name__
+        finally:
+            with self._lock:
+                del self._active[job.name]
+
+        # A cancelled run may have saved the rows scraped until it was cancelled
+        if token.is_cancelled:
+            status = RunStatus.CANCELLED
+        elif result:
+            status = RunStatus.SUCCEEDED
+        else:
+            status = RunStatus.FAILED
+        run = ScheduledRun(
+            job.name,
+            scheduled_at,
+            started_at,
+            time.perf_counter() - start,
+            result.rows if result else 0,
+            status,
+            error,
+        )
+        self._history.add(run)
+        logger.info(
+            f"Job '{job.name}' {status.value} in {run.duration:.1f}s [rows: {run.rows}] ({self._history.summarize(job.name)})"
+        )
+        if self._report_metrics:
+            self._report_metrics(job_metrics)
@@ -0,0 +1,119 @@
+# pyright: reportUnknownMemberType=false
+
+import logging
+import time
+from typing import Any, Optional, cast
+
+from selenium.webdriver.chrome.webdriver import WebDriver
+from selenium.webdriver.remote.webelement import WebElement
+
+from src import metrics
+
+logger = logging.getLogger(__name__)
+
+# Installs a MutationObserver on arguments[0] (once) that counts DOM changes and remembers the time of the last change.
+# arguments[1]: Attribute names to observe in addition to added/removed nodes and text changes
+# Returns the current number of changes
+INSTALL_OBSERVER_SCRIPT = """
+const el = arguments[0];
+if (!el.__domChangeState) {
+    const state = { changes: 0, lastChange: performance.now() };
+    state.observer = new MutationObserver((mutations) => {
+        state.changes += mutations.length;
+        state.lastChange = performance.now();
+    });
+    const attributeFilter = arguments[1];
+    state.observer.observe(el, {
+        childList: true,
+        subtree: true,
+        characterData: true,
+        attributes: attributeFilter.length > 0,
+        ...(attributeFilter.length > 0 ? { attributeFilter } : {}),
+    });
+    el.__domChangeState = state;
+}
+return el.__domChangeState.changes;
+"""
+
+# Waits (asynchronously) until the DOM below arguments[0] has changed since change number arguments[1] and then stayed quiet for arguments[2] ms.
+# If arguments[3] is false, also returns if no changes happen within the idle window. Gives up after arguments[4] ms.
+# Returns [number of changes, whether the DOM changed]
+WAIT_FOR_CHANGE_SCRIPT = """
+const [el, since, idleMs, requireChange, timeoutMs, done] = arguments;
+const state = el.__domChangeState;
+if (!state) {
+    done([0, false]);
+    return;
+}
+const start = performance.now();
+const check = () => {
+    const now = performance.now();
+    const changed = state.changes > since;
+    const quietFor = now - (changed ? state.lastChange : start);
+    if ((changed || !requireChange) && quietFor >= idleMs) {
+        done([state.changes, changed]);
+    } else if (now - start >= timeoutMs) {
+        done([state.changes, changed]);
+    } else {
+        setTimeout(check, 10);
+    }
+};
+check();
+"""
+
+
+# Waits for the DOM below an element to change and settle instead of pausing for a fixed time.
+# Uses a MutationObserver in the page, so we do not need to wait for element visibility (EC.visibility_of_element_located may freeze Power BI)
+# idle_window: Seconds without DOM changes before the DOM is considered settled
+# timeout: Max seconds to wait for a change
+class DomChangeWaiter:
+    def __init__(
+        self,
+        driver: WebDriver,
+        element: WebElement,
+        idle_window: float,
+        timeout: float,
+        attribute_filter: Optional[list[str]] = None,
+        name: str = "element",
+    ) -> None:
+        self._driver = driver
+        self._element = element
+        self._idle_window = idle_window
+        self._timeout = timeout
+        self._attribute_filter = attribute_filter or []
+        self._name = name
+        self._changes = 0
+
+    # Start observing. Must be called before the action that should change the DOM
+    def install(self):
+        self._changes = int(
+            self._driver.execute_script(  # type: ignore
+                INSTALL_OBSERVER_SCRIPT, self._element, self._attribute_filter
+            )
+        )
+
+    # Block until the DOM has changed since the last wait and then settled, or until the timeout.
+    # If require_change is false, also return if the DOM stays quiet for the idle window.
+    # Returns whether the DOM changed
+    def wait(self, require_change: bool = True) -> bool:
+        start = time.perf_counter()
+        with metrics.timer("wait_for_render", target=self._name):
+            result = cast(
+                list[Any],
+                self._driver.execute_async_script(
+                    WAIT_FOR_CHANGE_SCRIPT,
+                    self._element,
+                    self._changes,
+                    self._idle_window * 1000,
+                    require_change,
+                    self._timeout * 1000,
+                ),
+            )
+        changes, has_changed = int(result[0]), bool(result[1])
+        if require_change and not has_changed:
+            metrics.count("render_timeouts", target=self._name)
+        logger.debug(
+            f"Waited {(time.perf_counter() - start) * 1000:.0f} ms for {self._name} ({'changed' if has_changed else 'no changes'}, {changes - self._changes} mutations)"
+        )
+        self._changes = changes
+        return has_changed
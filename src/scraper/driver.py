@@ -1,17 +1,22 @@
 # pyright: reportUnknownMemberType=false
 
 import logging
-from subprocess import CREATE_NO_WINDOW
+import subprocess
+from typing import Any, Optional
 
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.chrome.webdriver import WebDriver
 
+from src import metrics
+from src.config import ScrapeEngine
 from src.scraper.powerbi_scraper import ScraperOptions
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_WAIT = 10  # seconds
+# Only defined on Windows, where the driver would otherwise open a console window
+CREATE_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
 
 
 # Create driver by inheriting from webdriver.Chrome
@@ -29,6 +34,18 @@ class CustomDriver(WebDriver):
         if options.is_headless:
             chrome_options.add_argument("--headless=new")
 
-        super().__init__(options=chrome_options, service=chrome_service)
+        # Network events are needed to read the data responses when using the network engine
+        if options.engine == ScrapeEngine.NETWORK:
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+        with metrics.timer("start_browser"):
+            super().__init__(options=chrome_options, service=chrome_service)
         # Driver will wait for X seconds for elements to appear before throwing an exception (default is 0)
         self.implicitly_wait(DEFAULT_WAIT)
+
+    # All WebDriver calls (find_element(s), execute_script, ActionChains etc.) go through here, so they are counted and timed per command
+    def execute(
+        self, driver_command: str, params: Optional[dict[str, Any]] = None
+    ) -> dict[str, Any]:
+        with metrics.timer("webdriver_command", command=driver_command):
+            return super().execute(driver_command, params)  # type: ignore
@@ -0,0 +1,191 @@
+# pyright: reportUnknownMemberType=false
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Generator, Optional, cast
+
+from selenium.common.exceptions import WebDriverException
+
+from src.config import ScrapeEngine
+from src.scraper.driver import DEFAULT_WAIT, CustomDriver
+from src.scraper.powerbi_scraper import ScraperOptions
+
+logger = logging.getLogger(__name__)
+
+BLANK_PAGE_URL = "about:blank"
+JS_HEAP_SIZE_SCRIPT = "return window.performance.memory ? window.performance.memory.usedJSHeapSize : null;"
+
+
+# A session can only be reused for options that were used when starting the browser
+@dataclass(frozen=True)
+class _SessionKey:
+    is_headless: bool
+    is_console_enabled: bool
+    engine: ScrapeEngine
+
+    @staticmethod
+    def from_options(options: ScraperOptions) -> "_SessionKey":
+        return _SessionKey(
+            options.is_headless, options.is_console_enabled, options.engine
+        )
+
+
+@dataclass
+class _Session:
+    driver: CustomDriver
+    key: _SessionKey
+    uses: int = 0
+
+
+# Keeps up to 'size' browser sessions alive between scrapes, so a scrape does not have to pay for browser startup and a cold cache.
+# max_uses: Number of scrapes after which a session is closed and replaced by a new one
+# max_memory_mb: Close a session instead of reusing it if its JS heap has grown beyond this size
+class DriverPool:
+    def __init__(
+        self,
+        size: int,
+        max_uses: int = 20,
+        max_memory_mb: Optional[int] = None,
+    ):
+        self._size = size
+        self._max_uses = max_uses
+        self._max_memory_mb = max_memory_mb
+        self._idle: list[_Session] = []
+        self._busy_count = 0
+        self._lock = threading.Lock()
+        # Blocks when all sessions are in use
+        self._slots = threading.BoundedSemaphore(size)
+        self._is_closed = False
+
+        # Stats
+        self.cold_starts = 0
+        self.warm_hits = 0
+
+    # Start sessions up front, so the first scrapes can use a warm session
+    def warm_up(self, options: ScraperOptions, count: Optional[int] = None):
+        count = min(count or self._size, self._size)
+        logger.debug(f"Warming up {count} driver sessions...")
+        sessions = [self._acquire(options) for _ in range(count)]
+        for session in sessions:
+            self._release(session)
+
+    # Borrow a driver. The driver is reset and returned to the pool when the context exits
+    @contextmanager
+    def acquire(self, options: ScraperOptions) -> Generator[CustomDriver, None, None]:
+        session = self._acquire(options)
+        try:
+            yield session.driver
+        finally:
+            session.uses += 1
+            self._release(session)
+
+    def close(self):
+        with self._lock:
+            self._is_closed = True
+            idle, self._idle = self._idle, []
+
+        for session in idle:
+            self._quit(session)
+
+        logger.debug(
+            f"Driver pool closed. Cold starts: {self.cold_starts}, warm hits: {self.warm_hits}"
+        )
+
+    def _acquire(self, options: ScraperOptions) -> _Session:
+        start = time.perf_counter()
+        key = _SessionKey.from_options(options)
+        self._slots.acquire()
+
+        evicted = None
+        with self._lock:
+            if self._is_closed:
+                self._slots.release()
+                raise RuntimeError("Driver pool is closed")
+
+            session = next((s for s in self._idle if s.key == key), None)
+            if session:
+                self._idle.remove(session)
+                # Also a warm hit if the session was started by warm_up and not used yet
+                self.warm_hits += 1
+            # Make room for a new session by closing an idle session started with other options
+            elif self._idle and len(self._idle) + self._busy_count >= self._size:
+                evicted = self._idle.pop(0)
+            self._busy_count += 1
+
+        if evicted:
+            logger.debug("Closing idle driver session started with other options")
+            self._quit(evicted)
+
+        is_warm = session is not None
+        if session is None:
+            try:
+                session = _Session(CustomDriver(options), key)
+            except Exception:
+                with self._lock:
+                    self._busy_count -= 1
+                self._slots.release()
+                raise
+            with self._lock:
+                self.cold_starts += 1
+
+        logger.debug(
+            f"Acquired {'warm' if is_warm else 'new'} driver session in {time.perf_counter() - start:.2f}s"
+        )
+        return session
+
+    def _release(self, session: _Session):
+        is_reusable = not self._should_recycle(session) and self._reset(session)
+
+        with self._lock:
+            self._busy_count -= 1
+            is_reusable = is_reusable and not self._is_closed
+            if is_reusable:
+                self._idle.append(session)
+
+        if not is_reusable:
+            self._quit(session)
+        self._slots.release()
+
+    def _should_recycle(self, session: _Session) -> bool:
+        if session.uses >= self._max_uses:
+            logger.debug(f"Recycling driver session after {session.uses} uses")
+            return True
+
+        if self._max_memory_mb is None:
+            return False
+
+        try:
+            heap_size = cast(
+                Optional[int], session.driver.execute_script(JS_HEAP_SIZE_SCRIPT)
+            )
+        except WebDriverException:
+            return True  # Session is broken, e.g. browser closed due to timeout
+
+        heap_size_mb = int(heap_size or 0) / 1024 / 1024
+        if heap_size_mb > self._max_memory_mb:
+            logger.debug(
+                f"Recycling driver session using {heap_size_mb:.0f} MB of memory (max {self._max_memory_mb} MB)"
+            )
+            return True
+        return False
+
+    # Reset the session state left behind by a scrape. Returns false if the session can not be reused
+    def _reset(self, session: _Session) -> bool:
+        try:
+            session.driver.switch_to.default_content()
+            # Navigating away keeps the browser cache (e.g. Power BI scripts) warm for the next scrape
+            session.driver.get(BLANK_PAGE_URL)
+            session.driver.implicitly_wait(DEFAULT_WAIT)
+            return True
+        except WebDriverException as e:
+            logger.debug(f"Could not reset driver session, it will be closed: {e}")
+            return False
+
+    def _quit(self, session: _Session):
+        try:
+            session.driver.quit()
+        except WebDriverException as e:
+            logger.debug(f"Error while closing driver session: {e}")
@@ -0,0 +1,125 @@
+import csv
+import json
+import logging
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Decodes the "DSR" (data shape result) format used by Power BI querydata responses.
+#
+# Response structure (only the parts we use):
+#   results[0].result.data.descriptor.Select: [{"Value": "G0", "Name": "Sales.Region"}, ...] (column names by column id)
+#   results[0].result.data.dsr.DS[0]:
+#     PH[0].DM0: Rows. The first row has "S", the schema: [{"N": "G0", "T": 1, "DN": "D0"}, ...]
+#       "C": Values of the row, only for columns that are not repeated and not null
+#       "R": Bitmask of columns that repeat the value of the previous row
+#       "Ø": Bitmask of columns that are null
+#     ValueDicts: {"D0": ["a", "b", ...]} Columns with "DN" contain indicies into these lists instead of values
+#     RT: Restart tokens. Present if there are more rows than included in the response
+
+# Schema type of date/time values, which are sent as milliseconds since epoch
+DATETIME_TYPE = 7
+
+
+class DsrDecodeError(ValueError):
+    pass
+
+
+# A decoded page of rows
+# has_more: True if Power BI has more rows than included in this page (loaded when scrolling)
+@dataclass(frozen=True)
+class DsrPage:
+    columns: list[str]
+    rows: list[list[str]]
+    has_more: bool
+
+
+def decode_query_result(response: dict[str, Any]) -> DsrPage:
+    try:
+        data = response["results"][0]["result"]["data"]
+        dataset = data["dsr"]["DS"][0]
+        raw_rows: list[dict[str, Any]] = dataset["PH"][0]["DM0"]
+    except (KeyError, IndexError, TypeError) as e:
+        raise DsrDecodeError(f"Not a table query result, missing {e}") from e
+
+    column_names = {
+        select["Value"]: select.get("Name", select["Value"])
+        for select in data.get("descriptor", {}).get("Select", [])
+    }
+    value_dicts: dict[str, list[Any]] = dataset.get("ValueDicts", {})
+
+    schema: list[dict[str, Any]] = []
+    rows: list[list[str]] = []
+    previous: list[Any] = []
+    for raw_row in raw_rows:
+        if "S" in raw_row:
+            schema = raw_row["S"]
+            previous = [None] * len(schema)
+        if not schema:
+            raise DsrDecodeError("Row found before schema")
+        previous = _decode_row(raw_row, schema, previous, value_dicts)
+        rows.append(
+            [_format_value(value, column) for value, column in zip(previous, schema)]
+        )
+
+    columns = [column_names.get(column["N"], column["N"]) for column in schema]
+    return DsrPage(columns, rows, has_more=bool(dataset.get("RT")))
+
+
+def _decode_row(
+    raw_row: dict[str, Any],
+    schema: list[dict[str, Any]],
+    previous: list[Any],
+    value_dicts: dict[str, list[Any]],
+) -> list[Any]:
+    values = iter(raw_row.get("C", []))
+    repeated: int = raw_row.get("R", 0)
+    nulls: int = raw_row.get("Ø", 0)
+
+    row: list[Any] = []
+    for i, column in enumerate(schema):
+        if repeated & (1 << i):
+            row.append(previous[i])
+        elif nulls & (1 << i):
+            row.append(None)
+        else:
+            try:
+                value = next(values)
+            except StopIteration:
+                raise DsrDecodeError(
+                    f"Missing value for column {column['N']}"
+                ) from None
+            if "DN" in column and isinstance(value, int):
+                value = value_dicts[column["DN"]][value]
+            row.append(value)
+    return row
+
+
+def _format_value(value: Any, column: dict[str, Any]) -> str:
+    if value is None:
+        return ""
+    if column.get("T") == DATETIME_TYPE and isinstance(value, (int, float)):
+        date = datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+        return date.strftime("%Y-%m-%d %H:%M:%S").removesuffix(" 00:00:00")
+    return str(value)
+
+
+# Decode recorded querydata responses (JSON files) offline, e.g. to check a report's responses without a browser.
+# Usage: python -m src.scraper.dsr response_1.json [response_2.json ...] > table.csv
+def _main(paths: list[str]):
+    writer = csv.writer(sys.stdout)
+    columns: Optional[list[str]] = None
+    for path in paths:
+        page = decode_query_result(json.loads(Path(path).read_text(encoding="utf-8")))
+        if columns is None:
+            columns = page.columns
+            writer.writerow(columns)
+        writer.writerows(page.rows)
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
@@ -1,69 +1,278 @@
 # pyright: reportUnknownMemberType=false
 
 import logging
+from typing import Any, Callable, Optional, cast
 
 from selenium.webdriver import ActionChains
 from selenium.webdriver.chrome.webdriver import WebDriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.remote.webelement import WebElement
+
+from src import metrics
+from src.cancellation import CancellationToken
+from src.scraper.dom_waiter import DomChangeWaiter
 
 logger = logging.getLogger(__name__)
 
 # CSS selectors
 FILTER_CSS_SELECTOR = 'div[role="listbox"]'
-CHECKED_FILTER_CSS_SELECTOR = 'div[aria-checked="true"]'
-UNCHECKED_FILTER_CSS_SELECTOR = 'div[aria-checked="false"]'
+FILTER_ITEM_CSS_SELECTOR = "div[aria-checked]"
+# The "Select all" item of a slicer. It is not part of the values of the slicer
+SELECT_ALL_CSS_SELECTOR = ".selectAllItem, [aria-label='Select all' i]"
+
+# Number of items kept in view between scroll steps, so no item is skipped
+SCROLL_OVERLAP = 1
+
+# Elements that may scroll the slicer list (listbox): the listbox, its children and its parents
+SCROLL_ELEMENTS_SCRIPT = """
+const getScrollElements = (listbox) => {
+    const elements = Array.from(listbox.querySelectorAll("*"));
+    for (let parent = listbox; parent; parent = parent.parentElement) {
+        elements.push(parent);
+    }
+    return elements;
+};
+"""
+
+# Reads the items of the slicer (arguments[0]) that are fully in view in a single call, i.e. the items that can be clicked.
+# Returns [[[item text, item element, is checked], ...], scroll position, last item element]
+# The scroll position is the sum of the scrollTop of the elements that may scroll the list, used to tell whether scrolling moved the list
+VISIBLE_ITEMS_SCRIPT = f"""
+{SCROLL_ELEMENTS_SCRIPT}
+const listbox = arguments[0];
+const view = listbox.getBoundingClientRect();
+const items = Array.from(listbox.querySelectorAll("{FILTER_ITEM_CSS_SELECTOR}"))
+    .filter((item) => !item.matches("{SELECT_ALL_CSS_SELECTOR}"))
+    .filter((item) => {{
+        const rect = item.getBoundingClientRect();
+        return rect.height > 0 && rect.top >= view.top - 1 && rect.bottom <= view.bottom + 1;
+    }});
+const result = items.map((item) => [
+    (item.getAttribute("aria-label") || item.innerText || "").trim(),
+    item,
+    item.getAttribute("aria-checked") === "true",
+]);
+const position = getScrollElements(listbox).reduce((sum, el) => sum + el.scrollTop, 0);
+return [result, position, items.length ? items[items.length - 1] : null];
+"""
+
+# Returns the "Select all" item of the slicer (arguments[0]) and its checked state ("true", "false" or "mixed"), or null
+SELECT_ALL_STATE_SCRIPT = f"""
+const item = arguments[0].querySelector("{SELECT_ALL_CSS_SELECTOR}");
+return item ? [item, item.getAttribute("aria-checked")] : null;
+"""
+
+CLICK_SCRIPT = "arguments[0].click();"
 
+# Scrolls the slicer list (arguments[0]) back to the top. The scrolled element may be the listbox, one of its children or one of its parents.
+# Returns the number of elements scrolled
+SCROLL_TO_TOP_SCRIPT = f"""
+{SCROLL_ELEMENTS_SCRIPT}
+const scrolled = getScrollElements(arguments[0]).filter((el) => el.scrollTop > 0);
+for (const el of scrolled) {{
+    el.scrollTop = 0;
+}}
+return scrolled.length;
+"""
 
+
+# If cancelled, changing the filter stops with ScrapeCancelledError before the next scroll step, as the table would not be filtered as requested
 class FilterScraper:
-    def __init__(self, driver: WebDriver) -> None:
+    def __init__(
+        self,
+        driver: WebDriver,
+        idle_window: float = 0.05,
+        render_timeout: float = 2.0,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> None:
         self._driver = driver
+        self._idle_window = idle_window
+        self._render_timeout = render_timeout
+        self._cancel_token = cancel_token or CancellationToken()
+        # Values known to be checked after the last change made by this scraper (None if unknown)
+        self._checked_values: Optional[set[str]] = None
+        # Number of items clicked, used to tell whether the filter was changed
+        self._clicks = 0
 
-    def uncheck_filter(self):
+    # Uncheck all values of the slicer, i.e. show the table unfiltered. Returns whether any value was unchecked
+    @metrics.timed("uncheck_filter")
+    def uncheck_filter(self) -> bool:
         logger.debug("Unchecking filter...")
-        filter = self._driver.find_element(By.CSS_SELECTOR, FILTER_CSS_SELECTOR)
+        clicks_before = self._clicks
+        listbox, waiter = self._find_filter()
+        # "Select all" is the first item of the list
+        self._scroll_to_top(listbox, waiter)
+        if self._clear_with_select_all(listbox, waiter):
+            logger.debug("Filter unchecked using select all")
+        else:
+            self._sweep(listbox, waiter, set())
+            logger.debug("Filter unchecked")
+        self._checked_values = set()
+        return self._clicks > clicks_before
 
-        # Remember wait time
-        wait_org = self._driver.timeouts.implicit_wait
+    # Check exactly the given values of the slicer and uncheck all other values. Returns whether the checked values changed
+    @metrics.timed("select_filter_values")
+    def select_values(self, values: list[str]) -> bool:
+        logger.debug(f"Selecting filter values: {values}")
+        clicks_before = self._clicks
+        listbox, waiter = self._find_filter()
+        self._scroll_to_top(listbox, waiter)
+        wanted = set(values)
+
+        # If we know which values are checked, we can stop when these and the wanted values have been seen.
+        # Otherwise, we can only stop early if all values could be unchecked using select all.
+        if self._checked_values is not None:
+            stop_after = wanted | self._checked_values
+        elif self._clear_with_select_all(listbox, waiter):
+            stop_after = wanted
+        else:
+            stop_after = None
+        found = self._sweep(listbox, waiter, wanted, stop_after)
+        self._checked_values = found
+
+        missing = [value for value in values if value not in found]
+        if missing:
+            logger.warning(f"Filter values not found in slicer: {missing}")
+        logger.debug("Filter values selected")
+        return self._clicks > clicks_before
+
+    # All values of the slicer (without changing which values are checked)
+    @metrics.timed("list_filter_values")
+    def list_values(self) -> list[str]:
+        listbox, waiter = self._find_filter()
+        values: list[str] = []
+        self._sweep(listbox, waiter, None, on_items=values.extend)
+        # Items may be seen multiple times due to the overlap between scroll steps
+        values = list(dict.fromkeys(values))
+        logger.debug(f"Found {len(values)} filter values")
+        return values
+
+    def _find_filter(self) -> tuple[WebElement, DomChangeWaiter]:
+        listbox = self._driver.find_element(By.CSS_SELECTOR, FILTER_CSS_SELECTOR)
+        # Used to wait for the filter to update after clicking and scrolling
+        waiter = DomChangeWaiter(
+            self._driver,
+            listbox,
+            self._idle_window,
+            self._render_timeout,
+            attribute_filter=["aria-checked"],
+            name="filter",
+        )
+        waiter.install()
+        return listbox, waiter
 
-        # Temporary change the wait time to 0 (there may not be any checked elements, so we dont want to wait for them to appear)
+    # Uncheck all values using the "Select all" item. Returns false if the slicer has no "Select all" item
+    def _clear_with_select_all(
+        self, listbox: WebElement, waiter: DomChangeWaiter
+    ) -> bool:
+        result = cast(
+            Optional[list[Any]],
+            self._driver.execute_script(SELECT_ALL_STATE_SCRIPT, listbox),
+        )
+        if result is None:
+            return False
+
+        item, state = result
+        # If some values are checked, the first click checks all values
+        clicks = {"true": 1, "mixed": 2}.get(state, 0)
+        for _ in range(clicks):
+            self._driver.execute_script(CLICK_SCRIPT, item)
+            self._clicks += 1
+            waiter.wait()
+        return True
+
+    def _scroll_to_top(self, listbox: WebElement, waiter: DomChangeWaiter):
+        scrolled = self._driver.execute_script(SCROLL_TO_TOP_SCRIPT, listbox)  # type: ignore
+        if scrolled:
+            waiter.wait(require_change=False)
+
+    # Scroll through the slicer from the top one viewport at a time, until scrolling does not move the list anymore.
+    # The items in view are read with a single script call per viewport, and the items to toggle are ctrl+clicked in a single action per viewport.
+    # wanted: Values to check, all other values are unchecked. If None, no items are clicked
+    # stop_after: Stop as soon as all these values have been seen (None to sweep the whole list)
+    # on_items: Called with the texts of the items in view after each scroll step
+    # Returns the wanted values that were found
+    def _sweep(
+        self,
+        listbox: WebElement,
+        waiter: DomChangeWaiter,
+        wanted: Optional[set[str]],
+        stop_after: Optional[set[str]] = None,
+        on_items: Optional[Callable[[list[str]], None]] = None,
+    ) -> set[str]:
+        # Temporary change the wait time to 0, as the list may be empty
+        wait_org = self._driver.timeouts.implicit_wait
         self._driver.implicitly_wait(0)
-        prev_last_el = None
-        ACTION_WAIT = 0.1
-
-        while True:
-            logger.debug("Finding visible checkboxes...")
-            checked_elements = filter.find_elements(
-                By.CSS_SELECTOR, CHECKED_FILTER_CSS_SELECTOR
-            )
-            unchecked_elements = filter.find_elements(
-                By.CSS_SELECTOR, UNCHECKED_FILTER_CSS_SELECTOR
-            )
-            all_elements = checked_elements + unchecked_elements
-
-            logger.debug(f"Found visible checkboxes: {len(all_elements)}")
-
-            actions = ActionChains(self._driver)
-
-            for checked_element in checked_elements:
-                # Click to uncheck
-                actions.click(checked_element).pause(ACTION_WAIT)
-                logger.debug(f"Will uncheck checkbox with text: {checked_element.text}")
-
-            # Move to last visible element and scroll down using down key to load more elements
-            last_el = all_elements[-1]
-            actions.move_to_element(last_el).pause(ACTION_WAIT).send_keys(
-                Keys.ARROW_DOWN
-            ).pause(ACTION_WAIT).perform()
-            logger.debug(f"Scrolled to last visible checkbox with text: {last_el.text}")
-
-            # If we have scrolled to the same element twice, we have reached the end of the list
-            if last_el and prev_last_el == last_el:
-                logger.debug("Reached end of list. All checkboxes unchecked.")
-                break
-
-            prev_last_el = last_el
-
-        # Restore the wait time
-        self._driver.implicitly_wait(wait_org)
-        logger.debug("Filter unchecked")
+
+        seen: set[str] = set()
+        found: set[str] = set()
+        last_position: Optional[float] = None
+        try:
+            self._scroll_to_top(listbox, waiter)
+            while True:
+                self._cancel_token.raise_if_cancelled()
+                result = cast(
+                    list[Any],
+                    self._driver.execute_script(VISIBLE_ITEMS_SCRIPT, listbox),
+                )
+                items, position, last_item = result
+                # If scrolling did not move the list, we have reached the end of the list.
+                # The items are still handled, as they may not have been rendered yet when last read
+                is_end = position == last_position
+                last_position = position
+
+                texts = [str(text) for text, _, _ in items]
+                clicked = 0
+                if wanted is not None:
+                    clicked = self._toggle_items(
+                        [
+                            item
+                            for text, item, is_checked in items
+                            if is_checked != (text in wanted)
+                        ],
+                        waiter,
+                    )
+
+                new_texts = [text for text in texts if text not in seen]
+                seen.update(texts)
+                if wanted:
+                    found.update(wanted.intersection(texts))
+                if on_items:
+                    on_items(texts)
+                logger.debug(
+                    f"Filter items in view: {len(texts)}, new: {len(new_texts)}, clicked: {clicked}"
+                )
+
+                if is_end or last_item is None:
+                    break
+                if stop_after is not None and stop_after <= seen:
+                    break
+
+                # Move to last visible item and scroll down using down key to load more items
+                ActionChains(self._driver).move_to_element(last_item).pause(
+                    0.1
+                ).send_keys(
+                    Keys.ARROW_DOWN * max(1, len(texts) - SCROLL_OVERLAP)
+                ).perform()
+                metrics.count("pause_seconds", 0.1, action="filter_scroll")
+                waiter.wait(require_change=False)
+        finally:
+            # Restore the wait time
+            self._driver.implicitly_wait(wait_org)
+
+        logger.debug(f"Swept {len(seen)} filter items")
+        return found
+
+    # Toggle the items using ctrl+click (in a single action), so other items keep their state.
+    # Real clicks are used, as Power BI ignores synthetic click events. Returns the number of items clicked
+    def _toggle_items(self, items: list[WebElement], waiter: DomChangeWaiter) -> int:
+        if not items:
+            return 0
+        actions = ActionChains(self._driver).key_down(Keys.CONTROL)
+        for item in items:
+            actions.click(item)
+        actions.key_up(Keys.CONTROL).perform()
+        self._clicks += len(items)
+        waiter.wait()
+        return len(items)
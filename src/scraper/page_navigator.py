@@ -0,0 +1,137 @@
+# pyright: reportUnknownMemberType=false
+
+import hashlib
+import logging
+from typing import Any, Iterator, Optional, cast
+
+from selenium.webdriver.chrome.webdriver import WebDriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+
+from src.scraper.dom_waiter import DomChangeWaiter
+from src.scraper.table_scraper import TABLE_CSS_SELECTOR, TABLE_ROW_COUNT_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WAIT = 10  # seconds
+# Page tabs of a report, i.e. the pages pane in the Power BI service
+PAGE_TAB_CSS_SELECTOR = ".pageNavigator [role='tab'], [role='tablist'] .sectionItem"
+# Next page button in the footer of embedded reports (used if there are no page tabs)
+NEXT_PAGE_BUTTON_CSS_SELECTOR = (
+    "button[aria-label='Next Page'], button.navigation-button-next"
+)
+# Stop if a report seems to have more pages than this (e.g. if the next page button does not get disabled on the last page)
+MAX_PAGES = 100
+
+# Clicks element arguments[0] using javascript, as clicking via WebDriver fails if the element is covered (e.g. by a tooltip)
+CLICK_SCRIPT = "arguments[0].click();"
+# Using javascript instead of get_attribute, as get_attribute may make the page non-interactive
+IS_DISABLED_SCRIPT = "return arguments[0].disabled || arguments[0].getAttribute('aria-disabled') === 'true';"
+# Returns [[name, tab element, is active], ...] of the page tabs
+PAGE_TABS_SCRIPT = f"""
+return Array.from(document.querySelectorAll("{PAGE_TAB_CSS_SELECTOR}"))
+    .map((tab) => [
+        (tab.getAttribute("aria-label") || tab.innerText || "").trim(),
+        tab,
+        tab.getAttribute("aria-selected") === "true",
+    ]);
+"""
+# Returns [[row count, text], ...] of all tables on the page. The row count is null if the table does not expose it (see TABLE_ROW_COUNT_SCRIPT).
+# The text only contains the rendered rows, i.e. headers and the first rows
+PAGE_CONTENT_SCRIPT = f"""
+// A function, not an arrow function, so arguments[0] is the table
+function getRowCount() {{ {TABLE_ROW_COUNT_SCRIPT} }}
+return Array.from(document.querySelectorAll("{TABLE_CSS_SELECTOR}"))
+    .map((table) => [getRowCount(table), table.innerText]);
+"""
+
+
+# Moves between the pages of a loaded report by clicking its page tabs (or next page button), without reloading the report.
+# idle_window, render_timeout: Used to wait for a page to render after switching page
+class ReportPageNavigator:
+    def __init__(
+        self, driver: WebDriver, idle_window: float = 0.3, render_timeout: float = 5
+    ) -> None:
+        self._driver = driver
+        self._idle_window = idle_window
+        self._render_timeout = render_timeout
+
+    # Shows each page of the report in turn and yields its name while it is shown.
+    # The current page is the first page if the report has no page tabs.
+    def iter_pages(self) -> Iterator[str]:
+        page_names = [name for name, _, _ in self._find_tabs()]
+        if page_names:
+            logger.info(f"Found {len(page_names)} report pages: {page_names}")
+            for i, page_name in enumerate(page_names):
+                # Find tabs again on each page, as they are re-rendered when switching page
+                tabs = self._find_tabs()
+                # Find the tab by name, in case tabs were added or removed since the pages were listed
+                matches = [tab for tab in tabs if page_name and tab[0] == page_name]
+                if matches:
+                    _, tab, is_active = matches[0]
+                elif i < len(tabs):
+                    _, tab, is_active = tabs[i]
+                else:
+                    logger.warning(f"Page tab '{page_name}' not found, skipping")
+                    continue
+                # Clicking the active tab does not change the page, so there is nothing to wait for
+                if not is_active:
+                    self._switch_page(tab)
+                yield page_name or f"Page {i + 1}"
+            return
+
+        logger.debug("No page tabs found, using next page button")
+        yield "Page 1"
+        for number in range(2, MAX_PAGES + 1):
+            buttons = self._find_enabled_next_buttons()
+            if not buttons:
+                return
+            if not self._switch_page(buttons[0]):
+                logger.debug("Page did not change after clicking next page")
+                return
+            yield f"Page {number}"
+        logger.warning(f"Stopped after {MAX_PAGES} pages")
+
+    # Hash of the row count and rendered text (headers and first rows) of the tables currently shown.
+    # Used to tell whether a page has changed since it was last scraped, the same check as the fingerprint probe (see FingerprintProbe).
+    # None if a table does not expose its row count, as the rendered rows do not show whether rows were added or removed
+    def content_hash(self) -> Optional[str]:
+        tables = cast(list[list[Any]], self._driver.execute_script(PAGE_CONTENT_SCRIPT))
+        if any(row_count is None for row_count, _ in tables):
+            return None
+        content = "\x1f".join(f"{row_count}\x1e{text}" for row_count, text in tables)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    # Page tabs: [(name, tab, is active), ...]
+    def _find_tabs(self) -> list[tuple[str, WebElement, bool]]:
+        tabs = cast(list[list[Any]], self._driver.execute_script(PAGE_TABS_SCRIPT))
+        return [(str(name), tab, bool(is_active)) for name, tab, is_active in tabs]
+
+    def _find_enabled_next_buttons(self):
+        # Disable wait time to avoid waiting for a button that does not exist
+        self._driver.implicitly_wait(0)
+        try:
+            buttons = self._driver.find_elements(
+                By.CSS_SELECTOR, NEXT_PAGE_BUTTON_CSS_SELECTOR
+            )
+        finally:
+            self._driver.implicitly_wait(DEFAULT_WAIT)
+        return [
+            button
+            for button in buttons
+            if not self._driver.execute_script(IS_DISABLED_SCRIPT, button)  # type: ignore
+        ]
+
+    # Click the element to switch page and wait for the page to render. Returns whether the page changed
+    def _switch_page(self, element: WebElement) -> bool:
+        body = self._driver.find_element(By.TAG_NAME, "body")
+        waiter = DomChangeWaiter(
+            self._driver,
+            body,
+            idle_window=self._idle_window,
+            timeout=self._render_timeout,
+            name="page switch",
+        )
+        waiter.install()
+        self._driver.execute_script(CLICK_SCRIPT, element)
+        return waiter.wait()
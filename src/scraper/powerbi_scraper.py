@@ -1,18 +1,29 @@
 # pyright: reportUnknownMemberType=false
 
 import logging
+import time
 from dataclasses import dataclass
-from time import sleep
-from typing import Optional
+from typing import Callable, Optional
 
+import pandas as pd
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.webdriver import WebDriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.wait import WebDriverWait
 
+from src import metrics
+from src.cache import NamedTable, PageCache
+from src.cancellation import CancellationToken, ScrapeCancelledError
+from src.checkpoint import Checkpoint, CheckpointData
+from src.config import ExtractionMode, ScrapeEngine
+from src.progress import ProgressListener
+from src.scraper.dom_waiter import DomChangeWaiter
 from src.scraper.filter_scraper import FilterScraper
-from src.scraper.table_scraper import TableScraper
+from src.scraper.page_navigator import ReportPageNavigator
+from src.scraper.query_data_scraper import NetworkCapture, QueryDataScraper
+from src.scraper.table_scraper import TABLE_CSS_SELECTOR, TableScraper, TableStream
+from src.sink import DataFrameSink, RowSink
 
 logger = logging.getLogger(__name__)
 
@@ -26,62 +37,462 @@ DEFAULT_WAIT = 10  # seconds
 PAGE_LOADED_CSS_SELECTOR = "transform.bringToFront"
 # iframe present when dashboard embedded in page
 PAGE_EMBED_LOADED_CSS_SELECTOR = "iframe"
+# After the page load element is present, wait until the page has had no DOM changes for this many seconds (at most PAGE_SETTLE_TIMEOUT)
+PAGE_IDLE_WINDOW = 0.3
+PAGE_SETTLE_TIMEOUT = 5
 
 
 class ScraperException(Exception):
     pass
 
 
+# Tables scraped from a report page by PowerBiScraper.scrape_pages
+# is_cached: The page had not changed since the last scrape, so the tables were read from the cache
+@dataclass(frozen=True)
+class ScrapedPage:
+    name: str
+    tables: list[NamedTable]
+    is_cached: bool
+
+
+# Summary of a table scraped by PowerBiScraper.scrape_all_to
+# duration: Seconds from the start of the scrape until the table was complete
+@dataclass(frozen=True)
+class ScrapedTable:
+    title: str
+    columns: list[str]
+    rows: int
+    duration: float
+
+
 # XXX: Split into separate options for PowerBI and Selenium?
 # is_console_enabled: If true, the selenium driver will open a console window if running in no-console mode e.g. in a GUI
 # is_headless: If true, the selenium driver will run in headless mode (no browser window)
+# filter_values: Check only these values of the slicer before scraping (takes precedence over should_uncheck_filter)
+# engine: Scrape the rendered table (dom) or the data responses of the page (network, requires a driver created with these options)
+# should_scrape_all_tables: Scrape all tables on the page instead of only the first table (see PowerBiScraper.scrape_all_to)
+# should_scrape_all_pages: Scrape all tables on all pages of the report (see PowerBiScraper.scrape_pages)
+# extraction_mode: How table rows are read from the page
+# max_scroll_stride: Max number of key presses used to scroll the table in one step
+# idle_window: Seconds without DOM changes before the table/filter is considered updated after scrolling
+# render_timeout: Max seconds to wait for the table/filter to update after scrolling
 @dataclass(frozen=True)
 class ScraperOptions:
     url: str
     is_headless: bool = False
     is_console_enabled: bool = True
     should_uncheck_filter: bool = False
+    filter_values: Optional[tuple[str, ...]] = None
+    engine: ScrapeEngine = ScrapeEngine.DOM
+    should_scrape_all_tables: bool = False
+    should_scrape_all_pages: bool = False
+    extraction_mode: ExtractionMode = ExtractionMode.BATCH
+    max_scroll_stride: int = 8
+    idle_window: float = 0.05
+    render_timeout: float = 2.0
 
 
-# @dataclass(frozen=True)
-# class ScrapeResult:
-#     table: pd.DataFrame
-
-
+# on_progress: Called with the progress of each table while it is scraped (see ProgressTracker)
+# cancel_token: Stops the scrape at the next scroll step. The scrape methods then return the rows scraped so far, or raise ScrapeCancelledError if no table was reached
 class PowerBiScraper:
-    def __init__(self, options: ScraperOptions, driver: WebDriver):
+    def __init__(
+        self,
+        options: ScraperOptions,
+        driver: WebDriver,
+        on_progress: Optional[ProgressListener] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ):
         self._driver = driver
         self._options = options
+        self._cancel_token = cancel_token or CancellationToken()
         logger.debug(f"Driver created with options: {options}")
         self._wait = WebDriverWait(self._driver, DEFAULT_WAIT)
         # XXX: Inject?
-        self._table_scraper = TableScraper(self._driver)
-        self._filter_scraper = FilterScraper(self._driver)
+        self._network_capture: Optional[NetworkCapture] = None
+        self._table_scraper: TableScraper | QueryDataScraper
+        if options.engine == ScrapeEngine.NETWORK:
+            self._network_capture = NetworkCapture(self._driver)
+            self._table_scraper = QueryDataScraper(
+                self._driver,
+                self._network_capture,
+                options.render_timeout,
+                on_progress,
+                self._cancel_token,
+            )
+        else:
+            self._table_scraper = TableScraper(
+                self._driver,
+                options.extraction_mode,
+                options.max_scroll_stride,
+                options.idle_window,
+                options.render_timeout,
+                on_progress,
+                self._cancel_token,
+            )
+        self._filter_scraper = FilterScraper(
+            self._driver,
+            options.idle_window,
+            options.render_timeout,
+            self._cancel_token,
+        )
+
+    def scrape(self, max_rows: Optional[int] = None) -> pd.DataFrame:
+        sink = DataFrameSink()
+        self.scrape_to(sink, max_rows)
+        return sink.to_dataframe()
 
-    def scrape(self, max_rows: Optional[int] = None):
+    # Scrape the table and stream its rows to the sink. Returns the number of rows scraped.
+    # The sink is closed when done or cancelled, and discarded if scraping fails (so an existing output file is kept).
+    # checkpoint: Save scraped rows periodically to be able to resume if scraping fails
+    # resume_from: Rows scraped in a previous attempt. The scrape continues after these rows
+    # stop_early: Called after each batch of rows with the number of rows of the table (if known). If it returns true, the rest of the table is not scraped
+    @metrics.timed("scrape", mode="table")
+    def scrape_to(
+        self,
+        sink: RowSink,
+        max_rows: Optional[int] = None,
+        checkpoint: Optional[Checkpoint] = None,
+        resume_from: Optional[CheckpointData] = None,
+        stop_early: Optional[Callable[[Optional[int]], bool]] = None,
+    ) -> int:
         # Warn if using limit
         if max_rows:
             logger.warn(f"**Warning: Limiting scrape to {max_rows} rows**")
 
         logger.debug("Scraping started")
+        row_count = 0
+        is_sink_open = False
+        is_failed = True
         try:
+            # Capture the responses loaded with the page, as these contain the first rows
+            if self._network_capture:
+                self._network_capture.start()
             self._load_page()
+            self._cancel_token.raise_if_cancelled()
             self._switch_if_iframe()
-            if self._options.should_uncheck_filter:
-                self._filter_scraper.uncheck_filter()
-            table = self._table_scraper.execute(max_rows)
+            self._apply_filter()
+
+            skip_until = resume_from.last_row_index if resume_from else -1
+            stream = self._table_scraper.open_stream(max_rows, skip_until)
+
+            # Table must be the same as when the checkpoint was saved
+            if resume_from and resume_from.columns != stream.columns:
+                logger.warning(
+                    "Columns of the table do not match the checkpoint. Starting from the beginning."
+                )
+                resume_from = None
+                stream = self._table_scraper.open_stream(max_rows)
+            resumed_rows = resume_from.rows if resume_from else []
+
+            sink.open(stream.columns)
+            is_sink_open = True
+            if checkpoint:
+                checkpoint.start(stream.columns, resumed_rows)
+            if resumed_rows:
+                logger.info(f"Resuming after {len(resumed_rows)} rows from checkpoint")
+                sink.write([row for _, row in resumed_rows])
+                row_count += len(resumed_rows)
+
+            for batch in stream.batches:
+                sink.write([row for _, row in batch])
+                if checkpoint:
+                    checkpoint.record(batch)
+                row_count += len(batch)
+                if stop_early and stop_early(stream.total_rows):
+                    logger.debug(f"Scraping stopped early after {row_count} rows")
+                    break
+            is_failed = False
+        except Exception as e:
+            if not self._cancel_token.is_cancelled:
+                raise ScraperException(
+                    f"An exception occurred while scraping: {type(e)}"
+                ) from e
+            # Cancelled while a driver call was pending (see usecase._run_scrape). Keep the rows scraped so far
+            if not is_sink_open:
+                raise ScrapeCancelledError(
+                    "Scrape was cancelled before the table was scraped"
+                ) from e
+            logger.debug(f"Scrape interrupted by cancel: {type(e)}")
+            is_failed = False
+        finally:
+            if is_failed:
+                sink.discard()
+            else:
+                sink.close()
+            if checkpoint:
+                checkpoint.close()
+
+        if self._cancel_token.is_cancelled:
+            logger.info(f"Scraping cancelled after {row_count} rows")
+        else:
+            logger.debug("Scraping complete")
+        return row_count
+
+    # Scrape all tables on the page and stream the rows of each table to its own sink.
+    # Scroll steps are interleaved across the tables, so the tables render their new rows at the same time instead of one after another.
+    # create_sink: Called with the index and title of each table. Sinks are closed when done, and discarded if scraping fails.
+    @metrics.timed("scrape", mode="all_tables")
+    def scrape_all_to(
+        self,
+        create_sink: Callable[[int, str], RowSink],
+        max_rows: Optional[int] = None,
+    ) -> list[ScrapedTable]:
+        self._check_is_dom_engine("Scraping multiple tables")
+
+        logger.debug("Scraping all tables started")
+        try:
+            self._load_page()
+            self._switch_if_iframe()
+            self._apply_filter()
+
+            tables = self._scrape_tables(create_sink, max_rows)
+            if not tables:
+                raise ScraperException("No tables found on the page")
+        except ScraperException:
+            raise
         except Exception as e:
             raise ScraperException(
                 f"An exception occurred while scraping: {type(e)}"
             ) from e
 
-        logger.debug("Scraping complete")
-        return table
+        return tables
+
+    # Scrape all tables on each page of the report. Pages are opened by clicking the page tabs, so the report is only loaded once.
+    # page_cache: Pages whose content has not changed since they were cached are read from the cache instead of being scraped
+    @metrics.timed("scrape", mode="all_pages")
+    def scrape_pages(
+        self,
+        max_rows: Optional[int] = None,
+        page_cache: Optional[PageCache] = None,
+    ) -> list[ScrapedPage]:
+        self._check_is_dom_engine("Scraping multiple tables")
+
+        logger.debug("Scraping all pages started")
+        pages: list[ScrapedPage] = []
+        try:
+            self._load_page()
+            self._switch_if_iframe()
+            # NB: Only applies to the filter of the first page
+            self._apply_filter()
+
+            navigator = ReportPageNavigator(
+                self._driver, PAGE_IDLE_WINDOW, PAGE_SETTLE_TIMEOUT
+            )
+            for page_name in navigator.iter_pages():
+                if self._cancel_token.is_cancelled:
+                    break
+                pages.append(
+                    self._scrape_page(page_name, navigator, max_rows, page_cache)
+                )
+        except Exception as e:
+            # Keep the pages scraped before the scrape was cancelled
+            if not (self._cancel_token.is_cancelled and pages):
+                raise ScraperException(
+                    f"An exception occurred while scraping: {type(e)}"
+                ) from e
+
+        if self._cancel_token.is_cancelled:
+            logger.info(f"Scraping cancelled after {len(pages)} pages")
+        return pages
+
+    # Scrape the table once per filter value in a single page load. Each value is selected on its own, and the table is scraped when it has refreshed.
+    # values: Values of the slicer to scrape, or None for all values
+    # Returns a table per value, titled with the value
+    @metrics.timed("scrape", mode="sweep")
+    def scrape_sweep(
+        self, values: Optional[list[str]] = None, max_rows: Optional[int] = None
+    ) -> list[NamedTable]:
+        self._check_is_dom_engine("Sweeping filter values")
+
+        logger.debug("Filter sweep started")
+        tables: list[NamedTable] = []
+        try:
+            self._load_page()
+            self._switch_if_iframe()
+            if values is None:
+                values = self._filter_scraper.list_values()
+            logger.info(f"Sweeping {len(values)} filter values")
+
+            for value in values:
+                if self._cancel_token.is_cancelled:
+                    break
+                tables.append((value, self._scrape_filter_value(value, max_rows)))
+        except Exception as e:
+            # Keep the tables scraped before the scrape was cancelled
+            if not (self._cancel_token.is_cancelled and tables):
+                raise ScraperException(
+                    f"An exception occurred while scraping: {type(e)}"
+                ) from e
+
+        if self._cancel_token.is_cancelled:
+            logger.info(f"Sweep cancelled after {len(tables)} filter values")
+        return tables
+
+    # All values of the slicer, e.g. to split a sweep across sessions
+    def list_filter_values(self) -> list[str]:
+        try:
+            self._load_page()
+            self._switch_if_iframe()
+            return self._filter_scraper.list_values()
+        except Exception as e:
+            raise ScraperException(
+                f"An exception occurred while listing filter values: {type(e)}"
+            ) from e
 
     def close(self):
         self._driver.close()
 
+    def _apply_filter(self):
+        filter_values = self._options.filter_values
+        if filter_values is not None:
+            self._change_filter(
+                lambda: self._filter_scraper.select_values(list(filter_values))
+            )
+        elif self._options.should_uncheck_filter:
+            self._change_filter(self._filter_scraper.uncheck_filter)
+
+    # Change the filter and wait for the table to be refreshed with the filtered rows, so rows shown before the change are not scraped.
+    # change: Returns whether the filter was changed (otherwise the table is not refreshed)
+    @metrics.timed("change_filter")
+    def _change_filter(self, change: Callable[[], bool]):
+        table_el = self._driver.find_element(By.CSS_SELECTOR, TABLE_CSS_SELECTOR)
+        table_waiter = DomChangeWaiter(
+            self._driver,
+            table_el,
+            idle_window=PAGE_IDLE_WINDOW,
+            timeout=PAGE_SETTLE_TIMEOUT,
+            name="table refresh",
+        )
+        table_waiter.install()
+        # The table does not change if it shows the same rows after the change (or if it was replaced by a new table element)
+        if change() and not table_waiter.wait():
+            logger.debug("Table did not change after changing the filter")
+
+    def _check_is_dom_engine(self, feature: str):
+        if not isinstance(self._table_scraper, TableScraper):
+            raise ScraperException(
+                f"{feature} is not supported by the {self._options.engine.value} engine"
+            )
+
+    # Select only the value in the slicer and scrape the table once it has been refreshed with the filtered rows
+    def _scrape_filter_value(self, value: str, max_rows: Optional[int]) -> pd.DataFrame:
+        start = time.perf_counter()
+        self._change_filter(lambda: self._filter_scraper.select_values([value]))
+
+        sink = DataFrameSink()
+        stream = self._table_scraper.open_stream(max_rows, title=value)
+        sink.open(stream.columns)
+        for batch in stream.batches:
+            sink.write([row for _, row in batch])
+
+        table = sink.to_dataframe()
+        logger.info(
+            f"Filter value '{value}' complete: {len(table)} rows in {time.perf_counter() - start:.2f}s"
+        )
+        return table
+
+    # Scrape the tables of the page currently shown
+    def _scrape_page(
+        self,
+        page_name: str,
+        navigator: ReportPageNavigator,
+        max_rows: Optional[int],
+        page_cache: Optional[PageCache],
+    ) -> ScrapedPage:
+        start = time.perf_counter()
+        content_hash = navigator.content_hash() if page_cache else None
+        if page_cache and content_hash is None:
+            logger.debug(
+                f"Row count of the tables on page '{page_name}' not available, not using the page cache"
+            )
+        cached_tables = (
+            page_cache.get(self._options.url, page_name, content_hash)
+            if page_cache and content_hash
+            else None
+        )
+        if cached_tables is not None:
+            logger.info(f"Page '{page_name}' has not changed, using cached tables")
+            return ScrapedPage(page_name, cached_tables, is_cached=True)
+
+        sinks: list[tuple[str, DataFrameSink]] = []
+
+        def create_sink(_: int, title: str) -> RowSink:
+            sink = DataFrameSink()
+            sinks.append((title, sink))
+            return sink
+
+        self._scrape_tables(create_sink, max_rows, page_name)
+        tables = [(title, sink.to_dataframe()) for title, sink in sinks]
+        # The tables of a cancelled page may be incomplete
+        if page_cache and content_hash and not self._cancel_token.is_cancelled:
+            page_cache.put(self._options.url, page_name, content_hash, tables)
+
+        logger.info(
+            f"Page '{page_name}' complete: {len(tables)} tables in {time.perf_counter() - start:.2f}s"
+        )
+        return ScrapedPage(page_name, tables, is_cached=False)
+
+    # Scrape all tables currently shown, taking one scroll step in each table at a time
+    # page_name: Page the tables are on, shown in their progress events
+    def _scrape_tables(
+        self,
+        create_sink: Callable[[int, str], RowSink],
+        max_rows: Optional[int],
+        page_name: Optional[str] = None,
+    ) -> list[ScrapedTable]:
+        assert isinstance(self._table_scraper, TableScraper)
+        start = time.perf_counter()
+        sinks: list[RowSink] = []
+        completed: dict[int, ScrapedTable] = {}
+        is_failed = True
+        try:
+            streams: list[tuple[str, TableStream, RowSink]] = []
+            for i, (title, table_el) in enumerate(self._table_scraper.find_tables()):
+                stream = self._table_scraper.open_stream(
+                    max_rows,
+                    table_el=table_el,
+                    title=f"{page_name} - {title}" if page_name else title,
+                )
+                sink = create_sink(i, title)
+                sinks.append(sink)
+                sink.open(stream.columns)
+                streams.append((title, stream, sink))
+
+            row_counts = [0] * len(streams)
+            active = list(range(len(streams)))
+            while active:
+                for i in list(active):
+                    title, stream, sink = streams[i]
+                    batch = next(stream.batches, None)
+                    if batch is None:
+                        active.remove(i)
+                        duration = time.perf_counter() - start
+                        logger.info(
+                            f"Table '{title}' complete: {row_counts[i]} rows in {duration:.2f}s"
+                        )
+                        completed[i] = ScrapedTable(
+                            title, stream.columns, row_counts[i], duration
+                        )
+                        continue
+                    sink.write([row for _, row in batch])
+                    row_counts[i] += len(batch)
+            is_failed = False
+        finally:
+            # Keep the rows scraped until cancelled
+            is_failed = is_failed and not self._cancel_token.is_cancelled
+            for sink in sinks:
+                if is_failed:
+                    sink.discard()
+                else:
+                    sink.close()
+
+        logger.debug(
+            f"Scraped {len(completed)} tables in {time.perf_counter() - start:.2f}s"
+        )
+        return [completed[i] for i in sorted(completed)]
+
     # If dashboard embedded in page, it will be in an iframe -> switch to iframe
+    @metrics.timed("switch_iframe")
     def _switch_if_iframe(self):
         # Disable wait time to avoid waiting for iframe to appear
         self._driver.implicitly_wait(0)
@@ -104,6 +515,7 @@ class PowerBiScraper:
         # Restore wait time
         self._driver.implicitly_wait(DEFAULT_WAIT)
 
+    @metrics.timed("load_page")
     def _load_page(self):
         logger.debug("Loading page...")
         self._driver.get(self._options.url)
@@ -124,5 +536,15 @@ class PowerBiScraper:
                 )
             )
 
-        sleep(1)  # For good measure
+        # Wait for the page to settle instead of a fixed sleep
+        body = self._driver.find_element(By.TAG_NAME, "body")
+        page_waiter = DomChangeWaiter(
+            self._driver,
+            body,
+            idle_window=PAGE_IDLE_WINDOW,
+            timeout=PAGE_SETTLE_TIMEOUT,
+            name="page to settle",
+        )
+        page_waiter.install()
+        page_waiter.wait(require_change=False)
         logger.debug("Page loaded")
@@ -0,0 +1,338 @@
+# pyright: reportUnknownMemberType=false
+
+import base64
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional, cast
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver import ActionChains
+from selenium.webdriver.chrome.webdriver import WebDriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+
+from src import metrics
+from src.cancellation import CancellationToken
+from src.progress import ProgressListener, ProgressTracker
+from src.scraper.dsr import DsrDecodeError, DsrPage, decode_query_result
+from src.scraper.table_scraper import (
+    DATA_CONTAINER_CSS_SELECTOR,
+    HEADER_ROW_CSS_SELECTOR,
+    TABLE_CSS_SELECTOR,
+    VISIBLE_ROW_INDICIES_SCRIPT,
+    IndexedRow,
+    TableStream,
+    get_table_row_count,
+)
+
+logger = logging.getLogger(__name__)
+
+# Power BI fetches visual data from URLs containing this
+QUERY_DATA_URL_PATTERN = "/querydata"
+# Max seconds to wait for the table's first query response after the page has loaded
+FIRST_RESPONSE_TIMEOUT = 10
+# Max seconds to wait for the next page of rows, while scrolling to make Power BI request it
+NEXT_PAGE_TIMEOUT = 15
+# Number of key presses per scroll step when scrolling to trigger the next page
+SCROLL_STRIDE = 32
+# Seconds between reads of the performance log
+POLL_INTERVAL = 0.1
+
+
+# A querydata response
+# visual_id: Id of the visual that sent the query (from the ApplicationContext of the request), if known
+@dataclass(frozen=True)
+class QueryResponse:
+    body: dict[str, Any]
+    visual_id: Optional[str] = None
+
+
+# Reads querydata responses from the Chrome performance log (requires a driver created with network capture enabled)
+class NetworkCapture:
+    def __init__(self, driver: WebDriver) -> None:
+        self._driver = driver
+        # Visual id of each querydata request (None if not found in the request)
+        self._visual_ids: dict[str, Optional[str]] = {}
+        # Request ids of querydata responses whose body is not loaded yet
+        self._pending: set[str] = set()
+        self._responses: list[QueryResponse] = []
+
+    # Discard responses from before this point, e.g. from a previous scrape using the same browser session
+    def start(self):
+        self._driver.get_log("performance")  # type: ignore
+        self._visual_ids.clear()
+        self._pending.clear()
+        self._responses.clear()
+
+    # Return the responses received since the last call, in the order they were received
+    def poll(self) -> list[QueryResponse]:
+        entries = cast(list[dict[str, Any]], self._driver.get_log("performance"))
+        for entry in entries:
+            message = json.loads(entry["message"])["message"]
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.requestWillBeSent":
+                request = params["request"]
+                if QUERY_DATA_URL_PATTERN in request["url"]:
+                    # The log leaves out large request bodies, which are then read from the browser
+                    post_data = request.get("postData")
+                    if post_data is None and request.get("hasPostData"):
+                        post_data = self._read_post_data(params["requestId"])
+                    self._visual_ids[params["requestId"]] = get_visual_id(post_data)
+            elif method == "Network.responseReceived":
+                if QUERY_DATA_URL_PATTERN in params["response"]["url"]:
+                    self._pending.add(params["requestId"])
+            elif method == "Network.loadingFinished":
+                if params["requestId"] in self._pending:
+                    self._pending.remove(params["requestId"])
+                    self._read_body(params["requestId"])
+
+        responses, self._responses = self._responses, []
+        return responses
+
+    def _read_post_data(self, request_id: str) -> Optional[str]:
+        try:
+            result = cast(
+                dict[str, Any],
+                self._driver.execute_cdp_cmd(
+                    "Network.getRequestPostData", {"requestId": request_id}
+                ),
+            )
+        except WebDriverException as e:
+            logger.debug(f"Could not read querydata request {request_id}: {e}")
+            return None
+        return result.get("postData")
+
+    def _read_body(self, request_id: str):
+        try:
+            result = cast(
+                dict[str, Any],
+                self._driver.execute_cdp_cmd(
+                    "Network.getResponseBody", {"requestId": request_id}
+                ),
+            )
+        except WebDriverException as e:
+            logger.debug(f"Could not read querydata response {request_id}: {e}")
+            return
+
+        body = result["body"]
+        if result.get("base64Encoded"):
+            body = base64.b64decode(body).decode("utf-8")
+        self._responses.append(
+            QueryResponse(json.loads(body), self._visual_ids.pop(request_id, None))
+        )
+
+
+# Id of the visual that sent a querydata request, from the request body: queries[0].ApplicationContext.Sources[0].VisualId
+def get_visual_id(request_body: Optional[str]) -> Optional[str]:
+    if not request_body:
+        return None
+    try:
+        query = json.loads(request_body)["queries"][0]
+        return str(query["ApplicationContext"]["Sources"][0]["VisualId"])
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+# Scrapes the table from the querydata responses Power BI loads the table from, instead of from the rendered cells.
+# The table is only scrolled to make Power BI request the next page of rows, so rows do not have to be rendered and read one view at a time.
+# Cell values are the raw values (e.g. 1234.5 instead of "1,234.50"), so they may differ from the DOM engine, which can be used to verify the result.
+class QueryDataScraper:
+    def __init__(
+        self,
+        driver: WebDriver,
+        capture: NetworkCapture,
+        render_timeout: float = 2.0,
+        on_progress: Optional[ProgressListener] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> None:
+        self._driver = driver
+        self._capture = capture
+        self._render_timeout = render_timeout
+        self._on_progress = on_progress
+        self._cancel_token = cancel_token or CancellationToken()
+        # Responses received but not used yet, e.g. the next pages received together with the current page
+        self._responses: deque[QueryResponse] = deque()
+        # Identifies the query of the table: (visual id, query columns). Set when the first page is received
+        self._query_key: Optional[tuple[Optional[str], tuple[str, ...]]] = None
+
+    # Same as TableScraper.open_stream
+    @metrics.timed("open_table")
+    def open_stream(
+        self,
+        max_rows: Optional[int] = None,
+        skip_until: int = -1,
+        title: Optional[str] = None,
+    ) -> TableStream:
+        logger.debug("Scraping table data from query responses...")
+        table_el = self._driver.find_element(By.CSS_SELECTOR, TABLE_CSS_SELECTOR)
+        header_row = table_el.find_elements(By.CSS_SELECTOR, HEADER_ROW_CSS_SELECTOR)
+        column_headers = [header.text for header in header_row]
+
+        self._query_key = None
+        first_page = self._wait_for_page(
+            len(column_headers), FIRST_RESPONSE_TIMEOUT, should_scroll=False
+        )
+        if first_page is None:
+            raise TimeoutError("No query response found for the table")
+
+        # Use the headers shown in the table, as the query uses internal names (e.g. Sum(Sales.Amount))
+        columns = column_headers
+
+        total_rows = get_table_row_count(self._driver, table_el)
+        progress = None
+        if self._on_progress:
+            progress = ProgressTracker(
+                self._on_progress,
+                columns,
+                min(total_rows or max_rows, max_rows) if max_rows else total_rows,
+                skip_until + 1,
+                table=title,
+            )
+
+        return TableStream(
+            columns,
+            metrics.timed_iter(
+                "scrape_table",
+                self._iter_batches(first_page, max_rows, skip_until, progress),
+            ),
+            total_rows,
+        )
+
+    # progress: Pages received are counted as scroll steps
+    # If cancelled, the iteration stops before waiting for the next page, so the rows scraped so far are kept
+    def _iter_batches(
+        self,
+        page: DsrPage,
+        max_rows: Optional[int],
+        skip_until: int,
+        progress: Optional[ProgressTracker] = None,
+    ) -> Iterator[list[IndexedRow]]:
+        first_row = page.rows[0] if page.rows else None
+        row_count = 0
+        page_count = 1
+
+        while True:
+            batch: list[IndexedRow] = []
+            for row in page.rows:
+                if max_rows and row_count >= max_rows:
+                    break
+                if row_count > skip_until:
+                    batch.append((row_count, row))
+                row_count += 1
+
+            logger.debug(f"Decoded page {page_count} with {len(page.rows)} rows")
+            if batch:
+                metrics.count("rows_scraped", len(batch))
+                metrics.observe("rows_per_page", len(batch))
+                if progress:
+                    progress.on_batch(batch)
+                yield batch
+            if max_rows and row_count >= max_rows:
+                logger.debug(f"Reached max rows: {max_rows}")
+                break
+            if not page.has_more:
+                break
+
+            if self._cancel_token.is_cancelled:
+                logger.info(f"Table scrape cancelled after {row_count} rows")
+                return
+            next_page = self._wait_for_page(
+                len(page.columns), NEXT_PAGE_TIMEOUT, should_scroll=True
+            )
+            # Power BI may query the table again from the start, e.g. when the visual is resized
+            while next_page and next_page.rows and next_page.rows[0] == first_row:
+                logger.debug("Ignoring repeated query of the first page")
+                next_page = self._wait_for_page(
+                    len(page.columns), NEXT_PAGE_TIMEOUT, should_scroll=True
+                )
+            if next_page is None and self._cancel_token.is_cancelled:
+                logger.info(f"Table scrape cancelled after {row_count} rows")
+                return
+            if next_page is None:
+                logger.warning(
+                    f"Timed out waiting for more rows after {row_count} rows. The table may be incomplete."
+                )
+                break
+            page = next_page
+            page_count += 1
+            if progress:
+                progress.on_scroll()
+
+        if progress:
+            progress.finish()
+        logger.debug(f"Scraping complete. Rows: {row_count}")
+
+    # Wait for the next query response of the table. Responses of other visuals are ignored.
+    # The first page is the first response with the given number of columns. Later pages must be responses to the same query (same visual and query columns).
+    # If should_scroll is true, the table is scrolled down while waiting to make Power BI request the next page.
+    # Returns None if no response was received before the timeout or the scrape was cancelled
+    @metrics.timed("wait_for_query_response")
+    def _wait_for_page(
+        self, column_count: int, timeout: float, should_scroll: bool
+    ) -> Optional[DsrPage]:
+        start = time.perf_counter()
+        last_scroll = 0.0
+        while time.perf_counter() - start < timeout:
+            # Responses not used now are kept for the next call
+            self._responses.extend(self._capture.poll())
+            while self._responses:
+                page = self._match_page(self._responses.popleft(), column_count)
+                if page is not None:
+                    logger.debug(
+                        f"Query response received after {time.perf_counter() - start:.2f}s"
+                    )
+                    return page
+
+            if (
+                should_scroll
+                and time.perf_counter() - last_scroll >= self._render_timeout
+            ):
+                self._scroll_down()
+                last_scroll = time.perf_counter()
+            metrics.count("pause_seconds", POLL_INTERVAL, action="query_poll")
+            if self._cancel_token.wait(POLL_INTERVAL):
+                return None
+        return None
+
+    # The page of the response if it belongs to the table, otherwise None
+    def _match_page(
+        self, response: QueryResponse, column_count: int
+    ) -> Optional[DsrPage]:
+        try:
+            page = decode_query_result(response.body)
+        except DsrDecodeError as e:
+            logger.debug(f"Ignoring query response: {e}")
+            return None
+
+        query_key = (response.visual_id, tuple(page.columns))
+        if self._query_key is None:
+            if len(page.columns) != column_count:
+                return None
+            self._query_key = query_key
+        elif query_key != self._query_key:
+            logger.debug(
+                f"Ignoring query response of another visual: {response.visual_id} {page.columns}"
+            )
+            return None
+        return page
+
+    # Scroll down from the last rendered row, which makes Power BI request the next page when reaching the end of the loaded rows
+    def _scroll_down(self):
+        data_container = self._driver.find_element(
+            By.CSS_SELECTOR, f"{TABLE_CSS_SELECTOR} {DATA_CONTAINER_CSS_SELECTOR}"
+        )
+        result = cast(
+            list[Any],
+            self._driver.execute_script(VISIBLE_ROW_INDICIES_SCRIPT, data_container),
+        )
+        _, last_row_el = result
+        if last_row_el is None:
+            return
+        ActionChains(self._driver).move_to_element(last_row_el).pause(0.1).send_keys(
+            Keys.ARROW_DOWN * SCROLL_STRIDE
+        ).perform()
+        metrics.count("pause_seconds", 0.1, action="query_scroll")
@@ -1,16 +1,23 @@
 # pyright: reportUnknownMemberType=false
 
 import logging
-from time import sleep
-from typing import Optional
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional, cast
 
 import pandas as pd
+from selenium.common.exceptions import JavascriptException
 from selenium.webdriver import ActionChains
 from selenium.webdriver.chrome.webdriver import WebDriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.remote.webelement import WebElement
 
+from src import metrics
+from src.cancellation import CancellationToken
+from src.config import ExtractionMode
+from src.progress import ProgressListener, ProgressTracker
+from src.scraper.dom_waiter import DomChangeWaiter
+
 logger = logging.getLogger(__name__)
 
 # CSS selectors
@@ -22,16 +29,152 @@ ROW_INDEX_ATTRIBUTE = "row-index"
 ROW_DATA_CELL_CSS_SELECTOR = ".main-cell"
 TABLE_SCROLLBAR_CSS_SELECTOR = "div.scroll-bar-part-bar"
 
+# Reads the row index and cell texts of all rows currently rendered in the data container (arguments[0]) in a single round-trip.
+# Returns [[[row_index, [cell_text, ...]], ...], last_row_element]
+SCRAPE_VISIBLE_ROWS_SCRIPT = f"""
+const rows = arguments[0].querySelectorAll("{ROWS_CSS_SELECTOR}");
+const result = [];
+for (const row of rows) {{
+    const cells = row.querySelectorAll("{ROW_DATA_CELL_CSS_SELECTOR}");
+    const cellTexts = [];
+    for (const cell of cells) {{
+        cellTexts.push(cell.innerText.trim());
+    }}
+    result.push([parseInt(row.getAttribute("{ROW_INDEX_ATTRIBUTE}"), 10), cellTexts]);
+}}
+return [result, rows.length ? rows[rows.length - 1] : null];
+"""
+
+# Same as above, but only reads the row indicies.
+# Returns [[row_index, ...], last_row_element]
+VISIBLE_ROW_INDICIES_SCRIPT = f"""
+const rows = arguments[0].querySelectorAll("{ROWS_CSS_SELECTOR}");
+const result = [];
+for (const row of rows) {{
+    result.push(parseInt(row.getAttribute("{ROW_INDEX_ATTRIBUTE}"), 10));
+}}
+return [result, rows.length ? rows[rows.length - 1] : null];
+"""
+
+# Title of the visual containing the table (arguments[0]), if it has one
+TABLE_TITLE_SCRIPT = """
+const container = arguments[0].closest(".visualContainer, visual-container");
+const title = container && container.querySelector(".visualTitle, [role='heading']");
+return title ? title.innerText.trim() : (container && container.getAttribute("aria-label")) || "";
+"""
+
+# Number of data rows of the table (arguments[0]) from the ARIA row count of the grid (which includes the header row), or null if not available
+TABLE_ROW_COUNT_SCRIPT = """
+const grid = arguments[0].matches("[aria-rowcount]") ? arguments[0] : arguments[0].querySelector("[aria-rowcount]");
+const count = grid ? parseInt(grid.getAttribute("aria-rowcount"), 10) : NaN;
+return Number.isNaN(count) ? null : Math.max(0, count - 1);
+"""
+
+# A scraped row: (row index, cell texts)
+IndexedRow = tuple[int, list[str]]
+
+
+# Column headers of a table and a lazy iterator of row batches. Each batch contains the new rows found after a scroll step.
+# total_rows: Number of data rows of the table, if the table visual exposes it (see get_table_row_count)
+@dataclass
+class TableStream:
+    columns: list[str]
+    batches: Iterator[list[IndexedRow]]
+    total_rows: Optional[int] = None
+
+
+# Max number of key presses per scroll step when skipping already scraped rows
+FAST_FORWARD_MAX_STRIDE = 64
+
+# Min number of already processed rows we want to see after each scroll. Less overlap means we risk skipping rows
+SCROLL_OVERLAP_MARGIN = 2
+
+
+# Number of data rows of the table, if the table visual exposes it (see TABLE_ROW_COUNT_SCRIPT)
+def get_table_row_count(driver: WebDriver, table_el: WebElement) -> Optional[int]:
+    try:
+        row_count = cast(
+            Optional[int], driver.execute_script(TABLE_ROW_COUNT_SCRIPT, table_el)
+        )
+    except JavascriptException:
+        return None
+    return int(row_count) if row_count is not None else None
+
+
+# Number of key presses per scroll step. Adjusted after each step based on the overlap of rows between steps:
+# Increased while the overlap is larger than the margin, and reduced when there is no overlap or rows were skipped.
+class _ScrollStride:
+    def __init__(self, max_stride: int) -> None:
+        self.value = 1
+        self._max = max(1, max_stride)
+
+    def update(self, overlap: int):
+        if overlap > SCROLL_OVERLAP_MARGIN:
+            self.value = min(self.value * 2, self._max)
+        elif overlap == 0:
+            self.value = max(1, self.value // 2)
+
+    # Rows were skipped using the current stride. Reduce the stride and do not grow beyond it again
+    def back_off(self):
+        self.value = max(1, self.value // 2)
+        self._max = self.value
+
 
 class TableScraper:
-    def __init__(self, driver: WebDriver) -> None:
+    def __init__(
+        self,
+        driver: WebDriver,
+        extraction_mode: ExtractionMode = ExtractionMode.BATCH,
+        max_scroll_stride: int = 8,
+        idle_window: float = 0.05,
+        render_timeout: float = 2.0,
+        on_progress: Optional[ProgressListener] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> None:
         self._driver = driver
+        self._extraction_mode = extraction_mode
+        self._max_scroll_stride = max_scroll_stride
+        self._idle_window = idle_window
+        self._render_timeout = render_timeout
+        self._on_progress = on_progress
+        self._cancel_token = cancel_token or CancellationToken()
 
     def execute(self, max_rows: Optional[int] = None) -> pd.DataFrame:
+        stream = self.open_stream(max_rows)
+        table_rows = [row for batch in stream.batches for _, row in batch]
+        return pd.DataFrame(table_rows, columns=stream.columns)
+
+    # Find all table visuals on the page. Returns (title, table element) for each table
+    def find_tables(self) -> list[tuple[str, WebElement]]:
+        table_els = self._driver.find_elements(By.CSS_SELECTOR, TABLE_CSS_SELECTOR)
+        tables: list[tuple[str, WebElement]] = []
+        for i, table_el in enumerate(table_els):
+            title = str(
+                self._driver.execute_script(TABLE_TITLE_SCRIPT, table_el)  # type: ignore
+                or ""
+            )
+            tables.append((title or f"Table {i + 1}", table_el))
+        logger.debug(f"Found {len(tables)} tables: {[title for title, _ in tables]}")
+        return tables
+
+    # Find the table and its column headers. Rows are scraped lazily while consuming the returned stream.
+    # skip_until: Rows up to and including this row index are already scraped (e.g. when resuming). The table is scrolled past them without scraping their cells.
+    # table_el: Table to scrape (see find_tables). Defaults to the first table on the page
+    # title: Title of the table shown in its progress events, when scraping multiple tables
+    # Time spent opening the stream and producing its batches is recorded as open_table and scrape_table
+    @metrics.timed("open_table")
+    def open_stream(
+        self,
+        max_rows: Optional[int] = None,
+        skip_until: int = -1,
+        table_el: Optional[WebElement] = None,
+        title: Optional[str] = None,
+    ) -> TableStream:
         logger.debug("Scraping table data...")
 
         # Get table element
-        table_el = self._driver.find_element(By.CSS_SELECTOR, TABLE_CSS_SELECTOR)
+        if table_el is None:
+            table_el = self._driver.find_element(By.CSS_SELECTOR, TABLE_CSS_SELECTOR)
 
         # Get column headers
         header_row = table_el.find_elements(By.CSS_SELECTOR, HEADER_ROW_CSS_SELECTOR)
@@ -42,29 +185,115 @@ class TableScraper:
             By.CSS_SELECTOR, DATA_CONTAINER_CSS_SELECTOR
         )
 
-        table_rows: list[list[str]] = []
+        total_rows = get_table_row_count(self._driver, table_el)
+        progress = None
+        if self._on_progress:
+            progress = ProgressTracker(
+                self._on_progress,
+                column_headers,
+                min(total_rows or max_rows, max_rows) if max_rows else total_rows,
+                skip_until + 1,
+                table=title,
+            )
+
+        return TableStream(
+            column_headers,
+            metrics.timed_iter(
+                "scrape_table",
+                self._iter_batches(data_container, max_rows, skip_until, progress),
+            ),
+            total_rows,
+        )
+
+    # Yields the new rows found after each scroll step.
+    # A batch is yielded after scrolling, and the wait for the new rows to render happens when the next batch is requested.
+    # This way, multiple tables can be scrolled before waiting for any of them (see PowerBiScraper.scrape_all_to).
+    # If cancelled, the iteration stops before the next scroll step, so the rows scraped so far are kept.
+    def _iter_batches(
+        self,
+        data_container: WebElement,
+        max_rows: Optional[int],
+        skip_until: int,
+        progress: Optional[ProgressTracker] = None,
+    ) -> Iterator[list[IndexedRow]]:
+        # Used to wait for new rows to render after scrolling
+        waiter = DomChangeWaiter(
+            self._driver,
+            data_container,
+            self._idle_window,
+            self._render_timeout,
+            attribute_filter=[ROW_INDEX_ATTRIBUTE],
+            name="table rows",
+        )
+        waiter.install()
+
+        row_count = 0
         processed_row_indicies: set[int] = set()
+        highest_row_index = -1
+
+        if skip_until >= 0:
+            self._fast_forward(data_container, waiter, skip_until)
+            processed_row_indicies.update(range(skip_until + 1))
+            highest_row_index = skip_until
+
+        stride = _ScrollStride(self._max_scroll_stride)
 
         # Reveal and scrape all currently visible rows in table.
         # Scrape and scroll until no new rows are found i.e. we have reached the end of the table.
         has_new_rows = True
         iteration = 0
+        has_scrolled = False
 
         while has_new_rows:
+            if self._cancel_token.is_cancelled:
+                logger.info(f"Table scrape cancelled after {row_count} rows")
+                return
             iteration += 1
             has_new_rows = False
-            rows = data_container.find_elements(By.CSS_SELECTOR, ROWS_CSS_SELECTOR)
+            if has_scrolled:
+                waiter.wait()
+                has_scrolled = False
+            rows, last_row_el = self._scrape_visible_rows(
+                data_container, processed_row_indicies
+            )
             # logger.debug(f"Found {len(rows)} rows in current table view")
 
+            if last_row_el is None:
+                logger.debug("No rows found in current table view")
+                break
+
+            # If the first unseen row does not follow the last processed row, we have scrolled past some rows.
+            # Scroll back and continue with a smaller stride (not possible if we are already scrolling a single step).
+            new_row_indicies = [i for i, _ in rows if i not in processed_row_indicies]
+            if (
+                iteration > 1
+                and stride.value > 1
+                and new_row_indicies
+                and min(new_row_indicies) > highest_row_index + 1
+            ):
+                # Scroll back to where a scroll using the reduced stride would have ended
+                prev_stride = stride.value
+                stride.back_off()
+                logger.debug(
+                    f"Scrolled past rows after row {highest_row_index} using stride {prev_stride}. Scrolling back to stride {stride.value}..."
+                )
+                self._scroll_with_key(
+                    last_row_el, Keys.ARROW_UP, prev_stride - stride.value
+                )
+                if progress:
+                    progress.on_scroll()
+                has_scrolled = True
+                has_new_rows = True
+                continue
+
             # Process current rows
+            batch: list[IndexedRow] = []
             skipped_rows = 0
-            for row in rows:
+            for row_index, row_data in rows:
                 if max_rows and len(processed_row_indicies) >= max_rows:
                     logger.debug(f"Reached max rows: {max_rows}")
                     break
 
-                row_index = self._get_row_index(row)
-
                 # Skip row if already processed
                 if row_index in processed_row_indicies:
                     # logger.debug(f"Skipping row {row_index} as already processed")
@@ -73,9 +302,9 @@ class TableScraper:
 
                 has_new_rows = True
                 # logger.debug(f"Processing row {row_index}...")
-                row_data = self._scrape_table_row(row)
-                table_rows.append(row_data)
+                batch.append((row_index, row_data))
                 processed_row_indicies.add(row_index)
+                highest_row_index = max(highest_row_index, row_index)
                 logger.debug(f"Processed row {row_index}, first cell: {row_data[0]}")
                 # comma = ", ".join(row_data)
                 # print(f"Scraped row {scrape_row_index}: {comma}")
@@ -85,32 +314,94 @@ class TableScraper:
                     f"Skipped {skipped_rows} of {len(rows)} rows as already processed"
                 )
             # After the first iteration, we expect to find some overlap of rows between iterations. If all rows are unseen, we might be scrolling too far down for each iteration.
-            elif iteration > 1:
+            # If scrolling multiple steps at a time, the stride is reduced instead.
+            elif iteration > 1 and stride.value == 1:
                 logger.warning(
                     "Found no already processed rows in current table view. Ensure that scraper is not scrolling too far down."
                 )
 
+            # Use overlap to adjust how far to scroll next
+            if iteration > 1:
+                stride.update(skipped_rows)
+
             # Scroll down to load more rows
-            logger.debug("Scrolling down to load more rows...")
-            self._scroll_with_key(rows[-1])
+            logger.debug(f"Scrolling down {stride.value} steps to load more rows...")
+            self._scroll_with_key(last_row_el, Keys.ARROW_DOWN, stride.value)
+            has_scrolled = True
+            if progress:
+                progress.on_scroll()
             # self._scroll_with_bar() # XXX: Option to choose scroll method?
 
+            if batch:
+                row_count += len(batch)
+                metrics.count("rows_scraped", len(batch))
+                metrics.observe("rows_per_scroll", len(batch))
+                if progress:
+                    progress.on_batch(batch)
+                yield batch
+
+        if progress:
+            progress.finish()
         logger.debug("Reached end of table. No new rows found.")
-        logger.debug(
-            f"Scraping complete. Rows: {len(table_rows)}, Columns: {len(column_headers)}"
-        )
+        logger.debug(f"Scraping complete. Rows: {row_count}")
+
+    # Scroll until the row after 'row_index' is visible, only reading row indicies (no cell data) on the way
+    def _fast_forward(
+        self, data_container: WebElement, waiter: DomChangeWaiter, row_index: int
+    ):
+        logger.info(f"Skipping already scraped rows up to row {row_index}...")
+        stride = 1
+        max_stride = FAST_FORWARD_MAX_STRIDE
+        prev_highest = -1
+
+        # If cancelled, the scrape stops before scraping any rows (see _iter_batches)
+        while not self._cancel_token.is_cancelled:
+            indicies, last_row_el = self._get_visible_row_indicies(data_container)
+            if last_row_el is None:
+                return
 
-        return pd.DataFrame(table_rows, columns=column_headers)
+            # Scrolled too far, go back with a smaller stride
+            if min(indicies) > row_index + 1:
+                stride = max(1, stride // 2)
+                max_stride = stride
+                self._scroll_with_key(last_row_el, Keys.ARROW_UP, stride)
+                waiter.wait()
+                continue
+
+            # Next row to scrape is visible, or we are at the end of the table
+            highest = max(indicies)
+            if highest > row_index or highest == prev_highest:
+                logger.debug(f"Skipped to row {highest}")
+                return
+
+            prev_highest = highest
+            self._scroll_with_key(last_row_el, Keys.ARROW_DOWN, stride)
+            waiter.wait()
+            stride = min(stride * 2, max_stride)
+
+    def _get_visible_row_indicies(
+        self, data_container: WebElement
+    ) -> tuple[list[int], Optional[WebElement]]:
+        result = cast(
+            list[Any],
+            self._driver.execute_script(VISIBLE_ROW_INDICIES_SCRIPT, data_container),
+        )
+        raw_indicies, last_row_el = result
+        return [int(i) for i in raw_indicies], last_row_el
 
     # Using key down to scroll - this seems to be more reliable across different table types than using the scrollbar.
-    # NB: This may be a slow method for tables that only scroll down 1 row for every key press. However, other tables will scroll down multiple rows per key press.
-    def _scroll_with_key(self, last_table_el: WebElement):
+    # NB: Some tables only scroll down 1 row for every key press, while other tables will scroll down multiple rows per key press.
+    # Multiple key presses (count) are sent in a single action to scroll further in one step.
+    # The caller waits for the table to render the new rows.
+    @metrics.timed("scroll")
+    def _scroll_with_key(self, last_table_el: WebElement, key: str, count: int = 1):
         actions = ActionChains(self._driver)
         ACTION_WAIT = 0.1
 
         actions.move_to_element(last_table_el).pause(ACTION_WAIT).send_keys(
-            Keys.ARROW_DOWN
-        ).pause(ACTION_WAIT).perform()
+            key * count
+        ).perform()
+        metrics.count("pause_seconds", ACTION_WAIT, action="table_scroll")
 
     # TODO: Make it work with different table sizes
     # Using scrollbar and is able to reveal multiple new rows for each scroll, but unreliable across different table types.
@@ -131,6 +422,51 @@ class TableScraper:
         actions.click().pause(0.5)
         actions.perform()
 
+    # Scrape all currently visible rows. Rows already processed may be returned without cell data when using per element extraction.
+    @metrics.timed("read_rows")
+    def _scrape_visible_rows(
+        self, data_container: WebElement, processed_row_indicies: set[int]
+    ) -> tuple[list[IndexedRow], Optional[WebElement]]:
+        if self._extraction_mode == ExtractionMode.BATCH:
+            try:
+                return self._scrape_visible_rows_batch(data_container)
+            except (JavascriptException, TypeError, ValueError) as e:
+                logger.warning(
+                    f"Batch extraction of rows failed, falling back to per element extraction: {e}"
+                )
+                self._extraction_mode = ExtractionMode.PER_ELEMENT
+
+        return self._scrape_visible_rows_per_element(
+            data_container, processed_row_indicies
+        )
+
+    # Scrape row indicies and cell texts of all visible rows in a single script call
+    def _scrape_visible_rows_batch(
+        self, data_container: WebElement
+    ) -> tuple[list[IndexedRow], Optional[WebElement]]:
+        result = cast(
+            list[Any],
+            self._driver.execute_script(SCRAPE_VISIBLE_ROWS_SCRIPT, data_container),
+        )
+        raw_rows, last_row_el = result
+        rows = [(int(row_index), list(cells)) for row_index, cells in raw_rows]
+        return rows, last_row_el
+
+    # Scrape rows using separate WebDriver calls for each row and cell. Cells are only scraped for rows not already processed.
+    def _scrape_visible_rows_per_element(
+        self, data_container: WebElement, processed_row_indicies: set[int]
+    ) -> tuple[list[IndexedRow], Optional[WebElement]]:
+        row_els = data_container.find_elements(By.CSS_SELECTOR, ROWS_CSS_SELECTOR)
+        rows: list[IndexedRow] = []
+        for row_el in row_els:
+            row_index = self._get_row_index(row_el)
+            if row_index in processed_row_indicies:
+                rows.append((row_index, []))
+            else:
+                rows.append((row_index, self._scrape_table_row(row_el)))
+
+        return rows, row_els[-1] if row_els else None
+
     # Scrape each cell in a row into a list of strings
     def _scrape_table_row(self, row: WebElement) -> list[str]:
         cells = row.find_elements(By.CSS_SELECTOR, ROW_DATA_CELL_CSS_SELECTOR)
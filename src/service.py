@@ -0,0 +1,379 @@
+import heapq
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from pydantic import BaseModel, Field, HttpUrl
+
+from src import metrics
+from src.cancellation import CancellationToken, ScrapeCancelledError
+from src.config import CheckedOutputFormat, OutputFormat
+from src.progress import ProgressEvent
+from src.scraper.driver_pool import DriverPool
+from src.usecase import ScrapeResult
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+# A scrape job submitted to the service. Filter settings and max_rows override the settings of the config for this job only.
+# output_path: Path of the output file, relative to the output directory of the service
+# priority: Jobs with a higher priority are scraped first. Jobs with the same priority are scraped in the order they were submitted
+class JobRequest(BaseModel):
+    url: HttpUrl
+    output_path: Path
+    output_format: CheckedOutputFormat = OutputFormat.EXCEL
+    priority: int = 0
+    filter_values: Optional[list[str]] = None
+    should_uncheck_filter: Optional[bool] = None
+    max_rows: Optional[int] = Field(default=None, gt=0)
+
+
+@dataclass
+class ServiceJob:
+    id: str
+    request: JobRequest
+    save_path: Path
+    status: JobStatus = JobStatus.QUEUED
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[ScrapeResult] = None
+    error: Optional[str] = None
+    webdriver_calls: int = 0
+    # Latest progress of the table being scraped, set by run_job
+    progress: Optional[ProgressEvent] = None
+    # Passed to the scrape by run_job
+    cancel_token: CancellationToken = field(default_factory=CancellationToken)
+
+    # Seconds spent waiting in the queue, scraping, and in total
+    @property
+    def queue_seconds(self) -> Optional[float]:
+        return self.started_at - self.submitted_at if self.started_at else None
+
+    @property
+    def run_seconds(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def latency_seconds(self) -> Optional[float]:
+        return self.finished_at - self.submitted_at if self.finished_at else None
+
+    def to_dict(self) -> dict[str, Any]:
+        rows = self.result.rows if self.result else 0
+        run_seconds = self.run_seconds
+        return {
+            "id": self.id,
+            "url": self.request.url.unicode_string(),
+            "status": self.status.value,
+            "priority": self.request.priority,
+            "output_path": str(self.result.path if self.result else self.save_path),
+            "output_format": self.request.output_format.value,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "progress": _progress_to_dict(self.progress) if self.progress else None,
+            "stats": {
+                "queue_seconds": self.queue_seconds,
+                "run_seconds": run_seconds,
+                "latency_seconds": self.latency_seconds,
+                "rows": rows,
+                "columns": self.result.columns if self.result else 0,
+                "rows_per_second": rows / run_seconds if run_seconds else None,
+                "is_unchanged": self.result.is_unchanged if self.result else False,
+                "webdriver_calls": self.webdriver_calls,
+            },
+        }
+
+
+def _progress_to_dict(event: ProgressEvent) -> dict[str, Any]:
+    return {
+        "rows": event.rows,
+        "total_rows": event.total_rows,
+        "fraction": event.fraction,
+        "rows_per_second": event.rows_per_second,
+        "eta_seconds": event.eta,
+        "scroll_steps": event.scroll_steps,
+        "is_done": event.is_done,
+        "table": event.table,
+    }
+
+
+class QueueFullError(Exception):
+    pass
+
+
+# Runs submitted scrape jobs in priority order on a fixed number of worker threads, so at most 'workers' reports are scraped at a time.
+# Finished jobs are kept (up to max_finished_jobs) so clients can poll their status and results.
+# run_job: Scrapes and saves a job. Called on a worker thread while the metrics of the job are collecting
+# driver_pool: Pool used by run_job, only used for stats
+# report_metrics: Called with the metrics of each job when it is done
+class ScrapeService:
+    def __init__(
+        self,
+        run_job: Callable[[ServiceJob], ScrapeResult],
+        output_dir: Path,
+        workers: int = 2,
+        max_queue_size: int = 100,
+        max_finished_jobs: int = 1000,
+        driver_pool: Optional[DriverPool] = None,
+        report_metrics: Optional[Callable[[metrics.Metrics], None]] = None,
+    ) -> None:
+        self._run_job = run_job
+        self._output_dir = output_dir.absolute()
+        self._worker_count = workers
+        self._max_queue_size = max_queue_size
+        self._driver_pool = driver_pool
+        self._report_metrics = report_metrics
+
+        self._condition = threading.Condition()
+        # Heap of (-priority, sequence number, job)
+        self._queue: list[tuple[int, int, ServiceJob]] = []
+        self._sequence = 0
+        self._jobs: dict[str, ServiceJob] = {}
+        self._finished: deque[ServiceJob] = deque(maxlen=max_finished_jobs)
+        self._running = 0
+        self._threads: list[threading.Thread] = []
+        self._is_stopped = False
+
+        # Totals since the service started
+        self._started_at = time.time()
+        self._succeeded = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._total_rows = 0
+        self._total_run_seconds = 0.0
+
+    def start(self):
+        for i in range(self._worker_count):
+            thread = threading.Thread(
+                target=self._work, name=f"service-worker-{i + 1}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Scrape service started with {self._worker_count} workers")
+
+    # Stop taking jobs from the queue, cancel the running jobs and wait for them to save the rows scraped so far. Queued jobs are discarded
+    def stop(self):
+        with self._condition:
+            self._is_stopped = True
+            discarded = len(self._queue)
+            running = [
+                job for job in self._jobs.values() if job.status == JobStatus.RUNNING
+            ]
+            self._condition.notify_all()
+        if discarded:
+            logger.warning(f"Discarding {discarded} queued jobs")
+        if running:
+            logger.info(f"Cancelling {len(running)} running jobs...")
+        for job in running:
+            job.cancel_token.cancel()
+        for thread in self._threads:
+            thread.join()
+        logger.info("Scrape service stopped")
+
+    # Raises ValueError if the output path is outside the output directory, and QueueFullError if the queue is full
+    def submit(self, request: JobRequest) -> ServiceJob:
+        save_path = (self._output_dir / request.output_path).resolve()
+        if not save_path.is_relative_to(self._output_dir.resolve()):
+            raise ValueError(
+                f"output_path must be inside the output directory: {request.output_path}"
+            )
+
+        job = ServiceJob(uuid.uuid4().hex, request, save_path)
+        with self._condition:
+            if self._is_stopped:
+                raise QueueFullError("Service is stopping")
+            if len(self._queue) >= self._max_queue_size:
+                raise QueueFullError(
+                    f"Queue is full ({self._max_queue_size} jobs), try again later"
+                )
+            self._sequence += 1
+            heapq.heappush(self._queue, (-request.priority, self._sequence, job))
+            self._jobs[job.id] = job
+            self._condition.notify()
+
+        logger.info(
+            f"Job {job.id} queued: {job.request.url} -> {save_path} (priority {request.priority})"
+        )
+        return job
+
+    # Remove a queued job from the queue, or cancel a running job (it saves the rows scraped so far). Finished jobs are not changed.
+    # Returns the job, or None if the job is unknown
+    def cancel(self, job_id: str) -> Optional[dict[str, Any]]:
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status == JobStatus.QUEUED:
+                self._queue = [entry for entry in self._queue if entry[2] is not job]
+                heapq.heapify(self._queue)
+                job.status = JobStatus.CANCELLED
+                job.finished_at = time.time()
+                self._cancelled += 1
+                self._add_finished(job)
+                logger.info(f"Job {job.id} cancelled while queued")
+            elif job.status == JobStatus.RUNNING:
+                job.cancel_token.cancel()
+            return job.to_dict()
+
+    def get_job(self, job_id: str) -> Optional[dict[str, Any]]:
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    # Jobs in the queue (in the order they will run), running and finished jobs (newest first)
+    def list_jobs(self, status: Optional[JobStatus] = None) -> list[dict[str, Any]]:
+        with self._condition:
+            queued = [job for _, _, job in sorted(self._queue)]
+            others = sorted(
+                (job for job in self._jobs.values() if job.status != JobStatus.QUEUED),
+                key=lambda job: job.submitted_at,
+                reverse=True,
+            )
+            return [
+                job.to_dict()
+                for job in queued + others
+                if status is None or job.status == status
+            ]
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._condition:
+            finished = list(self._finished)
+            uptime = time.time() - self._started_at
+            stats: dict[str, Any] = {
+                "uptime_seconds": uptime,
+                "workers": self._worker_count,
+                "jobs": {
+                    "queued": len(self._queue),
+                    "running": self._running,
+                    "succeeded": self._succeeded,
+                    "failed": self._failed,
+                    "cancelled": self._cancelled,
+                },
+                "throughput": {
+                    "jobs_per_minute": (self._succeeded + self._failed) / uptime * 60
+                    if uptime
+                    else 0,
+                    "rows_per_second": self._total_rows / self._total_run_seconds
+                    if self._total_run_seconds
+                    else 0,
+                },
+            }
+
+        # Latencies of the jobs kept in the finished history
+        succeeded = [job for job in finished if job.status == JobStatus.SUCCEEDED]
+        stats["queue_seconds"] = _summarize([job.queue_seconds for job in finished])
+        stats["run_seconds"] = _summarize([job.run_seconds for job in succeeded])
+        stats["latency_seconds"] = _summarize(
+            [job.latency_seconds for job in succeeded]
+        )
+        if self._driver_pool:
+            stats["sessions"] = {
+                "cold_starts": self._driver_pool.cold_starts,
+                "warm_hits": self._driver_pool.warm_hits,
+            }
+        return stats
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._is_stopped:
+                    self._condition.wait()
+                if self._is_stopped:
+                    return
+                _, _, job = heapq.heappop(self._queue)
+                job.status = JobStatus.RUNNING
+                job.started_at = time.time()
+                self._running += 1
+
+            logger.info(f"Job {job.id} started after {job.queue_seconds:.1f}s in queue")
+            job_metrics = metrics.Metrics()
+            result = None
+            error = None
+            try:
+                with metrics.collect(job_metrics):
+                    result = self._run_job(job)
+            except ScrapeCancelledError as e:
+                error = str(e)
+            except Exception as e:
+                logger.exception(f"Job {job.id} failed: {e}")
+                error = str(e) or type(e).__name__
+
+            self._finish(job, result, error, job_metrics)
+            if self._report_metrics:
+                self._report_metrics(job_metrics)
+
+    def _finish(
+        self,
+        job: ServiceJob,
+        result: Optional[ScrapeResult],
+        error: Optional[str],
+        job_metrics: metrics.Metrics,
+    ):
+        with self._condition:
+            job.finished_at = time.time()
+            job.result = result
+            job.error = error
+            job.webdriver_calls = job_metrics.get_calls("webdriver_command")
+            self._running -= 1
+            # A cancelled job may have saved the rows scraped until it was cancelled
+            if job.cancel_token.is_cancelled:
+                job.status = JobStatus.CANCELLED
+                job.error = None
+                self._cancelled += 1
+            elif result:
+                job.status = JobStatus.SUCCEEDED
+                self._succeeded += 1
+                self._total_rows += result.rows
+                self._total_run_seconds += job.run_seconds or 0
+            else:
+                job.status = JobStatus.FAILED
+                self._failed += 1
+            self._add_finished(job)
+
+        logger.info(
+            f"Job {job.id} {job.status.value} in {job.run_seconds:.1f}s [rows: {result.rows if result else 0}, webdriver calls: {job.webdriver_calls}]"
+        )
+
+    # Keep the job in the history. Must be called holding the lock
+    def _add_finished(self, job: ServiceJob):
+        # Forget the oldest finished job when the history is full
+        if len(self._finished) == self._finished.maxlen:
+            del self._jobs[self._finished[0].id]
+        self._finished.append(job)
+
+
+# Mean, median, 95th percentile and max, or None if there are no values
+def _summarize(values: list[Optional[float]]) -> Optional[dict[str, float]]:
+    present = sorted(value for value in values if value is not None)
+    if not present:
+        return None
+
+    def percentile(p: float) -> float:
+        return present[max(0, math.ceil(p * len(present)) - 1)]
+
+    return {
+        "count": len(present),
+        "mean": sum(present) / len(present),
+        "p50": percentile(0.5),
+        "p95": percentile(0.95),
+        "max": present[-1],
+    }
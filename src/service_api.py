@@ -0,0 +1,122 @@
+import json
+import logging
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, cast
+from urllib.parse import parse_qs, urlparse
+
+from src.service import JobRequest, JobStatus, QueueFullError, ScrapeService
+
+logger = logging.getLogger(__name__)
+
+# Max size of a request body in bytes
+MAX_BODY_SIZE = 1024 * 1024
+
+
+# HTTP API of the scrape service. Requests and responses are JSON.
+# POST /jobs: Submit a job (see JobRequest). Returns the job with status 202
+# GET /jobs[?status=queued|running|succeeded|failed]: List jobs
+# GET /jobs/<id>: Status, output and stats of a job
+# DELETE /jobs/<id>: Cancel a job. A running job saves the rows scraped so far
+# GET /stats: Throughput and latency stats of the service
+# GET /health: Returns 200 while the service is running
+class ServiceHttpServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: ScrapeService) -> None:
+        super().__init__(address, _ServiceRequestHandler)
+        self.service = service
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _ServiceRequestHandler(BaseHTTPRequestHandler):
+    @property
+    def service(self) -> ScrapeService:
+        return cast(ServiceHttpServer, self.server).service
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        service = self.service
+
+        match parts:
+            case ["health"]:
+                self._send_json(HTTPStatus.OK, {"status": "ok"})
+            case ["stats"]:
+                self._send_json(HTTPStatus.OK, service.get_stats())
+            case ["jobs"]:
+                status = parse_qs(url.query).get("status", [None])[0]
+                try:
+                    job_status = JobStatus(status) if status else None
+                except ValueError:
+                    self._send_error(
+                        HTTPStatus.BAD_REQUEST, f"Unknown status: {status}"
+                    )
+                    return
+                self._send_json(HTTPStatus.OK, service.list_jobs(job_status))
+            case ["jobs", job_id]:
+                job = service.get_job(job_id)
+                if job is None:
+                    self._send_error(HTTPStatus.NOT_FOUND, f"Unknown job: {job_id}")
+                else:
+                    self._send_json(HTTPStatus.OK, job)
+            case _:
+                self._send_error(HTTPStatus.NOT_FOUND, f"Not found: {url.path}")
+
+    def do_DELETE(self):
+        match [part for part in urlparse(self.path).path.split("/") if part]:
+            case ["jobs", job_id]:
+                job = self.service.cancel(job_id)
+                if job is None:
+                    self._send_error(HTTPStatus.NOT_FOUND, f"Unknown job: {job_id}")
+                else:
+                    self._send_json(HTTPStatus.OK, job)
+            case _:
+                self._send_error(HTTPStatus.NOT_FOUND, f"Not found: {self.path}")
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip("/") != "/jobs":
+            self._send_error(HTTPStatus.NOT_FOUND, f"Not found: {self.path}")
+            return
+
+        try:
+            request = JobRequest.model_validate(self._read_json())
+            job = self.service.submit(request)
+        # Invalid JSON, request (pydantic's ValidationError is a ValueError) or output path
+        except ValueError as e:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+        except QueueFullError as e:
+            self._send_error(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+            return
+
+        self._send_json(HTTPStatus.ACCEPTED, job.to_dict())
+
+    # Log requests using the logger instead of stderr
+    def log_message(self, format: str, *args: Any):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    # Raises ValueError if the body is too large or not valid JSON
+    def _read_json(self) -> Any:
+        length = int(self.headers.get("Content-Length", 0))
+        if length < 0 or length > MAX_BODY_SIZE:
+            raise ValueError(f"Request body must be at most {MAX_BODY_SIZE} bytes")
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}") from e
+
+    def _send_json(self, status: HTTPStatus, body: Any):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: HTTPStatus, message: str):
+        self._send_json(status, {"error": message})
@@ -0,0 +1,282 @@
+# pyright: reportUnknownMemberType=false
+
+import csv
+import logging
+import os
+import re
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Optional, Sequence, TextIO
+
+import pandas as pd
+import xlsxwriter
+from xlsxwriter.worksheet import Worksheet
+
+from src.config import OutputFormat
+
+logger = logging.getLogger(__name__)
+
+
+# Receives the scraped table while it is being scraped, so rows can be written incrementally instead of being held in memory
+class RowSink(ABC):
+    columns: list[str] = []
+
+    @abstractmethod
+    def open(self, columns: list[str]) -> None:
+        pass
+
+    @abstractmethod
+    def write(self, rows: list[list[str]]) -> None:
+        pass
+
+    # Finish writing, e.g. when the table is done or the scrape was cancelled
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+    # Stop writing without keeping the rows, e.g. if scraping failed. An existing output file is left unchanged
+    def discard(self) -> None:
+        self.close()
+
+
+# Keeps all rows in memory to build a DataFrame when done
+class DataFrameSink(RowSink):
+    def __init__(self) -> None:
+        self._rows: list[list[str]] = []
+
+    def open(self, columns: list[str]) -> None:
+        self.columns = columns
+
+    def write(self, rows: list[list[str]]) -> None:
+        self._rows.extend(rows)
+
+    # Rows written so far
+    @property
+    def rows(self) -> list[list[str]]:
+        return self._rows
+
+    def close(self) -> None:
+        pass
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(self._rows, columns=self.columns)
+
+
+# Rows are written to a partial file next to the output file, which replaces the output file when closed.
+# The file is only created when the table is opened, so an existing output file is kept if the scrape fails before or while scraping.
+class CsvSink(RowSink):
+    def __init__(self, path: Path) -> None:
+        # Warn if file name ends with .csv (we do not want to risk overwriting a file unintentionally by changing the path suffix from code)
+        if path.suffix != ".csv":
+            logger.warning(f"Saving as csv, but file extension is {path.suffix}")
+        self.path = path
+        self._partial_path = _get_partial_path(path)
+        self._file: Optional[TextIO] = None
+
+    def open(self, columns: list[str]) -> None:
+        self.columns = columns
+        self._file = open(self._partial_path, "w", newline="", encoding="utf-8")
+        # Same line endings as pandas.to_csv
+        self._writer = csv.writer(self._file, lineterminator=os.linesep)
+        self._writer.writerow(columns)
+
+    def write(self, rows: list[list[str]]) -> None:
+        self._writer.writerows(rows)
+        assert self._file is not None
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        os.replace(self._partial_path, self.path)
+
+    def discard(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self._partial_path.unlink(missing_ok=True)
+
+
+# Writes the rows of one table directly to sheets of a workbook as they arrive.
+# Rows are split across multiple sheets if they do not fit in one sheet.
+# sheet_name: Name of the sheets. "{number}" is replaced by the sheet number, otherwise " (number)" is added to the name of extra sheets
+# column_widths: Use these column widths (in characters) instead of measuring the values while writing
+# The workbook is not closed with the sink, see ExcelSink and ExcelWorkbook
+class ExcelSheetSink(RowSink):
+    EXTRA_SPACE = 4
+    MAX_ROWS_PER_SHEET = 1_048_576  # Excel limit, including the header row
+
+    def __init__(
+        self,
+        workbook: xlsxwriter.Workbook,
+        sheet_name: str = "Sheet{number}",
+        column_widths: Optional[list[int]] = None,
+    ) -> None:
+        self._workbook = workbook
+        self._sheet_name = sheet_name
+        self._header_format = workbook.add_format({"bold": True, "border": 1})
+        self._sheets: list[Worksheet] = []
+        self._row_number = 0
+        self._fixed_widths = column_widths
+        # Longest value in each column. Used to fit the column widths when done
+        self._column_lengths: list[int] = []
+
+    def open(self, columns: list[str]) -> None:
+        self.columns = columns
+        self._column_lengths = [len(column) for column in columns]
+        self._add_sheet()
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None:
+        for row in rows:
+            if self._row_number >= self.MAX_ROWS_PER_SHEET:
+                self._add_sheet()
+            self._sheets[-1].write_row(self._row_number, 0, row)
+            self._row_number += 1
+
+        if self._fixed_widths is None and rows:
+            self._update_column_lengths(rows)
+
+    def close(self) -> None:
+        # Auto-adjust all columns to fit their longest value
+        lengths = self._fixed_widths or self._column_lengths
+        for sheet in self._sheets:
+            for i, length in enumerate(lengths):
+                sheet.set_column(i, i, length + self.EXTRA_SPACE)
+
+    def _add_sheet(self):
+        sheet = self._workbook.add_worksheet(
+            self._get_sheet_name(len(self._sheets) + 1)
+        )
+        if self._sheets:
+            logger.info(
+                f"Table exceeds {self.MAX_ROWS_PER_SHEET} rows, continuing in sheet {sheet.name}"
+            )
+        sheet.write_row(0, 0, self.columns, self._header_format)
+        self._sheets.append(sheet)
+        self._row_number = 1
+
+    def _get_sheet_name(self, number: int) -> str:
+        if "{number}" in self._sheet_name:
+            return self._sheet_name.format(number=number)
+        return self._sheet_name if number == 1 else f"{self._sheet_name} ({number})"
+
+    # Measure column by column, which is faster than value by value
+    def _update_column_lengths(self, rows: Sequence[Sequence[Any]]):
+        for i, values in enumerate(zip(*rows)):
+            if i >= len(self._column_lengths):
+                break
+            length = max(map(len, map(str, values)))
+            if length > self._column_lengths[i]:
+                self._column_lengths[i] = length
+
+
+# Writes a single table to an Excel file as the rows arrive.
+# The workbook is written to a partial file next to the output file, which replaces the output file when closed (see CsvSink).
+# constant_memory: Let xlsxwriter flush each row to disk instead of keeping the sheet in memory (produces slightly larger files)
+class ExcelSink(ExcelSheetSink):
+    def __init__(
+        self,
+        path: Path,
+        constant_memory: bool = True,
+        column_widths: Optional[list[int]] = None,
+    ) -> None:
+        self.path = path
+        self._partial_path = _get_partial_path(path)
+        super().__init__(
+            _create_workbook(path, self._partial_path, constant_memory),
+            column_widths=column_widths,
+        )
+
+    def close(self) -> None:
+        super().close()
+        self._workbook.close()
+        os.replace(self._partial_path, self.path)
+
+    def discard(self) -> None:
+        # xlsxwriter keeps the rows in temporary files until the workbook is closed
+        self._workbook.close()
+        self._partial_path.unlink(missing_ok=True)
+
+
+# Writes multiple tables to the same Excel file, each table in its own sheet(s).
+# Rows of the tables may arrive interleaved.
+class ExcelWorkbook:
+    # Not allowed in sheet names
+    INVALID_SHEET_NAME_CHARACTERS = re.compile(r"[\[\]:*?/\\]")
+    MAX_SHEET_NAME_LENGTH = 31
+    # Space reserved for the number of extra sheets, e.g. " (2)"
+    SHEET_NUMBER_LENGTH = 4
+
+    def __init__(self, path: Path, constant_memory: bool = True) -> None:
+        self.path = path
+        self._partial_path = _get_partial_path(path)
+        self._workbook = _create_workbook(path, self._partial_path, constant_memory)
+        self._sheet_names: set[str] = set()
+
+    # Create a sink for a table written to sheets named after the given name
+    def add_table(
+        self, name: str, column_widths: Optional[list[int]] = None
+    ) -> ExcelSheetSink:
+        return ExcelSheetSink(
+            self._workbook, self._unique_sheet_name(name), column_widths
+        )
+
+    # Write the workbook and replace the output file with it
+    def close(self):
+        self._workbook.close()
+        os.replace(self._partial_path, self.path)
+
+    # Leave an existing output file unchanged, e.g. if scraping failed
+    def discard(self):
+        self._workbook.close()
+        self._partial_path.unlink(missing_ok=True)
+
+    def _unique_sheet_name(self, name: str) -> str:
+        max_length = self.MAX_SHEET_NAME_LENGTH - self.SHEET_NUMBER_LENGTH
+        base_name = self.INVALID_SHEET_NAME_CHARACTERS.sub("", name).strip()
+        base_name = base_name[:max_length] or "Table"
+        sheet_name, suffix = base_name, 1
+        while sheet_name.lower() in self._sheet_names:
+            suffix += 1
+            sheet_name = f"{base_name[: max_length - len(str(suffix)) - 1]} {suffix}"
+        self._sheet_names.add(sheet_name.lower())
+        return sheet_name
+
+
+# path: The output file, partial_path: The file the workbook is written to
+def _create_workbook(
+    path: Path, partial_path: Path, constant_memory: bool
+) -> xlsxwriter.Workbook:
+    if path.suffix != ".xlsx":
+        logger.warning(f"Saving as excel, but file extension is {path.suffix}")
+    return xlsxwriter.Workbook(
+        partial_path,
+        {
+            "constant_memory": constant_memory,
+            # Typed values (e.g. after type inference) may contain missing values and dates
+            "nan_inf_to_errors": True,
+            "default_date_format": "yyyy-mm-dd",
+        },
+    )
+
+
+# The file written while the output file is being written, e.g. ./output.csv -> ./output.csv.partial
+def _get_partial_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.partial")
+
+
+# Create a sink that streams rows to a file in the given format
+def create_sink(path: Path, format: OutputFormat) -> RowSink:
+    # Ensure dir exists
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    match format:
+        case OutputFormat.CSV:
+            return CsvSink(path)
+        case OutputFormat.EXCEL:
+            return ExcelSink(path)
+        case _:
+            raise ValueError(f"Rows can not be streamed to {format.value} files")
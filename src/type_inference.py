@@ -0,0 +1,226 @@
+# pyright: reportUnknownMemberType=false
+
+import logging
+import re
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Hashable, Iterable, Optional, cast
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from src.config import Locale
+
+logger = logging.getLogger(__name__)
+
+# Number of non-empty values used to decide the type of a column
+SAMPLE_SIZE = 1000
+# Min share of non-empty rows that must parse for a column to be converted. Values that do not parse become empty and are reported
+MIN_PARSE_RATIO = 0.99
+# Max number of unparsable values included in the report of a column
+MAX_FAILURE_EXAMPLES = 5
+# Values shown by Power BI for missing values
+EMPTY_VALUES = ["", "(Blank)"]
+# Currency symbols and codes removed before parsing numbers
+CURRENCY_PATTERN = r"[$€£¤]|kr\.?|DKK|USD|EUR"
+
+
+# How numbers and dates are formatted in a locale
+# date_formats: Tried in order. The first format that parses the sample is used for the whole column
+@dataclass(frozen=True)
+class LocaleFormat:
+    decimal_separator: str
+    thousands_separator: str
+    date_formats: list[str]
+
+
+LOCALE_FORMATS = {
+    Locale.EN: LocaleFormat(
+        decimal_separator=".",
+        thousands_separator=",",
+        date_formats=[
+            "%m/%d/%Y",
+            "%m/%d/%Y %I:%M:%S %p",
+            "%Y-%m-%d",
+            "%Y-%m-%d %H:%M:%S",
+            "%d %B %Y",
+            "%B %d, %Y",
+        ],
+    ),
+    Locale.DA: LocaleFormat(
+        decimal_separator=",",
+        thousands_separator=".",
+        date_formats=[
+            "%d-%m-%Y",
+            "%d-%m-%Y %H:%M:%S",
+            "%d.%m.%Y",
+            "%d/%m/%Y",
+            "%Y-%m-%d",
+            "%Y-%m-%d %H:%M:%S",
+        ],
+    ),
+}
+
+
+# Result of inferring the type of a column
+# dtype: Type the column was converted to, or None if it was kept as text
+# failures: Number of non-empty values that could not be parsed (these are empty in the converted column).
+#   For a column kept as text, the values that could not be parsed as the type most of its values have (if any)
+@dataclass(frozen=True)
+class ColumnReport:
+    column: str
+    dtype: Optional[str]
+    failures: int = 0
+    failure_examples: tuple[str, ...] = ()
+
+
+# Convert columns of formatted Power BI values (e.g. "1.234,56 kr.", "12%", "(1,234)", "31-01-2023") into typed columns.
+# The type of each column is decided from a sample of its values, after which the whole column is converted at once.
+# Each distinct value is only parsed once, as Power BI tables usually repeat the same values many times.
+def infer_types(
+    df: pd.DataFrame, locale: Locale = Locale.EN
+) -> tuple[pd.DataFrame, list[ColumnReport]]:
+    start = time.perf_counter()
+    locale_format = LOCALE_FORMATS[locale]
+    result = df.copy()
+    reports: list[ColumnReport] = []
+
+    for column in cast(Iterable[Hashable], df.columns):
+        values = cast(pd.Series, df[column])
+        if not pd.api.types.is_string_dtype(values) and values.dtype != object:
+            continue
+        report, converted = _infer_column(str(column), values, locale_format)
+        if converted is not None:
+            result[column] = converted
+        reports.append(report)
+
+    _log_report(reports, time.perf_counter() - start)
+    return result, reports
+
+
+def _infer_column(
+    column: str, values: pd.Series, locale_format: LocaleFormat
+) -> tuple[ColumnReport, Optional[pd.Series]]:
+    # Parse the distinct values and map the results back to the rows
+    codes, uniques = cast(
+        tuple[npt.NDArray[np.intp], Any],
+        pd.factorize(cast(pd.Series, values.fillna("").astype(str).str.strip())),
+    )
+    distinct = pd.Series(uniques, dtype=object)
+    is_empty = cast(npt.NDArray[np.bool_], distinct.isin(EMPTY_VALUES).to_numpy())
+    if is_empty.all():
+        return ColumnReport(column, None), None
+
+    # Rows per distinct value, so the share of parsed values is a share of rows, not of distinct values
+    row_counts = np.bincount(codes, minlength=len(distinct))
+    sample = cast(pd.Series, distinct[~is_empty])
+    if len(sample) > SAMPLE_SIZE:
+        sample = sample.sample(SAMPLE_SIZE, random_state=0)
+    sample_counts = row_counts[sample.index.to_numpy()]
+
+    # Use the first type that parses the sample, or else the type most of the sample parses as for the report
+    parser: Optional[Callable[[pd.Series], pd.Series]] = None
+    parse_ratio = 0.0
+    for candidate in _get_parsers(locale_format):
+        ratio = _parse_ratio(candidate(sample), sample_counts)
+        if ratio > parse_ratio:
+            parser, parse_ratio = candidate, ratio
+        if ratio >= MIN_PARSE_RATIO:
+            break
+    if parser is None:
+        return ColumnReport(column, None), None
+
+    parsed = parser(distinct)
+    is_failure = cast(npt.NDArray[np.bool_], parsed.isna().to_numpy()) & ~is_empty
+    # Count failures per row, not per distinct value
+    failures = int(row_counts[is_failure].sum())
+    non_empty_rows = int(row_counts[~is_empty].sum())
+    failed_values = cast(pd.Series, distinct[is_failure]).head(MAX_FAILURE_EXAMPLES)
+    examples = tuple(str(value) for value in cast(list[Any], failed_values.tolist()))
+    if parse_ratio < MIN_PARSE_RATIO or failures > non_empty_rows * (
+        1 - MIN_PARSE_RATIO
+    ):
+        return ColumnReport(column, None, failures, examples), None
+
+    converted = pd.Series(
+        parsed.to_numpy()[codes], index=values.index, name=values.name
+    )
+    dtype = cast(np.dtype[Any], converted.dtype)
+    return ColumnReport(column, str(dtype), failures, examples), converted
+
+
+# Parsers of the supported types, tried in order: numbers, then the date formats of the locale
+def _get_parsers(
+    locale_format: LocaleFormat,
+) -> list[Callable[[pd.Series], pd.Series]]:
+    return [partial(_parse_numbers, locale_format=locale_format)] + [
+        partial(_parse_dates, date_format=date_format)
+        for date_format in locale_format.date_formats
+    ]
+
+
+# Share of the rows that parsed, given the number of rows of each parsed value
+def _parse_ratio(parsed: pd.Series, row_counts: npt.NDArray[np.intp]) -> float:
+    total = int(row_counts.sum())
+    if not total:
+        return 0.0
+    return float(row_counts[parsed.notna().to_numpy()].sum()) / total
+
+
+# Parse numbers using vectorized string operations. Handles thousands separators, currencies,
+# percentages ("12%" is 0.12) and accounting negatives ("(1,234)" is -1234)
+def _parse_numbers(values: pd.Series, locale_format: LocaleFormat) -> pd.Series:
+    text = cast(pd.Series, values.astype(str).str.strip())
+    is_percentage = cast(pd.Series, text.str.endswith("%"))
+    is_negative = cast(pd.Series, text.str.startswith("(") & text.str.endswith(")"))
+    cleaned = cast(
+        pd.Series,
+        text.str.replace(CURRENCY_PATTERN, "", regex=True)
+        .str.replace(r"\s", "", regex=True)
+        .str.rstrip("%")
+        .str.strip("()"),
+    )
+    # Only accept correctly grouped numbers, so e.g. the date "31.01.2023" is not read as 31012023
+    cleaned = cleaned.where(
+        cast(pd.Series, cleaned.str.fullmatch(_number_pattern(locale_format)))
+    )
+    cleaned = cast(
+        pd.Series,
+        cleaned.str.replace(
+            locale_format.thousands_separator, "", regex=False
+        ).str.replace(locale_format.decimal_separator, ".", regex=False),
+    )
+    numbers = cast(pd.Series, pd.to_numeric(cleaned, errors="coerce")).astype(float)
+    numbers = numbers.where(~is_negative, -numbers)
+    return numbers.where(~is_percentage, numbers / 100)
+
+
+def _number_pattern(locale_format: LocaleFormat) -> str:
+    thousands = re.escape(locale_format.thousands_separator)
+    decimal = re.escape(locale_format.decimal_separator)
+    return rf"[-+]?(\d{{1,3}}({thousands}\d{{3}})+|\d+)({decimal}\d+)?"
+
+
+# Values that do not match the format become NaT
+def _parse_dates(values: pd.Series, date_format: str) -> pd.Series:
+    return pd.to_datetime(values, format=date_format, errors="coerce")
+
+
+def _log_report(reports: list[ColumnReport], duration: float):
+    converted = sum(1 for report in reports if report.dtype)
+    logger.info(
+        f"Inferred column types in {duration:.2f}s ({converted} of {len(reports)} text columns converted)"
+    )
+    for report in reports:
+        if report.dtype and report.failures:
+            logger.warning(
+                f"Column '{report.column}' converted to {report.dtype}, but {report.failures} values could not be parsed and were left empty, e.g. {list(report.failure_examples)}"
+            )
+        elif report.dtype:
+            logger.debug(f"Column '{report.column}' converted to {report.dtype}")
+        elif report.failures:
+            logger.info(
+                f"Column '{report.column}' kept as text, {report.failures} values could not be parsed, e.g. {list(report.failure_examples)}"
+            )
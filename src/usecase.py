@@ -1,26 +1,723 @@
+import json
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Generator, Optional, TypeVar
 
 import pandas as pd
+from selenium.webdriver.chrome.webdriver import WebDriver
 
-from src.config import OutputFormat
-from src.save import save_table
+from src import metrics
+from src.cache import FingerprintCache, NamedTable, PageCache
+from src.cancellation import CancellationToken, ScrapeCancelledError
+from src.checkpoint import Checkpoint
+from src.config import OutputFormat, SweepOutput, check_output_format
+from src.fingerprint import (
+    FingerprintProbe,
+    TableFingerprint,
+    count_changed_blocks,
+    diff_tables,
+    fingerprint_table,
+    is_same_table,
+)
+from src.progress import ProgressListener
+from src.save import SaveOptions, get_table_path, is_streamable, save_table, save_tables
 from src.scraper.driver import CustomDriver
-from src.scraper.powerbi_scraper import PowerBiScraper, ScraperOptions
+from src.scraper.driver_pool import DriverPool
+from src.scraper.powerbi_scraper import PowerBiScraper, ScraperException, ScraperOptions
+from src.sink import DataFrameSink, ExcelWorkbook, RowSink, create_sink
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
 
+# Seconds a cancelled scrape may take to stop at its next step before its browser window is closed to interrupt the pending driver call
+CANCEL_GRACE_PERIOD = 5
+
+
+# Scrape the table once per filter value (see PowerBiScraper.scrape_sweep)
+# values: Filter values to scrape, or None for all values of the slicer
+# column_name: Name of the column added to the combined table, holding the filter value of each row
+# sessions: Number of browser sessions the values are split across
+@dataclass(frozen=True)
+class SweepOptions:
+    values: Optional[tuple[str, ...]] = None
+    column_name: str = "Filter value"
+    output: SweepOutput = SweepOutput.COMBINED
+    sessions: int = 1
+
+
+# Skip saving a table that has not changed since the last scrape of the report with the same filter (see FingerprintCache)
+# The table is not streamed to the file, but kept in memory until the scrape is done, as it is only saved if it has changed (and a copy is kept in the cache)
+# probe_rows: Stop scraping as soon as this many rows match the first rows of the last scrape and the table has as many rows as in the last scrape (0 to always scrape the full table)
+# write_diff: Save only the rows added and removed since the last scrape, marked in change_column
+@dataclass(frozen=True)
+class IncrementalOptions:
+    probe_rows: int = 100
+    write_diff: bool = False
+    change_column: str = "Change"
+
+
+@dataclass(frozen=True)
+class ScrapeJob:
+    options: ScraperOptions
+    save_path: Path
+    save_format: OutputFormat
+
+
+# table: Only set if requested, as the table is otherwise streamed to the file without being kept in memory
+# is_unchanged: The table had not changed since the last scrape (see IncrementalOptions)
+# is_cancelled: The scrape was cancelled, and only the rows scraped until then were saved
+@dataclass(frozen=True)
+class ScrapeResult:
+    path: Path
+    rows: int
+    columns: int
+    table: Optional[pd.DataFrame] = None
+    is_unchanged: bool = False
+    is_cancelled: bool = False
+
+
+@dataclass(frozen=True)
+class JobResult:
+    job: ScrapeJob
+    is_success: bool
+    attempts: int
+    duration: float  # seconds
+    rows: int = 0
+    error: Optional[str] = None
+
+
+# Scrape the table and write its rows to the file while scraping.
+# If keep_table is true, the table is instead built in memory and saved when done, and returned in the result.
+# This is also the case for formats that can not be streamed (e.g. parquet) and when inferring column types.
+# checkpoint_interval: Save scraped rows to a checkpoint file next to the output file every X seconds (single table only, checkpoints are not used with sweep, all tables or all pages)
+# resume: Continue from the checkpoint file of a previous failed scrape (if any)
+# cache_dir: Directory of the local cache (see PageCache), or None to disable the cache
+# sweep: Scrape the table once per filter value instead of once (see _sweep_and_save)
+# incremental: Skip saving the table if it has not changed since the last run (requires cache_dir). Not supported with sweep, all tables or all pages
+# on_progress: Called with the progress of the table being scraped (of each table when scraping multiple tables, see ProgressEvent.table)
+# cancel_token: Stops the scrape and saves the rows scraped so far. The checkpoint is kept, so the scrape can be resumed.
+# Raises ScrapeCancelledError if cancelled before any rows were scraped
 def scrape_and_save(
     options: ScraperOptions,
     save_path: Path,
     save_format: OutputFormat,
     max_rows: Optional[int] = None,
-) -> pd.DataFrame:
-    scraper = PowerBiScraper(options, CustomDriver(options))
-    table = scraper.scrape(max_rows=max_rows)
-    scraper.close()  # XXX: Choose to browser keep open? E.g. when debugging
-    save_path = save_table(table, save_path, save_format)
-    logger.info(f"Table saved to {save_path.absolute()}")
-    return table
+    timeout: Optional[float] = None,
+    driver_pool: Optional[DriverPool] = None,
+    keep_table: bool = False,
+    checkpoint_interval: Optional[float] = None,
+    resume: bool = False,
+    save_options: Optional[SaveOptions] = None,
+    cache_dir: Optional[Path] = None,
+    sweep: Optional[SweepOptions] = None,
+    incremental: Optional[IncrementalOptions] = None,
+    on_progress: Optional[ProgressListener] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> ScrapeResult:
+    # Fail before scraping if the table can not be saved
+    check_output_format(save_format)
+    save_options = save_options or SaveOptions()
+    if incremental and (
+        sweep or options.should_scrape_all_pages or options.should_scrape_all_tables
+    ):
+        raise ValueError(
+            "incremental can not be combined with scrape_all_tables, scrape_all_pages or sweep"
+        )
+    if sweep:
+        return _sweep_and_save(
+            options,
+            save_path,
+            save_format,
+            max_rows,
+            timeout,
+            driver_pool,
+            save_options,
+            sweep,
+            on_progress,
+            cancel_token,
+        )
+    if options.should_scrape_all_pages:
+        return _scrape_pages_and_save(
+            options,
+            save_path,
+            save_format,
+            max_rows,
+            timeout,
+            driver_pool,
+            save_options,
+            cache_dir,
+            on_progress,
+            cancel_token,
+        )
+    if options.should_scrape_all_tables:
+        return _scrape_all_tables_and_save(
+            options,
+            save_path,
+            save_format,
+            max_rows,
+            timeout,
+            driver_pool,
+            save_options,
+            on_progress,
+            cancel_token,
+        )
+
+    start = time.perf_counter()
+    checkpoint = (
+        Checkpoint.for_output(save_path, checkpoint_interval)
+        if checkpoint_interval
+        else None
+    )
+    resume_from = checkpoint.load() if checkpoint and resume else None
+    # A limited scrape must not be cached as the complete table
+    fingerprint_cache = (
+        FingerprintCache(cache_dir)
+        if incremental and cache_dir and not max_rows
+        else None
+    )
+    if fingerprint_cache:
+        # The table must be complete before it is known whether to save it, and it is copied to the cache
+        logger.info(
+            "Incremental: the table is kept in memory until the scrape is done instead of being written to the file while scraping"
+        )
+    filter_state = _get_filter_state(options)
+    previous = (
+        fingerprint_cache.get(options.url, filter_state) if fingerprint_cache else None
+    )
+    # The full table is needed if it is returned
+    probe = FingerprintProbe(
+        previous if incremental and incremental.probe_rows and not keep_table else None
+    )
+    sink = (
+        DataFrameSink()
+        if keep_table
+        or fingerprint_cache
+        or not is_streamable(save_format, save_options)
+        else create_sink(save_path, save_format)
+    )
+
+    def stop_early(total_rows: Optional[int]) -> bool:
+        return isinstance(sink, DataFrameSink) and probe.check(
+            sink.columns, sink.rows, total_rows
+        )
+
+    with _open_driver(options, driver_pool) as driver:
+        scraper = PowerBiScraper(options, driver, on_progress, cancel_token)
+        rows = _run_scrape(
+            scraper,
+            timeout,
+            cancel_token,
+            lambda: scraper.scrape_to(
+                sink, max_rows, checkpoint, resume_from, stop_early
+            ),
+        )
+    is_cancelled = _is_cancelled(cancel_token)
+
+    table = None
+    is_unchanged = False
+    if isinstance(sink, DataFrameSink):
+        table = sink.to_dataframe()
+        # A cancelled scrape must not be compared to or cached as the complete table
+        if fingerprint_cache and not is_cancelled:
+            assert incremental is not None
+            is_unchanged = _save_incremental(
+                table,
+                probe.is_match,
+                previous,
+                fingerprint_cache,
+                options.url,
+                filter_state,
+                save_path,
+                save_format,
+                save_options,
+                incremental,
+            )
+            if probe.is_match and previous:
+                rows = previous.row_count
+        else:
+            save_path = save_table(table, save_path, save_format, save_options)
+        if not keep_table:
+            table = None
+
+    if is_cancelled:
+        logger.warning(
+            f"Scrape cancelled, {rows} rows saved to {save_path.absolute()}"
+            + (". The checkpoint is kept to resume the scrape" if checkpoint else "")
+        )
+    # Table is complete, checkpoint no longer needed
+    elif checkpoint:
+        checkpoint.delete()
+
+    if not fingerprint_cache and not is_cancelled:
+        logger.info(f"Table saved to {save_path.absolute()}")
+    logger.info(f"Scrape and save took {time.perf_counter() - start:.2f}s")
+    return ScrapeResult(
+        save_path, rows, len(sink.columns), table, is_unchanged, is_cancelled
+    )
+
+
+# Identifies the filter applied before scraping, as the same report shows a different table for each filter
+def _get_filter_state(options: ScraperOptions) -> str:
+    return json.dumps(
+        {
+            "filter_values": sorted(options.filter_values)
+            if options.filter_values is not None
+            else None,
+            "should_uncheck_filter": options.should_uncheck_filter,
+            "engine": options.engine.value,
+        }
+    )
+
+
+# Save the table unless it has not changed since the last scrape, and remember it for the next scrape.
+# With write_diff, only the rows added and removed since the last scrape are saved (an empty table if unchanged).
+# is_probe_match: The first rows and the row count matched the last scrape, so the scrape was stopped and the table only has the first rows
+# Returns whether the table is unchanged
+def _save_incremental(
+    table: pd.DataFrame,
+    is_probe_match: bool,
+    previous: Optional[TableFingerprint],
+    cache: FingerprintCache,
+    url: str,
+    filter_state: str,
+    save_path: Path,
+    save_format: OutputFormat,
+    save_options: SaveOptions,
+    incremental: IncrementalOptions,
+) -> bool:
+    if is_probe_match and previous:
+        logger.info(
+            f"First {previous.probe_rows} rows and the row count have not changed since the last scrape, assuming the table is unchanged"
+        )
+        fingerprint = previous
+        is_unchanged = True
+    else:
+        fingerprint = fingerprint_table(table, incremental.probe_rows)
+        is_unchanged = previous is not None and is_same_table(previous, fingerprint)
+        if previous and not is_unchanged and previous.columns == fingerprint.columns:
+            logger.info(
+                f"{count_changed_blocks(previous, fingerprint)} of {len(fingerprint.block_hashes)} row blocks changed since the last scrape"
+            )
+
+    if incremental.write_diff:
+        if is_unchanged:
+            diff = pd.DataFrame(
+                columns=[incremental.change_column, *fingerprint.columns]
+            )
+        else:
+            old = (
+                cache.load_table(url, filter_state)
+                if previous and previous.columns == fingerprint.columns
+                else None
+            )
+            if previous and old is None:
+                logger.warning(
+                    "Table can not be compared with the last scrape, saving all rows as added"
+                )
+            diff = diff_tables(
+                old if old is not None else table.head(0),
+                table,
+                incremental.change_column,
+            )
+        save_path = save_table(diff, save_path, save_format, save_options)
+        logger.info(f"Changes saved to {save_path.absolute()}")
+    elif not is_unchanged:
+        save_path = save_table(table, save_path, save_format, save_options)
+        logger.info(f"Table saved to {save_path.absolute()}")
+    elif save_path.exists():
+        logger.info(
+            f"Table has not changed since the last scrape, keeping {save_path.absolute()}"
+        )
+    else:
+        # The output of the last scrape is missing, restore it from the cache as the scraped table may be incomplete
+        cached_table = cache.load_table(url, filter_state)
+        if cached_table is None:
+            raise ScraperException(
+                "Table is unchanged, but the cached table could not be read"
+            )
+        save_path = save_table(cached_table, save_path, save_format, save_options)
+        logger.info(f"Table restored from the cache to {save_path.absolute()}")
+
+    if not is_unchanged:
+        cache.put(url, filter_state, fingerprint, table)
+    return is_unchanged
+
+
+# Scrape all tables on the page. Excel files get a sheet per table, other formats a file per table (see save_tables).
+# Checkpoints are not used, as the tables are scraped at the same time.
+def _scrape_all_tables_and_save(
+    options: ScraperOptions,
+    save_path: Path,
+    save_format: OutputFormat,
+    max_rows: Optional[int],
+    timeout: Optional[float],
+    driver_pool: Optional[DriverPool],
+    save_options: SaveOptions,
+    on_progress: Optional[ProgressListener],
+    cancel_token: Optional[CancellationToken],
+) -> ScrapeResult:
+    start = time.perf_counter()
+    is_streamed = is_streamable(save_format, save_options)
+    workbook = (
+        ExcelWorkbook(save_path)
+        if is_streamed and save_format == OutputFormat.EXCEL
+        else None
+    )
+    if workbook:
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+    # Tables that are saved when done
+    table_sinks: list[tuple[str, DataFrameSink]] = []
+
+    def create_table_sink(index: int, title: str) -> RowSink:
+        if workbook:
+            return workbook.add_table(title)
+        if is_streamed:
+            return create_sink(get_table_path(save_path, index, title), save_format)
+        sink = DataFrameSink()
+        table_sinks.append((title, sink))
+        return sink
+
+    try:
+        with _open_driver(options, driver_pool) as driver:
+            scraper = PowerBiScraper(options, driver, on_progress, cancel_token)
+            tables = _run_scrape(
+                scraper,
+                timeout,
+                cancel_token,
+                lambda: scraper.scrape_all_to(create_table_sink, max_rows),
+            )
+    # Keep an existing output file
+    except BaseException:
+        if workbook:
+            workbook.discard()
+        raise
+    if workbook:
+        workbook.close()
+
+    if table_sinks:
+        save_tables(
+            [(title, sink.to_dataframe()) for title, sink in table_sinks],
+            save_path,
+            save_format,
+            save_options,
+        )
+
+    logger.info(f"{len(tables)} tables saved to {save_path.parent.absolute()}")
+    logger.info(f"Scrape and save took {time.perf_counter() - start:.2f}s")
+    return ScrapeResult(
+        save_path,
+        sum(table.rows for table in tables),
+        sum(len(table.columns) for table in tables),
+        is_cancelled=_is_cancelled(cancel_token),
+    )
+
+
+# Scrape all tables on all pages of the report and save them like _scrape_all_tables_and_save, naming each table after its page.
+# cache_dir: Pages that have not changed since the last run are read from the page cache in this directory instead of being scraped
+def _scrape_pages_and_save(
+    options: ScraperOptions,
+    save_path: Path,
+    save_format: OutputFormat,
+    max_rows: Optional[int],
+    timeout: Optional[float],
+    driver_pool: Optional[DriverPool],
+    save_options: SaveOptions,
+    cache_dir: Optional[Path],
+    on_progress: Optional[ProgressListener],
+    cancel_token: Optional[CancellationToken],
+) -> ScrapeResult:
+    start = time.perf_counter()
+    # A limited scrape must not be cached as the complete page
+    page_cache = PageCache(cache_dir) if cache_dir and not max_rows else None
+
+    with _open_driver(options, driver_pool) as driver:
+        scraper = PowerBiScraper(options, driver, on_progress, cancel_token)
+        pages = _run_scrape(
+            scraper,
+            timeout,
+            cancel_token,
+            lambda: scraper.scrape_pages(max_rows, page_cache),
+        )
+
+    tables = [
+        (f"{page.name} - {title}", df) for page in pages for title, df in page.tables
+    ]
+    save_tables(tables, save_path, save_format, save_options)
+
+    cached_pages = sum(1 for page in pages if page.is_cached)
+    logger.info(
+        f"{len(tables)} tables from {len(pages)} pages ({cached_pages} unchanged) saved to {save_path.parent.absolute()}"
+    )
+    logger.info(f"Scrape and save took {time.perf_counter() - start:.2f}s")
+    return ScrapeResult(
+        save_path,
+        sum(len(df) for _, df in tables),
+        sum(len(df.columns) for _, df in tables),
+        is_cancelled=_is_cancelled(cancel_token),
+    )
+
+
+# Scrape the table once per filter value and save the tables combined into one table with a filter value column,
+# or partitioned into a table per value (saved like _scrape_all_tables_and_save).
+# The values are split into consecutive chunks scraped concurrently, each chunk in its own browser session with a single page load.
+def _sweep_and_save(
+    options: ScraperOptions,
+    save_path: Path,
+    save_format: OutputFormat,
+    max_rows: Optional[int],
+    timeout: Optional[float],
+    driver_pool: Optional[DriverPool],
+    save_options: SaveOptions,
+    sweep: SweepOptions,
+    on_progress: Optional[ProgressListener],
+    cancel_token: Optional[CancellationToken],
+) -> ScrapeResult:
+    start = time.perf_counter()
+    values = list(sweep.values) if sweep.values is not None else None
+    # The values must be known up front to split them across sessions
+    if values is None and sweep.sessions > 1:
+        with _open_driver(options, driver_pool) as driver:
+            scraper = PowerBiScraper(options, driver, on_progress, cancel_token)
+            values = _run_scrape(
+                scraper, timeout, cancel_token, scraper.list_filter_values
+            )
+
+    chunks = _split_chunks(values, sweep.sessions) if values is not None else [None]
+
+    def scrape_chunk(chunk: Optional[list[str]]) -> list[NamedTable]:
+        with _open_driver(options, driver_pool) as driver:
+            scraper = PowerBiScraper(options, driver, on_progress, cancel_token)
+            try:
+                return _run_scrape(
+                    scraper,
+                    timeout,
+                    cancel_token,
+                    lambda: scraper.scrape_sweep(chunk, max_rows),
+                )
+            # Keep the tables of the other sessions
+            except ScrapeCancelledError:
+                return []
+
+    with ThreadPoolExecutor(max_workers=max(1, len(chunks))) as executor:
+        tables = [
+            table
+            for result in executor.map(metrics.bind(scrape_chunk), chunks)
+            for table in result
+        ]
+    if not tables and _is_cancelled(cancel_token):
+        raise ScrapeCancelledError("Sweep was cancelled before any value was scraped")
+    if not tables:
+        raise ScraperException("No filter values to scrape")
+
+    if sweep.output == SweepOutput.PARTITIONED:
+        save_tables(tables, save_path, save_format, save_options)
+        logger.info(f"{len(tables)} tables saved to {save_path.parent.absolute()}")
+        rows = sum(len(df) for _, df in tables)
+        columns = sum(len(df.columns) for _, df in tables)
+    else:
+        for value, df in tables:
+            df.insert(0, sweep.column_name, value)  # type: ignore
+        table = pd.concat([df for _, df in tables], ignore_index=True)
+        save_path = save_table(table, save_path, save_format, save_options)
+        logger.info(f"Table saved to {save_path.absolute()}")
+        rows, columns = table.shape
+
+    logger.info(
+        f"Sweep of {len(tables)} filter values took {time.perf_counter() - start:.2f}s"
+    )
+    return ScrapeResult(
+        save_path, rows, columns, is_cancelled=_is_cancelled(cancel_token)
+    )
+
+
+# Split the values into at most n consecutive chunks of (almost) equal size
+def _split_chunks(values: list[str], n: int) -> list[list[str]]:
+    size, remainder = divmod(len(values), n)
+    chunks: list[list[str]] = []
+    start = 0
+    for i in range(n):
+        end = start + size + (1 if i < remainder else 0)
+        if end > start:
+            chunks.append(values[start:end])
+        start = end
+    return chunks
+
+
+# Use a driver from the pool if given, otherwise start a new driver that is closed when done
+@contextmanager
+def _open_driver(
+    options: ScraperOptions, driver_pool: Optional[DriverPool]
+) -> Generator[WebDriver, None, None]:
+    if driver_pool:
+        with driver_pool.acquire(options) as driver:
+            yield driver
+        return
+
+    driver = CustomDriver(options)
+    try:
+        yield driver
+    finally:
+        driver.quit()  # XXX: Choose to browser keep open? E.g. when debugging
+
+
+# Abort the scrape if it exceeds the timeout, and if it has not stopped CANCEL_GRACE_PERIOD seconds after being cancelled.
+# Closing the browser window makes the pending driver call fail.
+def _run_scrape(
+    scraper: PowerBiScraper,
+    timeout: Optional[float],
+    cancel_token: Optional[CancellationToken],
+    scrape: Callable[[], T],
+) -> T:
+    timed_out = threading.Event()
+    is_done = threading.Event()
+    # The timers only close the browser while the scrape is running, as the driver may be back in the pool and used by another scrape when done.
+    # is_done is set under the same lock, so a scrape finishing as a timer fires is either closed before it is done or not at all
+    lock = threading.Lock()
+
+    def on_timeout():
+        with lock:
+            if is_done.is_set():
+                return
+            logger.warning(f"Scrape timed out after {timeout} seconds")
+            timed_out.set()
+            scraper.close()
+
+    def on_cancel_grace_period_passed():
+        with lock:
+            if is_done.is_set():
+                return
+            logger.warning(
+                f"Scrape did not stop within {CANCEL_GRACE_PERIOD} seconds after being cancelled, closing the browser window"
+            )
+            scraper.close()
+
+    timer = threading.Timer(timeout, on_timeout) if timeout else None
+    if timer:
+        timer.start()
+    cancel_timer = threading.Timer(CANCEL_GRACE_PERIOD, on_cancel_grace_period_passed)
+    remove_cancel_callback = (
+        cancel_token.on_cancel(cancel_timer.start) if cancel_token else None
+    )
+
+    try:
+        return scrape()
+    except ScraperException as e:
+        if timed_out.is_set():
+            raise ScraperException(f"Scrape timed out after {timeout} seconds") from e
+        if _is_cancelled(cancel_token):
+            raise ScrapeCancelledError("Scrape was cancelled") from e
+        raise
+    finally:
+        with lock:
+            is_done.set()
+        if timer:
+            timer.cancel()
+        if remove_cancel_callback:
+            remove_cancel_callback()
+        cancel_timer.cancel()
+
+
+def _is_cancelled(cancel_token: Optional[CancellationToken]) -> bool:
+    return cancel_token is not None and cancel_token.is_cancelled
+
+
+# Scrape and save multiple reports concurrently using a bounded pool of drivers
+# cancel_token: Cancels the running jobs (see scrape_and_save) and skips the jobs not started yet
+def scrape_and_save_batch(
+    jobs: list[ScrapeJob],
+    pool_size: int,
+    job_timeout: Optional[float] = None,
+    max_retries: int = 0,
+    max_rows: Optional[int] = None,
+    driver_pool: Optional[DriverPool] = None,
+    checkpoint_interval: Optional[float] = None,
+    resume: bool = False,
+    save_options: Optional[SaveOptions] = None,
+    cache_dir: Optional[Path] = None,
+    sweep: Optional[SweepOptions] = None,
+    incremental: Optional[IncrementalOptions] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> list[JobResult]:
+    logger.info(f"Scraping {len(jobs)} reports using {pool_size} concurrent drivers")
+
+    def run_job(job: ScrapeJob) -> JobResult:
+        start = time.perf_counter()
+        error = None
+        attempt = 0
+
+        while attempt <= max_retries:
+            if _is_cancelled(cancel_token):
+                error = "Cancelled"
+                break
+            attempt += 1
+            try:
+                result = scrape_and_save(
+                    job.options,
+                    job.save_path,
+                    job.save_format,
+                    max_rows=max_rows,
+                    timeout=job_timeout,
+                    driver_pool=driver_pool,
+                    checkpoint_interval=checkpoint_interval,
+                    # Retries continue from the checkpoint of the failed attempt
+                    resume=resume or attempt > 1,
+                    save_options=save_options,
+                    cache_dir=cache_dir,
+                    sweep=sweep,
+                    incremental=incremental,
+                    cancel_token=cancel_token,
+                )
+                return JobResult(
+                    job,
+                    is_success=not result.is_cancelled,
+                    attempts=attempt,
+                    duration=time.perf_counter() - start,
+                    rows=result.rows,
+                    error="Cancelled" if result.is_cancelled else None,
+                )
+            except ScrapeCancelledError:
+                error = "Cancelled"
+                break
+            # Retry on scrape errors as these may be caused by a temporary issue with the page
+            except ScraperException as e:
+                error = str(e)
+                logger.warning(
+                    f"Attempt {attempt} of {max_retries + 1} failed for {job.options.url}: {error}"
+                )
+            # Other errors (e.g. driver could not start, file could not be saved) are not likely to be resolved by retrying
+            except Exception as e:
+                logger.exception(f"Job failed for {job.options.url}: {e}")
+                error = str(e)
+                break
+
+        return JobResult(
+            job,
+            is_success=False,
+            attempts=attempt,
+            duration=time.perf_counter() - start,
+            error=error,
+        )
+
+    with ThreadPoolExecutor(max_workers=pool_size) as executor:
+        results = list(executor.map(metrics.bind(run_job), jobs))
+
+    _log_batch_summary(results)
+    return results
+
+
+def _log_batch_summary(results: list[JobResult]):
+    succeeded = sum(1 for result in results if result.is_success)
+    logger.info(
+        f"Batch complete: {succeeded} of {len(results)} jobs succeeded, {len(results) - succeeded} failed"
+    )
+    for result in results:
+        status = "OK" if result.is_success else f"FAILED ({result.error})"
+        logger.info(
+            f"{status}: {result.job.options.url} -> {result.job.save_path} [rows: {result.rows}, attempts: {result.attempts}, duration: {result.duration:.1f}s]"
+        )
@@ -24,6 +24,11 @@ def get_config_path_from_args():
     return config_file_path
 
 
+def get_resume_from_args() -> bool:
+    args = get_args()
+    return bool(args["resume"])
+
+
 def get_args():
     ap = argparse.ArgumentParser()
     ap.add_argument(
@@ -33,6 +38,11 @@ def get_args():
         help="Path of yaml config file",
         default="./config.yml",  # Assume in root directory
     )
+    ap.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue from the checkpoint of a previous failed scrape (console mode)",
+    )
     args = vars(ap.parse_args())
     return args
 
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+from src.checkpoint import Checkpoint
+
+COLUMNS = ["Region", "Amount"]
+
+
+def test_resume_keeps_rows_up_to_the_first_missing_row(tmp_path: Path):
+    checkpoint = Checkpoint.for_output(tmp_path / "table.csv", interval=0)
+    checkpoint.start(COLUMNS)
+    # Row 3 was not scraped (e.g. the scrape failed while it was rendered)
+    checkpoint.record([(0, ["North", "1"]), (1, ["South", "2"])])
+    checkpoint.record([(2, ["East", "3"]), (4, ["West", "5"])])
+    checkpoint.close()
+
+    data = Checkpoint.for_output(tmp_path / "table.csv").load()
+
+    assert data is not None
+    assert data.columns == COLUMNS
+    assert [index for index, _ in data.rows] == [0, 1, 2]
+    assert data.rows[2] == (2, ["East", "3"])
+    assert data.last_row_index == 2
+
+
+def test_rows_are_written_when_the_interval_has_passed_or_when_closed(
+    tmp_path: Path,
+):
+    checkpoint = Checkpoint(tmp_path / "table.checkpoint", interval=3600)
+    checkpoint.start(COLUMNS, [(0, ["North", "1"])])
+    checkpoint.record([(1, ["South", "2"])])
+
+    pending = Checkpoint(checkpoint.path).load()
+    assert pending is not None and len(pending.rows) == 1
+
+    checkpoint.close()
+    closed = Checkpoint(checkpoint.path).load()
+    assert closed is not None and len(closed.rows) == 2
+
+
+def test_incomplete_last_line_is_ignored(tmp_path: Path):
+    path = tmp_path / "table.checkpoint"
+    path.write_text(
+        '["Region", "Amount"]\n[0, ["North", "1"]]\n[1, ["Sou', encoding="utf-8"
+    )
+
+    data = Checkpoint(path).load()
+
+    assert data is not None
+    assert data.rows == [(0, ["North", "1"])]
+
+
+def test_missing_and_deleted_checkpoint(tmp_path: Path):
+    checkpoint = Checkpoint.for_output(tmp_path / "table.csv")
+    assert checkpoint.load() is None
+
+    checkpoint.start(COLUMNS, [(0, ["North", "1"])])
+    checkpoint.delete()
+
+    assert not checkpoint.path.exists()
+    assert checkpoint.load() is None
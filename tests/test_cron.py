@@ -0,0 +1,106 @@
+from datetime import datetime
+
+import pytest
+
+from src.cron import CronExpression
+
+
+def next_runs(expression: str, after: datetime, count: int) -> list[datetime]:
+    cron = CronExpression.parse(expression)
+    runs: list[datetime] = []
+    for _ in range(count):
+        run = cron.next_after(after)
+        assert run is not None
+        runs.append(run)
+        after = run
+    return runs
+
+
+def test_next_after_is_strictly_after_the_given_time():
+    cron = CronExpression.parse("*/15 * * * *")
+
+    assert cron.next_after(datetime(2024, 5, 1, 10, 7, 30)) == datetime(
+        2024, 5, 1, 10, 15
+    )
+    assert cron.next_after(datetime(2024, 5, 1, 10, 15)) == datetime(2024, 5, 1, 10, 30)
+
+
+def test_weekday_range_skips_the_weekend():
+    # Friday 3 May 2024 after the run
+    runs = next_runs("0 6 * * mon-fri", datetime(2024, 5, 3, 7, 0), 2)
+
+    assert runs == [datetime(2024, 5, 6, 6, 0), datetime(2024, 5, 7, 6, 0)]
+
+
+def test_day_of_month_or_day_of_week_when_both_are_restricted():
+    # Fridays (3, 10, 17) and the 13th (a Monday in May 2024)
+    runs = next_runs("0 0 13 * fri", datetime(2024, 5, 1), 4)
+
+    assert [run.day for run in runs] == [3, 10, 13, 17]
+
+
+def test_day_of_month_and_day_of_week_step_from_star_is_not_restricted():
+    # "*/2" in day of month counts as unrestricted, so both fields must match:
+    # odd days that are Mondays
+    runs = next_runs("0 0 */2 * mon", datetime(2024, 5, 1), 3)
+
+    assert runs == [
+        datetime(2024, 5, 13),
+        datetime(2024, 5, 27),
+        datetime(2024, 6, 3),
+    ]
+
+
+def test_steps_of_ranges_and_single_values():
+    cron = CronExpression.parse("5/20 9-17/4 * * *")
+
+    assert cron.minutes == frozenset({5, 25, 45})
+    assert cron.hours == frozenset({9, 13, 17})
+
+
+def test_day_missing_in_month_skips_to_the_next_month_with_it():
+    runs = next_runs("30 12 31 * *", datetime(2024, 4, 1), 3)
+
+    assert runs == [
+        datetime(2024, 5, 31, 12, 30),
+        datetime(2024, 7, 31, 12, 30),
+        datetime(2024, 8, 31, 12, 30),
+    ]
+
+
+def test_next_after_crosses_month_and_year_ends():
+    cron = CronExpression.parse("@monthly")
+
+    assert cron.next_after(datetime(2024, 1, 31, 23, 59)) == datetime(2024, 2, 1)
+    assert cron.next_after(datetime(2024, 12, 31, 23, 59)) == datetime(2025, 1, 1)
+
+
+def test_leap_day_is_found_years_ahead():
+    cron = CronExpression.parse("0 0 29 2 *")
+
+    assert cron.next_after(datetime(2024, 3, 1)) == datetime(2028, 2, 29)
+
+
+def test_names_and_sunday_as_7():
+    assert (
+        CronExpression.parse("0 0 * jan,jul 7").weekdays
+        == CronExpression.parse("0 0 * 1,7 sun").weekdays
+        == frozenset({0})
+    )
+    assert CronExpression.parse("0 0 * jan,jul 7").months == frozenset({1, 7})
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "* * * *",  # 4 fields
+        "60 * * * *",  # Out of range
+        "*/0 * * * *",  # Step 0
+        "5-1 * * * *",  # Reversed range
+        "0 0 * * funday",
+        "0 0 31 2 *",  # Never matches
+    ],
+)
+def test_invalid_expressions_are_rejected(expression: str):
+    with pytest.raises(ValueError):
+        CronExpression.parse(expression)
@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from src.scraper.dsr import DsrDecodeError, decode_query_result
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def load_fixture(name: str):
+    return json.loads((FIXTURES / name).read_text(encoding="utf-8"))
+
+
+def test_decode_recorded_response():
+    page = decode_query_result(load_fixture("querydata_sales.json"))
+
+    assert page.columns == ["Sales.Region", "Sales.Date", "Sum(Sales.Amount)"]
+    assert page.rows == [
+        ["North", "2024-01-01", "100.5"],
+        # Region repeated from the previous row (R bitmask)
+        ["North", "2024-01-02", "20"],
+        ["South", "2024-01-01", "35.25"],
+        # Date repeated (R bitmask) and amount null (Ø bitmask)
+        ["West", "2024-01-01", ""],
+        # Value sent as is instead of as an index into the value dictionary
+        ["East", "2024-01-01 00:30:00", "7"],
+    ]
+    assert page.has_more
+
+
+def test_decode_last_page():
+    response = load_fixture("querydata_sales.json")
+    del response["results"][0]["result"]["data"]["dsr"]["DS"][0]["RT"]
+
+    assert not decode_query_result(response).has_more
+
+
+def test_decode_without_descriptor_uses_column_ids():
+    response = load_fixture("querydata_sales.json")
+    del response["results"][0]["result"]["data"]["descriptor"]
+
+    assert decode_query_result(response).columns == ["G0", "G1", "M0"]
+
+
+def test_decode_missing_value():
+    response = load_fixture("querydata_sales.json")
+    rows = response["results"][0]["result"]["data"]["dsr"]["DS"][0]["PH"][0]["DM0"]
+    rows[2]["C"] = [1]
+
+    with pytest.raises(DsrDecodeError):
+        decode_query_result(response)
+
+
+def test_decode_other_response():
+    with pytest.raises(DsrDecodeError):
+        decode_query_result({"results": [{"result": {"data": {}}}]})
@@ -0,0 +1,115 @@
+# pyright: reportUnknownMemberType=false
+
+from pathlib import Path
+
+import pandas as pd
+
+from src.cache import FingerprintCache
+from src.fingerprint import (
+    BLOCK_SIZE,
+    FingerprintProbe,
+    count_changed_blocks,
+    diff_tables,
+    fingerprint_table,
+    is_same_table,
+)
+
+COLUMNS = ["Region", "Amount"]
+
+
+def make_table(rows: int) -> pd.DataFrame:
+    return pd.DataFrame([[f"Region {i}", str(i)] for i in range(rows)], columns=COLUMNS)
+
+
+def test_same_table_matches_and_changed_cell_does_not():
+    table = make_table(2 * BLOCK_SIZE + 10)
+    changed = table.copy()
+    changed.iloc[BLOCK_SIZE + 1, 1] = "changed"
+
+    previous = fingerprint_table(table, probe_rows=100)
+
+    assert is_same_table(previous, fingerprint_table(table.copy(), probe_rows=100))
+    current = fingerprint_table(changed, probe_rows=100)
+    assert not is_same_table(previous, current)
+    # Only the block with the changed row differs, the probe does not
+    assert count_changed_blocks(previous, current) == 1
+    assert current.probe_hash == previous.probe_hash
+
+
+def test_added_row_and_renamed_column_do_not_match():
+    table = make_table(50)
+    previous = fingerprint_table(table, probe_rows=10)
+
+    assert not is_same_table(previous, fingerprint_table(make_table(51), 10))
+    assert not is_same_table(
+        previous, fingerprint_table(table.rename(columns={"Amount": "Sales"}), 10)
+    )
+
+
+def rows_of(table: pd.DataFrame) -> list[list[str]]:
+    return table.values.tolist()
+
+
+def test_probe_matches_first_rows_and_row_count():
+    table = make_table(500)
+    previous = fingerprint_table(table, probe_rows=100)
+
+    probe = FingerprintProbe(previous)
+    # Not enough rows scraped yet
+    assert not probe.check(COLUMNS, rows_of(table.head(50)), 500)
+    assert probe.check(COLUMNS, rows_of(table.head(120)), 500)
+    assert probe.is_match
+
+
+def test_probe_does_not_match_other_row_count_or_first_rows():
+    table = make_table(500)
+    previous = fingerprint_table(table, probe_rows=100)
+
+    assert not FingerprintProbe(previous).check(COLUMNS, rows_of(table), 501)
+    assert not FingerprintProbe(previous).check(COLUMNS, rows_of(table), None)
+
+    changed = table.copy()
+    changed.iloc[0, 1] = "changed"
+    probe = FingerprintProbe(previous)
+    assert not probe.check(COLUMNS, rows_of(changed), 500)
+    # The probe is only checked once
+    assert not probe.check(COLUMNS, rows_of(table), 500)
+
+
+def test_probe_is_not_used_for_tables_not_larger_than_the_probe():
+    table = make_table(100)
+    previous = fingerprint_table(table, probe_rows=100)
+
+    assert not previous.can_probe
+    assert not FingerprintProbe(previous).check(COLUMNS, rows_of(table), 100)
+
+
+def test_diff_matches_duplicate_rows_one_to_one():
+    old = pd.DataFrame(
+        [["North", "1"], ["North", "1"], ["South", "2"]], columns=COLUMNS
+    )
+    new = pd.DataFrame(
+        [["North", "1"], ["North", "1"], ["North", "1"], ["East", "3"]],
+        columns=COLUMNS,
+    )
+
+    diff = diff_tables(old, new, "Change")
+
+    assert diff.values.tolist() == [
+        ["added", "North", "1"],
+        ["added", "East", "3"],
+        ["removed", "South", "2"],
+    ]
+
+
+def test_cache_keeps_fingerprint_and_table_per_filter_state(tmp_path: Path):
+    cache = FingerprintCache(tmp_path)
+    table = make_table(20)
+    fingerprint = fingerprint_table(table, probe_rows=5)
+    cache.put("https://app.powerbi.com/view?r=1", "north", fingerprint, table)
+
+    assert cache.get("https://app.powerbi.com/view?r=1", "north") == fingerprint
+    assert cache.get("https://app.powerbi.com/view?r=1", "south") is None
+    loaded = cache.load_table("https://app.powerbi.com/view?r=1", "north")
+    assert loaded is not None
+    assert loaded.equals(table)
@@ -0,0 +1,153 @@
+import copy
+import json
+from pathlib import Path
+from typing import Any, Optional
+
+from src.scraper.query_data_scraper import (
+    NetworkCapture,
+    QueryDataScraper,
+    QueryResponse,
+    get_visual_id,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+RESPONSE = json.loads((FIXTURES / "querydata_sales.json").read_text(encoding="utf-8"))
+QUERY_URL = "https://wabi-north-europe-api.analysis.windows.net/public/reports/querydata?synchronous=true"
+
+
+def make_response(first_region: int, has_more: bool = True) -> dict[str, Any]:
+    response = copy.deepcopy(RESPONSE)
+    dataset = response["results"][0]["result"]["data"]["dsr"]["DS"][0]
+    dataset["PH"][0]["DM0"][0]["C"][0] = first_region
+    if not has_more:
+        del dataset["RT"]
+    return response
+
+
+def make_request_body(visual_id: str) -> str:
+    return json.dumps(
+        {
+            "version": "1.0.0",
+            "queries": [
+                {
+                    "Query": {"Commands": []},
+                    "ApplicationContext": {
+                        "DatasetId": "8b1f",
+                        "Sources": [{"ReportId": "4c2e", "VisualId": visual_id}],
+                    },
+                }
+            ],
+        }
+    )
+
+
+class FakeCapture:
+    def __init__(self, batches: list[list[QueryResponse]]) -> None:
+        self.batches = batches
+
+    def poll(self) -> list[QueryResponse]:
+        return self.batches.pop(0) if self.batches else []
+
+
+class FakeDriver:
+    def __init__(self, entries: list[dict[str, Any]], bodies: dict[str, str]) -> None:
+        self.entries = entries
+        self.bodies = bodies
+
+    def get_log(self, _: str) -> list[dict[str, Any]]:
+        entries, self.entries = self.entries, []
+        return entries
+
+    def execute_cdp_cmd(self, _: str, params: dict[str, Any]) -> dict[str, Any]:
+        return {"body": self.bodies[params["requestId"]], "base64Encoded": False}
+
+
+def log_entry(method: str, params: dict[str, Any]) -> dict[str, Any]:
+    return {"message": json.dumps({"message": {"method": method, "params": params}})}
+
+
+def create_scraper(batches: list[list[QueryResponse]]) -> QueryDataScraper:
+    return QueryDataScraper(None, FakeCapture(batches))  # type: ignore
+
+
+def first_region(page: Optional[Any]) -> str:
+    assert page is not None
+    return page.rows[0][0]
+
+
+def test_pages_received_together_are_kept():
+    scraper = create_scraper(
+        [
+            [
+                QueryResponse(make_response(0), "table"),
+                QueryResponse(make_response(1), "table"),
+                QueryResponse(make_response(2, has_more=False), "table"),
+            ]
+        ]
+    )
+
+    pages = [
+        scraper._wait_for_page(3, 0.5, should_scroll=False)  # type: ignore
+        for _ in range(3)
+    ]
+
+    assert [first_region(page) for page in pages] == ["North", "South", "West"]
+
+
+def test_responses_of_other_visuals_are_ignored():
+    scraper = create_scraper(
+        [
+            [
+                QueryResponse({"results": []}, "card"),
+                QueryResponse(make_response(0), "table"),
+                # Same columns, but queried by another visual
+                QueryResponse(make_response(1), "matrix"),
+            ],
+            [QueryResponse(make_response(2), "table")],
+        ]
+    )
+
+    first = scraper._wait_for_page(3, 0.5, should_scroll=False)  # type: ignore
+    second = scraper._wait_for_page(3, 0.5, should_scroll=False)  # type: ignore
+
+    assert first_region(first) == "North"
+    assert first_region(second) == "West"
+
+
+def test_first_page_must_have_table_column_count():
+    scraper = create_scraper([[QueryResponse(make_response(0), "table")]])
+
+    assert scraper._wait_for_page(2, 0.2, should_scroll=False) is None  # type: ignore
+
+
+def test_capture_reads_visual_id_from_request():
+    driver = FakeDriver(
+        [
+            log_entry(
+                "Network.requestWillBeSent",
+                {
+                    "requestId": "1",
+                    "request": {"url": QUERY_URL, "postData": make_request_body("a1")},
+                },
+            ),
+            log_entry(
+                "Network.responseReceived",
+                {"requestId": "1", "response": {"url": QUERY_URL}},
+            ),
+            log_entry("Network.loadingFinished", {"requestId": "1"}),
+        ],
+        {"1": json.dumps(RESPONSE)},
+    )
+    capture = NetworkCapture(driver)  # type: ignore
+
+    responses = capture.poll()
+
+    assert responses == [QueryResponse(RESPONSE, "a1")]
+    assert capture.poll() == []
+
+
+def test_get_visual_id():
+    assert get_visual_id(make_request_body("a1")) == "a1"
+    assert get_visual_id(None) is None
+    assert get_visual_id("not json") is None
+    assert get_visual_id(json.dumps({"queries": [{}]})) is None
@@ -0,0 +1,87 @@
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.cancellation import CancellationToken
+from src.cron import CronExpression
+from src.scheduler import RunHistory, RunStatus, ScheduledJob, ScheduledRun, Scheduler
+from src.usecase import ScrapeResult
+
+SCHEDULED_AT = datetime(2024, 5, 1, 6, 0)
+
+
+def make_job(run_started: threading.Event, release: threading.Event) -> ScheduledJob:
+    def run(scheduled_at: datetime, cancel_token: CancellationToken) -> ScrapeResult:
+        run_started.set()
+        release.wait(5)
+        return ScrapeResult(Path("sales.csv"), rows=10, columns=2)
+
+    return ScheduledJob("sales", CronExpression.parse("0 6 * * *"), run)
+
+
+def test_run_is_skipped_while_the_previous_run_of_the_job_is_running():
+    run_started = threading.Event()
+    release = threading.Event()
+    job = make_job(run_started, release)
+    scheduler = Scheduler([job], workers=2, max_jitter=0)
+
+    with ThreadPoolExecutor(2) as executor:
+        scheduler._start(executor, job, SCHEDULED_AT)  # type: ignore
+        assert run_started.wait(5)
+        scheduler._start(executor, job, SCHEDULED_AT + timedelta(days=1))  # type: ignore
+        release.set()
+
+    runs = scheduler.history.get_runs("sales")
+    assert [run.status for run in runs] == [RunStatus.SKIPPED, RunStatus.SUCCEEDED]
+    assert runs[1].rows == 10
+
+    # The job can run again once the previous run is done
+    with ThreadPoolExecutor(1) as executor:
+        scheduler._start(executor, job, SCHEDULED_AT + timedelta(days=2))  # type: ignore
+    assert scheduler.history.get_runs("sales")[-1].status == RunStatus.SUCCEEDED
+
+
+def test_runs_start_within_max_jitter_after_the_scheduled_time():
+    random.seed(0)
+    job = make_job(threading.Event(), threading.Event())
+    scheduler = Scheduler([job], max_jitter=30)
+
+    for _ in range(50):
+        scheduler._schedule(job, SCHEDULED_AT - timedelta(minutes=1))  # type: ignore
+
+    delays = [
+        (start_at - scheduled_at).total_seconds()
+        for start_at, _, _, scheduled_at in scheduler._queue  # type: ignore
+    ]
+    assert all(scheduled_at == SCHEDULED_AT for _, _, _, scheduled_at in scheduler._queue)  # type: ignore
+    assert all(0 <= delay <= 30 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_run_history_is_kept_between_restarts(tmp_path: Path):
+    path = tmp_path / "history.json"
+    history = RunHistory(path, size=2)
+    for day in range(3):
+        history.add(
+            ScheduledRun(
+                "sales",
+                SCHEDULED_AT + timedelta(days=day),
+                SCHEDULED_AT + timedelta(days=day, seconds=5),
+                12.5,
+                100 + day,
+                RunStatus.SUCCEEDED,
+            )
+        )
+
+    runs = RunHistory(path, size=2).get_runs("sales")
+    assert [run.rows for run in runs] == [101, 102]
+    assert runs[0].started_at == SCHEDULED_AT + timedelta(days=1, seconds=5)
+
+
+def test_broken_history_file_is_ignored(tmp_path: Path):
+    path = tmp_path / "history.json"
+    path.write_text("{not json", encoding="utf-8")
+
+    assert RunHistory(path).get_runs("sales") == []
@@ -0,0 +1,55 @@
+# pyright: reportUnknownMemberType=false, reportUnknownArgumentType=false
+
+import pandas as pd
+
+from src.config import Locale
+from src.type_inference import infer_types
+
+
+def test_placeholder_in_few_rows_is_reported_and_column_converted():
+    # Few distinct values, but the placeholder is only 1 of 400 rows
+    values = ["1,234", "2,000.5", "(3)"] * 133 + ["-"]
+    df, reports = infer_types(pd.DataFrame({"Amount": values}), Locale.EN)
+
+    assert df["Amount"].dtype == float
+    assert df["Amount"].iloc[:3].tolist() == [1234.0, 2000.5, -3.0]
+    assert pd.isna(df["Amount"].iloc[-1])
+    assert reports[0].dtype == "float64"
+    assert reports[0].failures == 1
+    assert reports[0].failure_examples == ("-",)
+
+
+def test_column_with_many_failing_rows_is_kept_as_text_and_reported():
+    values = ["1,234", "2,000.5", "-", "-"] * 100
+    df, reports = infer_types(pd.DataFrame({"Amount": values}), Locale.EN)
+
+    assert df["Amount"].tolist() == values
+    assert reports[0].dtype is None
+    assert reports[0].failures == 200
+    assert reports[0].failure_examples == ("-",)
+
+
+def test_many_distinct_values_with_failures_below_threshold_are_converted():
+    values = [f"{i:,}" for i in range(1000)] + ["n/a"] * 5
+    df, reports = infer_types(pd.DataFrame({"Amount": values}), Locale.EN)
+
+    assert df["Amount"].iloc[999] == 999.0
+    assert reports[0].failures == 5
+
+
+def test_text_column_is_not_reported():
+    df, reports = infer_types(pd.DataFrame({"Region": ["North", "South"]}))
+
+    assert df["Region"].tolist() == ["North", "South"]
+    assert reports[0].dtype is None
+    assert reports[0].failures == 0
+
+
+def test_dates_and_empty_values_by_locale():
+    values = ["31-01-2023", "(Blank)", "01-02-2023"]
+    df, reports = infer_types(pd.DataFrame({"Date": values}), Locale.DA)
+
+    assert df["Date"].iloc[0] == pd.Timestamp(2023, 1, 31)
+    assert pd.isna(df["Date"].iloc[1])
+    assert reports[0].dtype == "datetime64[ns]"
+    assert reports[0].failures == 0